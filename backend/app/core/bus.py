@@ -0,0 +1,575 @@
+"""
+Room pub/sub shared by the WebSocket routes.
+
+Signaling peers and insight subscribers used to live in per-process
+dictionaries, so the interviewer and the candidate had to land on the same
+uvicorn worker. The routes now keep only their own sockets and go through
+a RoomBus for everything that spans workers:
+
+- join/leave: membership counts per room, with an optional limit that is
+  checked and taken in one step (the two-person signaling limit)
+- publish/subscribe: a message on a channel reaches the subscribers in
+  every worker; a retained message is kept for late subscribers
+
+LocalBus keeps all of it in this process. UnixSocketBus connects to a
+BusHub on a Unix domain socket: whichever worker takes the lock file first
+hosts the hub, and another one takes over if that worker exits. The hub
+counts members per connection, so a worker that dies frees its seats.
+"""
+import os
+import abc
+import json
+import uuid
+import fcntl
+import asyncio
+import functools
+import itertools
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from core.log import get_logger
+from core.config import (
+    ROOM_BUS, ROOM_BUS_SOCKET, ROOM_BUS_RECONNECT_SECONDS,
+    ROOM_BUS_MAX_BUFFER_BYTES, ROOM_BUS_TIMEOUT_SECONDS
+)
+
+logger = get_logger("bus")
+
+# Subscribers are called with (channel, message)
+Handler = Callable[[str, dict], Awaitable[None]]
+
+STREAM_LIMIT = 16 * 1024 * 1024  # Longest frame (one JSON line) either side accepts
+
+
+class BusUnavailable(Exception):
+    """The hub could not be reached in time."""
+
+
+def _encode(frame: dict) -> bytes:
+    return (json.dumps(frame, separators=(",", ":")) + "\n").encode()
+
+
+class RoomBus(abc.ABC):
+    """Room membership and pub/sub; see LocalBus and UnixSocketBus."""
+
+    def __init__(self):
+        # Tells this worker's sockets apart from other workers' in messages
+        self.node = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Handler]] = {}
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abc.abstractmethod
+    async def join(self, room: str, limit: Optional[int] = None) -> bool:
+        """Take a seat in a room; False (and no seat) if it already has `limit` members."""
+
+    @abc.abstractmethod
+    async def leave(self, room: str) -> Optional[int]:
+        """Give a seat back. Returns the members left, or None if unknown."""
+
+    @abc.abstractmethod
+    async def members(self, room: str) -> int:
+        """Seats taken in a room, in every worker."""
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: dict, retain: bool = False):
+        """Deliver to every subscriber of the channel, in every worker."""
+
+    @abc.abstractmethod
+    async def retained(self, channel: str) -> Optional[dict]:
+        """The last message published with retain=True, if any."""
+
+    @abc.abstractmethod
+    async def clear(self, channel: str):
+        """Forget the retained message of a channel."""
+
+    async def subscribe(self, channel: str, handler: Handler):
+        """Call handler(channel, message) for every message published from now on."""
+        self._add_handler(channel, handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        self._remove_handler(channel, handler)
+
+    def _add_handler(self, channel: str, handler: Handler) -> bool:
+        """Returns True for the first handler of a channel in this worker."""
+        handlers = self._handlers.setdefault(channel, [])
+        if handler not in handlers:
+            handlers.append(handler)
+        return len(handlers) == 1
+
+    def _remove_handler(self, channel: str, handler: Handler) -> bool:
+        """Returns True when the last handler of a channel in this worker is gone."""
+        handlers = self._handlers.get(channel)
+        if not handlers or handler not in handlers:
+            return False
+        handlers.remove(handler)
+        if handlers:
+            return False
+        del self._handlers[channel]
+        return True
+
+    async def _dispatch(self, channel: str, message: dict):
+        # Copy: handlers may unsubscribe while we iterate
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(channel, message)
+                self.delivered += 1
+            except Exception as e:
+                logger.exception("Handler for '%s' failed: %s", channel, e)
+
+    def stats(self) -> dict:
+        return {
+            "kind": type(self).__name__,
+            "node": self.node,
+            "channels": len(self._handlers),
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+
+class LocalBus(RoomBus):
+    """Everything in this process: the behaviour of a single worker."""
+
+    def __init__(self):
+        super().__init__()
+        self._members: Dict[str, int] = {}
+        self._retained: Dict[str, dict] = {}
+
+    async def join(self, room: str, limit: Optional[int] = None) -> bool:
+        count = self._members.get(room, 0)
+        if limit is not None and count >= limit:
+            return False
+        self._members[room] = count + 1
+        return True
+
+    async def leave(self, room: str) -> Optional[int]:
+        count = self._members.get(room, 0) - 1
+        if count > 0:
+            self._members[room] = count
+            return count
+        self._members.pop(room, None)
+        return 0
+
+    async def members(self, room: str) -> int:
+        return self._members.get(room, 0)
+
+    async def publish(self, channel: str, message: dict, retain: bool = False):
+        self.published += 1
+        if retain:
+            self._retained[channel] = message
+        await self._dispatch(channel, message)
+
+    async def retained(self, channel: str) -> Optional[dict]:
+        return self._retained.get(channel)
+
+    async def clear(self, channel: str):
+        self._retained.pop(channel, None)
+
+
+class BusHub:
+    """
+    Relays bus frames between the workers connected to a Unix socket.
+
+    Frames are JSON lines. A "pub" frame is forwarded verbatim to the other
+    subscribed connections; frames that carry an id ("join", "leave",
+    "members", "get", "sub") get a "reply" with the same id.
+    """
+
+    def __init__(self, path: str, max_buffer: int = ROOM_BUS_MAX_BUFFER_BYTES):
+        self.path = path
+        self.max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._members: Dict[str, Dict[asyncio.StreamWriter, int]] = {}
+        self._retained: Dict[str, dict] = {}
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left by a hub that died; the lock is ours now
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path, limit=STREAM_LIMIT)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._handle(writer, line, json.loads(line))
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.warning("Dropping room bus client: %s", e)
+        finally:
+            self._drop(writer)
+
+    def _handle(self, writer: asyncio.StreamWriter, line: bytes, frame: dict):
+        op = frame["op"]
+        if op == "pub":
+            channel = frame["channel"]
+            if frame.get("retain"):
+                self._retained[channel] = frame["msg"]
+            for subscriber in list(self._subscribers.get(channel, ())):
+                if subscriber is not writer:
+                    self._send(subscriber, line)
+        elif op == "sub":
+            self._subscribers.setdefault(frame["channel"], set()).add(writer)
+            self._reply(writer, frame, True)
+        elif op == "unsub":
+            self._unsubscribe(writer, frame["channel"])
+        elif op == "join":
+            counts = self._members.setdefault(frame["room"], {})
+            seats = frame.get("count", 1)
+            limit = frame.get("limit")
+            taken = limit is None or sum(counts.values()) + seats <= limit
+            if taken:
+                counts[writer] = counts.get(writer, 0) + seats
+            elif not counts:
+                del self._members[frame["room"]]
+            self._reply(writer, frame, taken)
+        elif op == "leave":
+            counts = self._members.get(frame["room"], {})
+            if counts.get(writer, 0) > 1:
+                counts[writer] -= 1
+            else:
+                counts.pop(writer, None)
+            if not counts:
+                self._members.pop(frame["room"], None)
+            self._reply(writer, frame, sum(counts.values()))
+        elif op == "members":
+            self._reply(writer, frame, sum(self._members.get(frame["room"], {}).values()))
+        elif op == "get":
+            self._reply(writer, frame, self._retained.get(frame["channel"]))
+        elif op == "clear":
+            self._retained.pop(frame["channel"], None)
+
+    def _reply(self, writer: asyncio.StreamWriter, frame: dict, value):
+        if "id" in frame:
+            self._send(writer, _encode({"op": "reply", "id": frame["id"], "value": value}))
+
+    def _send(self, writer: asyncio.StreamWriter, data: bytes):
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            # Its reader loop is stuck; it reconnects and re-registers
+            logger.warning("Room bus client stopped reading, disconnecting it")
+            writer.close()
+            return
+        writer.write(data)
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter, channel: str):
+        subscribers = self._subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(writer)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    def _drop(self, writer: asyncio.StreamWriter):
+        self._connections.discard(writer)
+        for channel in [c for c, subs in self._subscribers.items() if writer in subs]:
+            self._unsubscribe(writer, channel)
+        for room in [r for r, counts in self._members.items() if writer in counts]:
+            del self._members[room][writer]
+            if not self._members[room]:
+                del self._members[room]
+        writer.close()
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._connections),
+            "channels": len(self._subscribers),
+            "rooms": len(self._members),
+            "retained": len(self._retained),
+        }
+
+
+class UnixSocketBus(RoomBus):
+    """Shares rooms between the workers on this machine through a BusHub."""
+
+    def __init__(
+        self,
+        path: str,
+        reconnect_delay: float = ROOM_BUS_RECONNECT_SECONDS,
+        timeout: float = ROOM_BUS_TIMEOUT_SECONDS
+    ):
+        super().__init__()
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.timeout = timeout
+        self.hub: Optional[BusHub] = None
+        self.reconnects = 0
+        self._lock_file = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Inbound messages are handled off the reader, so a handler can make
+        # requests (leave, members) whose replies that reader has to deliver
+        self._inbox: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._joined: Dict[str, int] = {}  # Our seats, re-taken after a reconnect
+        self._limits: Dict[str, Optional[int]] = {}  # The limit each room was joined with
+        self._unseated: Dict[str, int] = {}  # Sockets whose seat a new hub refused
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._connected = asyncio.Event()
+            self._inbox = asyncio.Queue()
+            self._task = asyncio.create_task(self._run_forever())
+            self._dispatcher = asyncio.create_task(self._dispatch_forever())
+        try:
+            await asyncio.wait_for(self._connected.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Room bus hub not reachable on %s yet, still trying", self.path)
+
+    async def stop(self):
+        for task in (self._task, self._dispatcher):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._dispatcher = None
+        if self.hub:
+            await self.hub.stop()
+            self.hub = None
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _try_host(self):
+        """Host the hub if no other worker holds the lock."""
+        if self.hub:
+            return
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return
+        hub = BusHub(self.path)
+        try:
+            await hub.start()
+        except Exception:
+            lock_file.close()
+            raise
+        self.hub, self._lock_file = hub, lock_file
+        logger.info("Hosting the room bus hub on %s", self.path)
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self._try_host()
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+            except OSError as e:
+                logger.debug("Room bus hub not reachable: %s", e)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self._writer = writer
+            self._resync()
+            self._connected.set()
+            logger.info("Connected to the room bus hub (node %s)", self.node)
+            try:
+                await self._read(reader)
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(BusUnavailable("Lost the room bus hub"))
+                self._pending.clear()
+
+            self.reconnects += 1
+            logger.warning("Lost the room bus hub, reconnecting")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _read(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                frame = json.loads(line)
+                if frame["op"] == "reply":
+                    future = self._pending.get(frame["id"])
+                    if future and not future.done():
+                        future.set_result(frame["value"])
+                elif frame["op"] == "pub":
+                    self._inbox.put_nowait((frame["channel"], frame["msg"]))
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.warning("Room bus connection failed: %s", e)
+
+    async def _dispatch_forever(self):
+        while True:
+            channel, message = await self._inbox.get()
+            await self._dispatch(channel, message)
+
+    def _resync(self):
+        """
+        Re-register subscriptions and seats with a (possibly new) hub.
+
+        Seats are taken one at a time with the limit they were joined with,
+        the same check as join(): while we were away another worker may have
+        filled the room, and a seat the hub refuses is given up here.
+        """
+        for channel in self._handlers:
+            self._send({"op": "sub", "channel": channel})
+        for room, seats in list(self._joined.items()):
+            for _ in range(seats):
+                request_id = next(self._ids)
+                future = asyncio.get_running_loop().create_future()
+                future.add_done_callback(functools.partial(self._rejoined, room, request_id))
+                self._pending[request_id] = future
+                self._send({"op": "join", "room": room, "limit": self._limits.get(room), "id": request_id})
+
+    def _rejoined(self, room: str, request_id: int, future: asyncio.Future):
+        self._pending.pop(request_id, None)
+        if future.cancelled() or future.exception() is not None or future.result():
+            return  # Taken, or the connection went again and the next resync retries
+        seats = self._joined.get(room, 0) - 1
+        if seats > 0:
+            self._joined[room] = seats
+        else:
+            self._joined.pop(room, None)
+        self._unseated[room] = self._unseated.get(room, 0) + 1
+        logger.warning("Room '%s' filled up while the hub was away; a seat of this worker was refused", room)
+
+    def _send(self, frame: dict):
+        if self._writer is None:
+            raise BusUnavailable("Not connected to the room bus hub")
+        self._writer.write(_encode(frame))
+
+    async def _request(self, frame: dict):
+        await self._connected.wait()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._send({**frame, "id": request_id})
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _call(self, frame: dict):
+        try:
+            return await asyncio.wait_for(self._request(frame), self.timeout)
+        except asyncio.TimeoutError:
+            raise BusUnavailable("Room bus hub did not answer") from None
+
+    async def join(self, room: str, limit: Optional[int] = None) -> bool:
+        taken = await self._call({"op": "join", "room": room, "limit": limit})
+        if taken:
+            self._joined[room] = self._joined.get(room, 0) + 1
+            self._limits[room] = limit
+        return taken
+
+    async def leave(self, room: str) -> Optional[int]:
+        unseated = self._unseated.get(room, 0)
+        if unseated:
+            # One of the sockets refused a seat on resync: the hub holds nothing to give back
+            if unseated > 1:
+                self._unseated[room] = unseated - 1
+            else:
+                del self._unseated[room]
+            self._forget_limit(room)
+            try:
+                return await self.members(room)
+            except BusUnavailable:
+                return None
+        seats = self._joined.get(room, 0) - 1
+        if seats > 0:
+            self._joined[room] = seats
+        else:
+            self._joined.pop(room, None)
+            self._forget_limit(room)
+        try:
+            return await self._call({"op": "leave", "room": room})
+        except BusUnavailable as e:
+            # The hub dropped our seats with the connection; nothing to give back
+            logger.warning("Could not leave '%s': %s", room, e)
+            return None
+
+    def _forget_limit(self, room: str):
+        if room not in self._joined and room not in self._unseated:
+            self._limits.pop(room, None)
+
+    async def members(self, room: str) -> int:
+        return await self._call({"op": "members", "room": room})
+
+    async def publish(self, channel: str, message: dict, retain: bool = False):
+        self.published += 1
+        # Subscribers in this worker get the message without a round trip
+        await self._dispatch(channel, message)
+        writer = self._writer
+        if writer is None:
+            logger.warning("Room bus hub unavailable, '%s' message stayed in this worker", channel)
+            return
+        frame = {"op": "pub", "channel": channel, "msg": message}
+        if retain:
+            frame["retain"] = True
+        writer.write(_encode(frame))
+        await writer.drain()
+
+    async def retained(self, channel: str) -> Optional[dict]:
+        try:
+            return await self._call({"op": "get", "channel": channel})
+        except BusUnavailable as e:
+            logger.warning("Could not fetch retained '%s': %s", channel, e)
+            return None
+
+    async def clear(self, channel: str):
+        if self._writer is not None:
+            self._send({"op": "clear", "channel": channel})
+
+    async def subscribe(self, channel: str, handler: Handler):
+        # Wait for the hub, so a message published right after this returns
+        # is not missed (the hub registers the "sub" before forwarding it)
+        if self._add_handler(channel, handler) and self._writer is not None:
+            try:
+                await self._call({"op": "sub", "channel": channel})
+            except BusUnavailable as e:
+                logger.warning("Subscribing to '%s' is waiting for the hub: %s", channel, e)
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        if self._remove_handler(channel, handler) and self._writer is not None:
+            self._send({"op": "unsub", "channel": channel})
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "connected": self._writer is not None,
+            "reconnects": self.reconnects,
+            "inbox": self._inbox.qsize() if self._inbox else 0,
+            "hub": self.hub.stats() if self.hub else None,
+        })
+        return stats
+
+
+def create_bus(kind: str = ROOM_BUS) -> RoomBus:
+    if kind == "unix":
+        return UnixSocketBus(ROOM_BUS_SOCKET)
+    if kind != "local":
+        raise ValueError(f"Unknown ROOM_BUS '{kind}', expected 'local' or 'unix'")
+    return LocalBus()
+
+
+room_bus = create_bus()
@@ -0,0 +1,171 @@
+"""
+Skip the model call for segments where nothing has changed.
+
+Candidates often sit still and silent for a while, e.g. while the
+interviewer talks, and every 7 seconds the same face and the same silence
+went to Gemini again. ChangeDetector keeps, per room, a signature of the
+last segment that was analyzed and its result:
+
+- the frame's difference hash (dHash): the JPEG decoded at 1/8 scale in
+  grayscale, shrunk to 9x8 and each pixel compared with its right-hand
+  neighbour, 64 bits in all. Re-encoding noise and small movements flip a
+  few bits; a turned head or someone new flips many.
+- whether the WAV has voice in it: the share of CHANGE_VOICE_WINDOW_MS
+  windows louder than CHANGE_SILENCE_DBFS, with numpy over all windows at
+  once.
+
+A silent segment whose frame is within CHANGE_FRAME_MAX_DISTANCE bits of a
+silent, analyzed one gets that result again, marked "carried_over". At
+most CHANGE_MAX_CARRIED_OVER segments in a row are carried over before one
+is analyzed anyway. Needs OpenCV and numpy; without them every segment is
+analyzed.
+"""
+import asyncio
+from typing import Dict, NamedTuple, Optional
+
+from core.config import (
+    CHANGE_FRAME_MAX_DISTANCE, CHANGE_SILENCE_DBFS, CHANGE_VOICED_FRACTION, CHANGE_VOICE_WINDOW_MS,
+    CHANGE_MAX_CARRIED_OVER
+)
+from core.log import get_logger
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # Optional: every segment is analyzed
+    cv2 = None
+
+logger = get_logger("change_detector")
+
+
+class Signature(NamedTuple):
+    frame_hash: Optional[int]  # None: the frame could not be decoded
+    voiced: bool
+
+
+class _Room:
+    __slots__ = ("signature", "result", "carried", "analyzed", "carried_over")
+
+    def __init__(self):
+        self.signature: Optional[Signature] = None  # Of the last analyzed segment
+        self.result: Optional[dict] = None
+        self.carried = 0  # Carried over in a row since the last analysis
+        self.analyzed = 0
+        self.carried_over = 0
+
+
+def frame_hash(jpeg: bytes) -> Optional[int]:
+    image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        return None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def voiced_fraction(wav: bytes) -> float:
+    """Share of short windows louder than CHANGE_SILENCE_DBFS; 1.0 for audio it cannot read."""
+    if wav[:4] != b"RIFF" or wav[8:12] != b"WAVE":
+        return 1.0
+    rate = bits = samples = None
+    pos = 12
+    while pos + 8 <= len(wav):
+        chunk, size = wav[pos:pos + 4], int.from_bytes(wav[pos + 4:pos + 8], "little")
+        if chunk == b"fmt ":
+            rate = int.from_bytes(wav[pos + 12:pos + 16], "little")
+            bits = int.from_bytes(wav[pos + 22:pos + 24], "little")
+        elif chunk == b"data":
+            count = min(size, len(wav) - pos - 8) // 2
+            samples = np.frombuffer(wav, dtype="<i2", count=count, offset=pos + 8)
+            break
+        pos += 8 + size + (size & 1)
+    if bits != 16 or not rate or samples is None:
+        return 1.0
+    window = max(1, rate * CHANGE_VOICE_WINDOW_MS // 1000)
+    windows = len(samples) // window
+    if windows == 0:
+        return 0.0
+    frames = samples[:windows * window].reshape(windows, window).astype(np.float32) / 32768
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    threshold = 10 ** (CHANGE_SILENCE_DBFS / 20)
+    return float(np.count_nonzero(rms > threshold)) / windows
+
+
+def _signature(jpeg: bytes, wav: Optional[bytes]) -> Signature:
+    voiced = wav is not None and voiced_fraction(wav) >= CHANGE_VOICED_FRACTION
+    return Signature(frame_hash(jpeg), voiced)
+
+
+class ChangeDetector:
+    def __init__(self, max_distance: int = CHANGE_FRAME_MAX_DISTANCE, max_carried_over: int = CHANGE_MAX_CARRIED_OVER):
+        self.max_distance = max_distance
+        self.max_carried_over = max_carried_over
+        self.enabled = max_carried_over > 0 and cv2 is not None
+        self.rooms: Dict[str, _Room] = {}
+        self.analyzed = 0
+        self.carried_over = 0
+
+    async def signature(self, jpeg: bytes, wav: Optional[bytes]) -> Optional[Signature]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(_signature, jpeg, wav)
+
+    def _unchanged(self, previous: Signature, current: Signature) -> bool:
+        if previous.voiced or current.voiced:
+            return False
+        if previous.frame_hash is None or current.frame_hash is None:
+            return False
+        return bin(previous.frame_hash ^ current.frame_hash).count("1") <= self.max_distance
+
+    def carry_over(self, room_id: str, signature: Optional[Signature]) -> Optional[dict]:
+        """The last result again if this segment is no different, else None (analyze it)."""
+        room = self.rooms.get(room_id)
+        if signature is None or room is None or room.result is None:
+            return None
+        if room.carried >= self.max_carried_over or not self._unchanged(room.signature, signature):
+            return None
+        room.carried += 1
+        room.carried_over += 1
+        self.carried_over += 1
+        return {**room.result, "carried_over": True}
+
+    def analyzed_segment(self, room_id: str, signature: Optional[Signature], result: dict):
+        """Remember an analyzed segment; later ones are compared with it."""
+        room = self.rooms.setdefault(room_id, _Room())
+        room.signature = signature
+        room.result = {key: value for key, value in result.items() if not key.startswith("_")}
+        room.carried = 0
+        room.analyzed += 1
+        self.analyzed += 1
+
+    def forget(self, room_id: str):
+        room = self.rooms.pop(room_id, None)
+        if room is not None and room.carried_over:
+            logger.info(
+                "Room '%s': %d of %d segments carried over",
+                room_id, room.carried_over, room.analyzed + room.carried_over
+            )
+
+    @staticmethod
+    def _skip_rate(analyzed: int, carried_over: int) -> float:
+        total = analyzed + carried_over
+        return round(carried_over / total, 3) if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "analyzed": self.analyzed,
+            "carried_over": self.carried_over,
+            "skip_rate": self._skip_rate(self.analyzed, self.carried_over),
+            "rooms": {
+                room_id: {
+                    "analyzed": room.analyzed,
+                    "carried_over": room.carried_over,
+                    "skip_rate": self._skip_rate(room.analyzed, room.carried_over),
+                }
+                for room_id, room in self.rooms.items()
+            },
+        }
+
+
+change_detector = ChangeDetector()
@@ -1,5 +1,114 @@
+import os
+
 # Configuration
-SECRET_KEY = "hackathon_secret_key_change_me"
+DEFAULT_SECRET_KEY = "hackathon_secret_key_change_me"
+SECRET_KEY = os.getenv("SECRET_KEY", DEFAULT_SECRET_KEY)
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30 # 30 Days
+# "session": opaque ids checked against the sessions table.
+# "jwt": signed tokens verified in memory (see core/tokens.py).
+AUTH_TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "session")
+if AUTH_TOKEN_MODE == "jwt" and SECRET_KEY in ("", DEFAULT_SECRET_KEY):
+    # The default is in the repository: anyone could sign an interviewer token
+    raise RuntimeError("AUTH_TOKEN_MODE=jwt needs SECRET_KEY set to a private value")
+REVOCATION_REFRESH_SECONDS = 10  # How quickly other workers see a logout
 DB_NAME = "users.db"
+
+# SQLite connection pool
+DB_POOL_SIZE = 8  # Idle connections kept open per worker process
+DB_BUSY_TIMEOUT_MS = 5000
+DB_CACHE_SIZE_KB = 16384  # Page cache per connection (16 MB)
+DB_MMAP_SIZE = 256 * 1024 * 1024  # 256 MB memory-mapped I/O
+DB_READ_WORKERS = 4  # Threads serving async reads; writes go through one dedicated writer
+
+# Write-behind insight persistence
+INSIGHT_FLUSH_BATCH = 32  # Flush as soon as this many rows are buffered
+INSIGHT_FLUSH_INTERVAL_SECONDS = 2.0  # ...or at least this often
+
+# Candidate segments waiting for analysis (latest wins, see routes/gemini_analysis.py)
+ANALYSIS_STALENESS_SAMPLES = 200  # Recent capture-to-delivery times kept for stats
+
+# Gemini calls from every room and job (see GeminiScheduler in routes/gemini_analysis.py)
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8"))  # Concurrent model calls per worker
+GEMINI_WAIT_SAMPLES = 200  # Recent queue waits kept for stats
+
+# Auth cache (resolved sessions and users, see core/dependencies.py)
+AUTH_CACHE_SIZE = 10000
+AUTH_CACHE_TTL_SECONDS = 300
+
+# Background maintenance (see core/maintenance.py)
+SESSION_SWEEP_INTERVAL_SECONDS = 600
+SESSION_SWEEP_BATCH = 1000  # Rows deleted per write transaction
+INCREMENTAL_VACUUM_PAGES = 2000  # Free pages returned to the OS per sweep
+
+# Report polling (GET /auth/meetings/{id}/report?since_id=...)
+REPORT_INSIGHTS_PAGE_SIZE = 200  # Default page for incremental requests
+REPORT_INSIGHTS_MAX_PAGE = 1000
+
+# Password hashing (pbkdf2 runs in worker processes, see core/database.py)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # 0 hashes inline on the event loop
+PASSWORD_HASH_MAX_PENDING = 32  # Beyond this, logins get a 503 instead of queueing
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+# Rate limits (see core/rate_limit.py): policy -> (burst, refill per minute)
+RATE_LIMITS = {
+    "login": (10, 10),  # Per client IP
+    "login_account": (5, 5),  # Per username, whatever the IP
+    "candidate_login": (10, 10),  # Per client IP; meeting codes are short
+    "analyze": (6, 12),  # Per client IP; every call is a paid Gemini request
+}
+RATE_LIMIT_MAX_KEYS = 100000  # Per policy
+
+# Logging (see core/log.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-module overrides, e.g. LOG_LEVELS="sense.signaling=DEBUG,sense.gemini=WARNING"
+LOG_LEVELS = dict(
+    item.split("=", 1) for item in os.getenv("LOG_LEVELS", "").split(",") if "=" in item
+)
+LOG_SAMPLE_EVERY = 100  # Per-message debug logs (relay, frames) keep 1 in N
+
+# Room pub/sub (see core/bus.py)
+# "local": rooms live in this process, so run a single worker.
+# "unix": workers share rooms through a hub on a Unix domain socket.
+ROOM_BUS = os.getenv("ROOM_BUS", "local")
+ROOM_BUS_SOCKET = os.getenv("ROOM_BUS_SOCKET", "sense-bus.sock")
+ROOM_BUS_RECONNECT_SECONDS = 0.5
+ROOM_BUS_MAX_BUFFER_BYTES = 8 * 1024 * 1024  # Hub drops a worker that stops reading
+ROOM_PARTICIPANT_LIMIT = 2  # People per signaling room
+ROOM_BUS_TIMEOUT_SECONDS = 5  # Wait for the hub before failing a join
+
+# Outbound signaling messages (see core/send_queue.py)
+SIGNALING_SEND_QUEUE_SIZE = 64  # Messages waiting per socket
+SIGNALING_SEND_TIMEOUT_SECONDS = 5  # A single send taking longer closes the socket
+SEND_WATCHDOG_INTERVAL_SECONDS = 1  # How often send timeouts are checked
+# What to do when a socket's queue is full: "disconnect" (the client
+# reconnects and renegotiates), "drop_oldest" or "drop_newest"
+SIGNALING_SLOW_CONSUMER_POLICY = os.getenv("SIGNALING_SLOW_CONSUMER_POLICY", "disconnect")
+
+# Server-driven WebSocket heartbeat (see core/heartbeat.py)
+HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("HEARTBEAT_INTERVAL_SECONDS", "15"))  # 0 turns it off
+HEARTBEAT_MISSED_LIMIT = int(os.getenv("HEARTBEAT_MISSED_LIMIT", "3"))  # Unanswered heartbeats before a socket is closed
+
+# Trickle-ICE coalescing for clients that connect with ?ice_batch=1
+SIGNALING_ICE_BATCH_MS = float(os.getenv("SIGNALING_ICE_BATCH_MS", "5"))  # Window per batch; 0 turns batching off
+SIGNALING_NEGOTIATION_SAMPLES = 200  # Recent negotiations kept for the relay metrics
+
+# Meeting clock pushed over signaling (see core/meeting_clock.py)
+MEETING_CLOCK_TICK_SECONDS = 1  # Expiry is noticed within this
+MEETING_CLOCK_SYNC_SECONDS = 30  # Clients count down locally; resync this often
+MEETING_CLOCK_CACHE_SIZE = 10000  # Deadlines kept per worker
+
+# Face crop before Gemini (see core/face_crop.py)
+FACE_CROP_SIZE = int(os.getenv("FACE_CROP_SIZE", "384"))  # Longest side sent to the model, in pixels; 0 sends frames as they arrive
+FACE_CROP_MARGIN = 0.4  # Added on each side of the face box, as a fraction of its size
+FACE_CROP_JPEG_QUALITY = 80
+FACE_CROP_REDETECT_SEGMENTS = 5  # Search the whole frame at least this often while a face is tracked
+FACE_CROP_WORKERS = 2  # Threads running OpenCV
+FACE_CROP_SAMPLES = 200  # Recent processing and model call times kept for stats
+
+# Skipping model calls for unchanged segments (see core/change_detector.py)
+CHANGE_MAX_CARRIED_OVER = int(os.getenv("CHANGE_MAX_CARRIED_OVER", "3"))  # Results reused in a row before analyzing anyway; 0 analyzes every segment
+CHANGE_FRAME_MAX_DISTANCE = int(os.getenv("CHANGE_FRAME_MAX_DISTANCE", "6"))  # Of 64 frame hash bits, differing bits still counted as the same frame
+CHANGE_SILENCE_DBFS = float(os.getenv("CHANGE_SILENCE_DBFS", "-40"))  # Windows quieter than this are silence
+CHANGE_VOICED_FRACTION = 0.1  # Segments with less of their windows above it count as silent
+CHANGE_VOICE_WINDOW_MS = 30
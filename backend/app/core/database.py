@@ -1,206 +1,229 @@
 import sqlite3
 import random
 import string
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
-from .config import DB_NAME
+from .schema import migrate
+from .tokens import create_access_token
+from .log import get_logger
+from .config import (
+    DB_NAME, DB_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_READ_WORKERS,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    AUTH_TOKEN_MODE
+)
+
+logger = get_logger("db")
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
-# --- Database Helpers ---
-def get_db_connection():
-    # Because we are in core/, we might need to adjust DB path if we want strictly relative
-    # but "users.db" usually implies current working directory of the process (app root)
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+# --- Connection Pool ---
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that goes back to its pool on close() instead of
+    being torn down, so existing `conn.close()` call sites keep working.
+    Closing it again (an error path plus a `finally`) does nothing, so it
+    can never be handed to two borrowers at once.
+    """
+    _pool = None
+    released = False
 
-def init_db():
-    conn = get_db_connection()
-    # Users Table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            email TEXT,
-            full_name TEXT,
-            hashed_password TEXT,
-            profile_photo_url TEXT,
-            analysis_mode TEXT DEFAULT 'cloud',
-            role TEXT DEFAULT 'candidate',
-            disabled INTEGER DEFAULT 0
-        )
-    ''')
-    
-    # Simple migration check for existing dbs (safe for this hackathon context)
-    try:
-        conn.execute("ALTER TABLE users ADD COLUMN profile_photo_url TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+    def close(self):
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
 
-    try:
-        conn.execute("ALTER TABLE users ADD COLUMN analysis_mode TEXT DEFAULT 'cloud'")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+    def force_close(self):
+        self._pool = None
+        super().close()
 
-    try:
-        conn.execute("ALTER TABLE users ADD COLUMN resume_url TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
 
-    try:
-        conn.execute("ALTER TABLE users ADD COLUMN resume_filename TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+class ConnectionPool:
+    """
+    Keeps up to `max_idle` open SQLite connections per worker process.
 
-    try:
-        conn.execute("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'candidate'")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
-
-    # Meetings Table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS meetings (
-            id TEXT PRIMARY KEY,
-            creator_username TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            active INTEGER DEFAULT 1,
-            duration INTEGER,
-            FOREIGN KEY(creator_username) REFERENCES users(username)
-        )
-    ''')
-    
-    # Migration for existing dbs - add duration column
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN duration INTEGER")
-    except sqlite3.OperationalError:
-        pass  # Column likely exists
-    
-    # Migration for existing dbs - add started_at column
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN started_at TIMESTAMP")
-    except sqlite3.OperationalError:
-        pass  # Column likely exists
-    # Candidates Table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS candidates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            meeting_id TEXT,
-            name TEXT,
-            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(meeting_id) REFERENCES meetings(id)
-        )
-    ''')
-    # Sessions Table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            username TEXT,
-            role TEXT,
-            expires_at TIMESTAMP
-        )
-    ''')
-
-    # Insights Table - NEW
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS insights (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            meeting_id TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            emotion_json TEXT,
-            smart_nudge TEXT,
-            FOREIGN KEY(meeting_id) REFERENCES meetings(id)
-        )
-    ''')
-    
-    # Resume Data Table - NEW (for parsed resume content)
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS resume_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_email TEXT UNIQUE,
-            summary TEXT,
-            personal_info TEXT,          -- JSON
-            skills_soft TEXT,            -- JSON array
-            skills_hard TEXT,            -- JSON array
-            projects TEXT,               -- JSON array
-            achievements TEXT,           -- JSON array
-            certificates TEXT,           -- JSON array (renamed from certifications)
-            education TEXT,              -- JSON array
-            links TEXT,                  -- JSON (portfolio, linkedin, instagram)
-            raw_json TEXT,               -- Full parsed data as JSON backup
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(user_email) REFERENCES users(email)
-        )
-    ''')
+    Connections are opened in WAL mode with tuned PRAGMAs, so readers no
+    longer block behind writers and we stop paying connect/close and
+    journal fsync costs on every request.
+    """
 
-    # Migration for Recording and Ended At
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN recording_url TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
-        
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN ended_at TIMESTAMP")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+    def __init__(self, db_name: str, max_idle: int = DB_POOL_SIZE, tune: bool = True):
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self.tune = tune
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
 
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN candidate_email TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+    def _open(self) -> PooledConnection:
+        # check_same_thread=False: a connection may be released by a different
+        # thread than the one that opened it (e.g. asyncio.to_thread workers).
+        conn = sqlite3.connect(self.db_name, factory=PooledConnection, check_same_thread=False)
+        if self.tune:
+            # auto_vacuum only takes on a brand-new file, and not once it is
+            # in WAL mode, so a fresh database gets it before anything else
+            if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")  # Durable across app crashes in WAL mode
+            conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+            conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+            conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA temp_store = MEMORY")
+        conn._pool = self
+        return conn
 
-    try:
-        conn.execute("ALTER TABLE resume_data ADD COLUMN experience TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        conn.released = False
+        conn.row_factory = sqlite3.Row
+        return conn
 
-    try:
-        conn.execute("ALTER TABLE resume_data ADD COLUMN certificates TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
+    def release(self, conn: PooledConnection):
+        with self._lock:
+            if conn.released:
+                return  # Closed twice; it is already back in the pool
+            conn.released = True
+        try:
+            # Never hand out a connection with a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.force_close()
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.force_close()
 
-    # Duration Tracking Migrations
-    try:
-        conn.execute("ALTER TABLE candidates ADD COLUMN left_at TIMESTAMP")
-    except sqlite3.OperationalError:
-        pass 
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success, rolls back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        finally:
+            conn.close()
 
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN video_duration_seconds INTEGER")
-    except sqlite3.OperationalError:
-        pass
+    def close_all(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.force_close()
 
-    # Insight Timings Migrations
-    try:
-        conn.execute("ALTER TABLE insights ADD COLUMN request_timestamp TIMESTAMP")
-    except sqlite3.OperationalError:
-        pass
 
-    try:
-        conn.execute("ALTER TABLE insights ADD COLUMN relative_seconds INTEGER")
-    except sqlite3.OperationalError:
-        pass
-
-    # Meeting Summaries Table - NEW
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS meeting_summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            meeting_id TEXT,
-            summary TEXT,
-            overall_score INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(meeting_id) REFERENCES meetings(id)
-        )
-    ''')
+class AsyncDatabase:
+    """
+    Async facade over the pool so route handlers never block the event loop.
 
-    # Migration for is_analyzed in Meetings
-    try:
-        conn.execute("ALTER TABLE meetings ADD COLUMN is_analyzed INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass
+    Reads run on a small thread pool using pooled connections. Writes are
+    serialized through a single writer thread that owns its own connection:
+    SQLite only allows one writer at a time anyway, and funnelling writes
+    through one thread avoids busy-timeout stalls between our own workers.
+    """
 
-    conn.commit()
-    conn.close()
+    def __init__(self, pool: ConnectionPool, max_readers: int = DB_READ_WORKERS):
+        self.pool = pool
+        self._readers = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._write_conn = None
+
+    async def _submit(self, executor, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fn, *args))
+
+    def _run_read(self, fn):
+        conn = self.pool.acquire()
+        try:
+            return fn(conn)
+        finally:
+            conn.close()
+
+    def _run_write(self, fn):
+        # Only ever touched from the single writer thread
+        if self._write_conn is None:
+            self._write_conn = self.pool._open()
+            self._write_conn._pool = None
+            self._write_conn.row_factory = sqlite3.Row
+        conn = self._write_conn
+        try:
+            result = fn(conn)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+
+    async def read(self, fn):
+        """Run fn(conn) on a reader thread and return its result."""
+        return await self._submit(self._readers, self._run_read, fn)
+
+    async def write(self, fn):
+        """Run fn(conn) on the writer thread inside one committed transaction."""
+        return await self._submit(self._writer, self._run_write, fn)
+
+    async def fetch_one(self, query: str, params=()):
+        return await self.read(lambda conn: conn.execute(query, params).fetchone())
+
+    async def fetch_all(self, query: str, params=()):
+        return await self.read(lambda conn: conn.execute(query, params).fetchall())
+
+    async def execute(self, query: str, params=()) -> int:
+        """Run a single write statement. Returns the affected row count."""
+        return await self.write(lambda conn: conn.execute(query, params).rowcount)
+
+    async def executemany(self, query: str, seq_of_params) -> int:
+        return await self.write(lambda conn: conn.executemany(query, seq_of_params).rowcount)
+
+    def close(self):
+        self._readers.shutdown(wait=True)
+        self._writer.submit(self._close_writer).result()
+        self._writer.shutdown(wait=True)
+
+    def _close_writer(self):
+        if self._write_conn is not None:
+            self._write_conn.close()
+            self._write_conn = None
+
+
+pool = ConnectionPool(DB_NAME)
+db = AsyncDatabase(pool)
+
+# --- Database Helpers ---
+def get_db_connection():
+    """Borrow a pooled connection. Call conn.close() to hand it back."""
+    return pool.acquire()
+
+def db_connection():
+    """
+    Context-manager form of get_db_connection():
+
+        with db_connection() as conn:
+            conn.execute(...)
+    """
+    return pool.connection()
+
+def init_db() -> int:
+    """Apply pending schema migrations. Returns how many were applied."""
+    conn = get_db_connection()
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
 
 def seed_db():
     conn = get_db_connection()
@@ -212,7 +235,7 @@ def seed_db():
     
     cursor.execute("SELECT * FROM users WHERE username = ?", (seed_email,))
     if cursor.fetchone() is None:
-        print(f"Seeding user: {seed_email}")
+        logger.info("Seeding user: %s", seed_email)
         hashed_pw = pwd_context.hash(seed_password)
         cursor.execute(
             "INSERT INTO users (username, email, full_name, hashed_password) VALUES (?, ?, ?, ?)",
@@ -222,27 +245,24 @@ def seed_db():
     conn.close()
 
 # --- Session Helpers ---
-def create_session(username: str, role: str):
+async def create_session(username: str, role: str):
     session_id = ''.join(random.choices(string.ascii_letters + string.digits, k=32))
     # 30 Days Expiry
     expires_at = datetime.now(timezone.utc) + timedelta(days=30)
     
-    conn = get_db_connection()
-    conn.execute(
+    await db.execute(
         "INSERT INTO sessions (session_id, username, role, expires_at) VALUES (?, ?, ?, ?)",
         (session_id, username, role, expires_at.isoformat())
     )
-    conn.commit()
-    conn.close()
+    if AUTH_TOKEN_MODE == "jwt":
+        return create_access_token(session_id, username, role, expires_at), expires_at
     return session_id, expires_at
 
 
-def get_session_user_from_db(session_id: str):
-    conn = get_db_connection()
-    session = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+async def get_session_user_from_db(session_id: str):
+    session = await db.fetch_one("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
     
-    if not session:
-        conn.close()
+    if not session or session['revoked_at']:
         return None
     
     # Check expiration
@@ -261,21 +281,112 @@ def get_session_user_from_db(session_id: str):
              
         if datetime.now(timezone.utc) > expires_at:
             # Expired
-            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-            conn.commit()
-            conn.close()
+            await db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
             return None
             
     except ValueError:
         # Invalid date format, invalidate session
-        conn.close()
         return None
 
-    conn.close()
     return session
 
-def get_password_hash(password):
+# --- Password Hashing ---
+class PasswordHasherBusy(Exception):
+    """Too many hashes already queued; the caller should retry later."""
+
+    def __init__(self, retry_after: int = PASSWORD_HASH_RETRY_AFTER_SECONDS):
+        super().__init__("Password hashing is busy")
+        self.retry_after = retry_after
+
+
+def _hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_password(plain_password, hashed_password):
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs pbkdf2 in worker processes so a burst of logins cannot stall the
+    event loop (and every WebSocket on it) for hundreds of milliseconds.
+
+    At most `max_pending` hashes may be running or queued at once; past
+    that, PasswordHasherBusy is raised straight away rather than letting
+    latency grow without bound. With workers=0 hashing runs inline, as it
+    used to.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use, so importing this module never forks.
+        # Workers come from a forkserver rather than a fork of this process,
+        # so they do not inherit its sockets, database handles or the room
+        # bus lock, all of which would outlive a crashed worker otherwise.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._executor
+
+    def start(self):
+        """Start the workers now rather than in the middle of the first login."""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for future in [executor.submit(int) for _ in range(self.workers)]:
+                future.result()
+
+    async def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
+
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
@@ -1,8 +1,265 @@
 from fastapi import HTTPException, status, Cookie, Depends, Header
 from typing import Optional
-from core.database import get_session_user_from_db, get_db_connection
+from collections import OrderedDict
+from datetime import datetime, timezone
+import time
+import asyncio
+from core.database import get_session_user_from_db, db
+from core.tokens import decode_access_token, is_access_token
+from core.log import get_logger
+from core.config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS, AUTH_TOKEN_MODE, REVOCATION_REFRESH_SECONDS
 from models import User, UserInDB
 
+logger = get_logger("auth")
+
+# --- Auth Cache ---
+class TTLCache:
+    """LRU cache whose entries also expire after a per-entry TTL."""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (deadline, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=_MISSING):
+        entry = self._data.get(key)
+        if entry is not None:
+            deadline, value = entry
+            if deadline > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def pop_matching(self, predicate):
+        for key in [k for k, (_, value) in self._data.items() if predicate(value)]:
+            del self._data[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+# token -> (username, role); entries never outlive the session itself
+session_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+# username -> UserInDB, or None for session-only users (guest candidates)
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+
+def _expiry_timestamp(expires_at: str) -> float:
+    expires = datetime.fromisoformat(expires_at)
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires.timestamp()
+
+
+class RevocationList:
+    """
+    Revoked sessions that have not expired yet, kept in memory so signed
+    tokens can be checked without a database read.
+
+    The sessions table is the source of truth: revoke() writes revoked_at
+    there, and every worker polls for rows revoked since its last look, so
+    a logout in one worker reaches the others within `interval` seconds.
+    Entries are dropped once the session would have expired anyway, which
+    keeps the set as small as the number of live revoked sessions.
+    """
+
+    def __init__(self, interval: float = REVOCATION_REFRESH_SECONDS):
+        self.interval = interval
+        self._revoked = {}  # session_id -> expiry (epoch seconds)
+        self._watermark = ""  # Newest revoked_at seen so far
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def _add(self, session_id: str, expires_at: str):
+        try:
+            self._revoked[session_id] = _expiry_timestamp(expires_at)
+        except (TypeError, ValueError):
+            self._revoked[session_id] = float("inf")
+        # Opaque session ids are their own cache key
+        session_cache.pop(session_id)
+
+    async def revoke(self, query: str, params: tuple) -> int:
+        """
+        Run an UPDATE that sets revoked_at (first parameter, filled in here)
+        and RETURNs session_id, expires_at; the returned sessions are
+        revoked in this worker immediately and in the others on refresh.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        rows = await db.write(lambda conn: conn.execute(query, (now, *params)).fetchall())
+        for row in rows:
+            self._add(row['session_id'], row['expires_at'])
+        return len(rows)
+
+    async def refresh(self):
+        # >= rather than >: a row revoked in the same microsecond as the
+        # watermark may have committed after our last read
+        rows = await db.fetch_all(
+            "SELECT session_id, expires_at, revoked_at FROM sessions WHERE revoked_at >= ? ORDER BY revoked_at",
+            (self._watermark,)
+        )
+        for row in rows:
+            self._add(row['session_id'], row['expires_at'])
+        if rows:
+            self._watermark = rows[-1]['revoked_at']
+
+        now = time.time()
+        for session_id in [s for s, expiry in self._revoked.items() if expiry <= now]:
+            del self._revoked[session_id]
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Revocation refresh failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+revoked_sessions = RevocationList()
+
+
+def _session_id(token: str) -> Optional[str]:
+    """Row id behind a token: the jti of a signed token, or the token itself."""
+    if is_access_token(token):
+        claims = decode_access_token(token, verify_exp=False)
+        return claims["jti"] if claims else None
+    return token
+
+
+async def revoke_session(token: str):
+    """Log a token out everywhere (logout)."""
+    session_id = _session_id(token)
+    if session_id:
+        await revoked_sessions.revoke(
+            """UPDATE sessions SET revoked_at = ? WHERE session_id = ? AND revoked_at IS NULL
+               RETURNING session_id, expires_at""",
+            (session_id,)
+        )
+    invalidate_session(token)
+
+
+async def revoke_other_sessions(username: str, keep_token: Optional[str] = None) -> int:
+    """Revoke every session of a user except the one in use (password change)."""
+    keep = _session_id(keep_token) if keep_token else None
+    revoked = await revoked_sessions.revoke(
+        """UPDATE sessions SET revoked_at = ? WHERE username = ? AND session_id != ? AND revoked_at IS NULL
+           RETURNING session_id, expires_at""",
+        (username, keep or "")
+    )
+    invalidate_user(username, sessions=True)
+    return revoked
+
+
+def invalidate_session(token: str):
+    """Forget a session token, e.g. on logout."""
+    session_cache.pop(token)
+
+
+def invalidate_user(username: str, sessions: bool = False):
+    """
+    Forget a cached user after their row changed (profile, photo, resume).
+    With sessions=True also drop every cached session of theirs (password change).
+    """
+    user_cache.pop(username)
+    if sessions:
+        session_cache.pop_matching(lambda entry: entry[0] == username)
+
+
+def auth_cache_stats() -> dict:
+    return {
+        "mode": AUTH_TOKEN_MODE,
+        "sessions": session_cache.stats(),
+        "users": user_cache.stats(),
+        "revoked_sessions": len(revoked_sessions),
+    }
+
+
+async def resolve_session(token: str):
+    """(username, role) for a valid session token, or None."""
+    if AUTH_TOKEN_MODE == "jwt" and is_access_token(token):
+        # Signature, expiry and revocation are checked in memory. The sessions
+        # row behind the token is looked up once, the first time it is seen,
+        # so a validly signed token with no session of its own is refused.
+        claims = decode_access_token(token)
+        if claims is None or claims["jti"] in revoked_sessions:
+            return None
+        cached = session_cache.get(token, None)
+        if cached is not None:
+            return cached
+        entry = (claims["sub"], claims["role"])
+        session = await get_session_user_from_db(claims["jti"])
+        if not session or (session['username'], session['role']) != entry:
+            return None
+        session_cache.set(token, entry, ttl=min(AUTH_CACHE_TTL_SECONDS, claims["exp"] - time.time()))
+        return entry
+
+    cached = session_cache.get(token, None)
+    if cached is not None:
+        return cached
+
+    session = await get_session_user_from_db(token)
+    if not session:
+        return None
+
+    entry = (session['username'], session['role'])
+    # get_session_user_from_db already validated the expiry format
+    expires_at = datetime.fromisoformat(session['expires_at'])
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    session_cache.set(token, entry, ttl=min(AUTH_CACHE_TTL_SECONDS, remaining))
+    return entry
+
+
+async def load_user(username: str) -> Optional[UserInDB]:
+    user = user_cache.get(username)
+    if user is TTLCache._MISSING:
+        user_row = await db.fetch_one("SELECT * FROM users WHERE username = ?", (username,))
+        user = UserInDB(**dict(user_row)) if user_row else None
+        user_cache.set(username, user)
+    return user
+
+
 async def get_current_user(
     access_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
@@ -14,38 +271,33 @@ async def get_current_user(
     )
     
     token = access_token
-    print(f"[DEBUG] Cookie: {access_token}, Header: {authorization}") # Debug print
     
     if not token and authorization:
         scheme, _, param = authorization.partition(" ")
         if scheme.lower() == "bearer":
             token = param
             
-    print(f"[DEBUG] Resolved Token: {token}")
+    # Never log the token itself
     if not token:
-        print("[DEBUG] No token found")
+        logger.debug("No token in cookie or Authorization header")
         raise credentials_exception
         
-    session = get_session_user_from_db(token)
+    session = await resolve_session(token)
     if not session:
-        print("[DEBUG] Session not found in DB")
+        logger.debug("Token did not resolve to a live session")
         raise credentials_exception
         
-    username = session['username']
-    role = session['role']
+    username, role = session
     
-    # Fetch user from database (both candidates and interviewers)
-    conn = get_db_connection()
-    user_row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
-    conn.close()
+    # Fetch user (both candidates and interviewers), cached
+    user = await load_user(username)
     
-    if user_row is None:
+    if user is None:
         # For session-only users (e.g., candidates joining via access code without account)
         if role == 'candidate':
             return User(username=username, full_name="Candidate", role="candidate")
         raise credentials_exception
     
-    user = UserInDB(**dict(user_row))
     # Role comes from database, not session (database is source of truth)
     return user
 
@@ -75,23 +327,20 @@ async def get_current_user_ws(
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Missing authentication token")
         raise WebSocketDisconnect()
 
-    session = get_session_user_from_db(token)
+    session = await resolve_session(token)
     if not session:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid session")
         raise WebSocketDisconnect()
         
-    username = session['username']
-    role = session['role']
+    username, role = session
     
-    # Fetch user details
-    conn = get_db_connection()
-    user_row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
-    conn.close()
+    # Fetch user details, cached
+    user = await load_user(username)
     
-    if user_row is None:
+    if user is None:
         if role == 'candidate':
              return User(username=username, full_name="Candidate", role="candidate")
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="User not found")
         raise WebSocketDisconnect()
     
-    return UserInDB(**dict(user_row))
+    return user
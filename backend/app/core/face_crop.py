@@ -0,0 +1,207 @@
+"""
+Face crop and downscale for candidate frames before they go to Gemini.
+
+The client sends a 768x768 JPEG of whatever the camera sees; the model
+only needs the candidate's face. FaceCropper finds the face with the Haar
+cascade bundled with OpenCV, crops a square around it with a margin,
+scales it down to FACE_CROP_SIZE and re-encodes it. Frames without a
+face are only scaled down.
+
+Detection runs on a thread pool of its own (OpenCV releases the GIL).
+The face box is kept per room: the next segment is searched only in the
+region around it, and the whole frame again when the face is lost or
+every FACE_CROP_REDETECT_SEGMENTS segments.
+
+OpenCV is optional: without it (or with a build that has no cascades,
+such as OpenCV 5) frames are sent as they arrive.
+"""
+import time
+import asyncio
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from core.config import (
+    FACE_CROP_SIZE, FACE_CROP_MARGIN, FACE_CROP_JPEG_QUALITY, FACE_CROP_REDETECT_SEGMENTS,
+    FACE_CROP_WORKERS, FACE_CROP_SAMPLES
+)
+from core.log import get_logger
+from core.stats import percentiles_ms
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # Optional: frames go to the model uncropped
+    cv2 = None
+
+logger = get_logger("face_crop")
+
+CASCADE = "haarcascade_frontalface_default.xml"
+DETECT_SIZE = 320  # Longest side of the frame searched for a face
+TRACK_SIZE = 160  # ...and of the region around the last face
+# Smallest face looked for, as a fraction of the searched image: the face
+# fills about a third of the tracked region
+MIN_FACE_FRACTION = 0.1
+MIN_TRACKED_FACE_FRACTION = 0.2
+SCALE_STEP = 1.2  # Between detector passes; 1.1 costs about twice as much
+
+# Outcomes, counted in stats()
+DETECTED = "detected"  # Found by a whole-frame search
+TRACKED = "tracked"  # Found near the previous segment's face
+NO_FACE = "no_face"  # Scaled down uncropped
+UNDECODABLE = "undecodable"  # Sent as it arrived
+
+Box = Tuple[int, int, int, int]  # x, y, width, height in frame pixels
+
+
+class _Track:
+    __slots__ = ("box", "since_detect")
+
+    def __init__(self):
+        self.box: Optional[Box] = None
+        self.since_detect = 0
+
+
+class FaceCropper:
+    def __init__(
+        self,
+        size: int = FACE_CROP_SIZE,
+        margin: float = FACE_CROP_MARGIN,
+        quality: int = FACE_CROP_JPEG_QUALITY,
+        redetect_every: int = FACE_CROP_REDETECT_SEGMENTS,
+        workers: int = FACE_CROP_WORKERS,
+        samples: int = FACE_CROP_SAMPLES
+    ):
+        self.size = size
+        self.margin = margin
+        self.quality = quality
+        self.redetect_every = redetect_every
+        self.workers = workers
+        self.enabled = size > 0 and cv2 is not None and hasattr(cv2, "CascadeClassifier")
+        if size > 0 and not self.enabled:
+            logger.warning("OpenCV with bundled face cascades is not installed; frames are sent uncropped")
+        self.rooms: Dict[str, _Track] = {}
+        self.outcomes = {DETECTED: 0, TRACKED: 0, NO_FACE: 0, UNDECODABLE: 0}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._process_times: deque = deque(maxlen=samples)  # Seconds
+        # Model call time by whether the frame went through process()
+        self._model_times = {"original": deque(maxlen=samples), "processed": deque(maxlen=samples)}
+        self._local = threading.local()  # A CascadeClassifier must not be shared between threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def process(self, room_id: Optional[str], jpeg: bytes) -> bytes:
+        """
+        The frame to send to the model: cropped and scaled down, or as it was.
+        With room_id None the frame stands alone: the whole frame is searched
+        and no face box is kept.
+        """
+        if not self.enabled:
+            return jpeg
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="face-crop")
+        track = _Track() if room_id is None else self.rooms.setdefault(room_id, _Track())
+        started = time.perf_counter()
+        out, outcome = await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(self._process, jpeg, track)
+        )
+        self._process_times.append(time.perf_counter() - started)
+        self.outcomes[outcome] += 1
+        self.bytes_in += len(jpeg)
+        self.bytes_out += len(out)
+        return out
+
+    def record_model_call(self, seconds: float):
+        """Time of a model call on a frame; compare with FACE_CROP_SIZE=0."""
+        self._model_times["processed" if self.enabled else "original"].append(seconds)
+
+    def forget(self, room_id: str):
+        self.rooms.pop(room_id, None)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # --- Worker threads ---
+
+    def _cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = self._local.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + CASCADE)
+        return cascade
+
+    def _detect(self, gray, region: Box, max_side: int, min_fraction: float) -> Optional[Box]:
+        """The largest face in a region of the frame, searched at most max_side wide."""
+        x, y, w, h = region
+        scale = min(1.0, max_side / max(w, h))
+        image = gray[y:y + h, x:x + w]
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_side = max(24, int(min(image.shape[:2]) * min_fraction))
+        faces = self._cascade().detectMultiScale(image, scaleFactor=SCALE_STEP, minNeighbors=5, minSize=(min_side, min_side))
+        if len(faces) == 0:
+            return None
+        fx, fy, fw, fh = max(faces, key=lambda face: face[2] * face[3])
+        return (x + int(fx / scale), y + int(fy / scale), int(fw / scale), int(fh / scale))
+
+    @staticmethod
+    def _around(box: Box, grow: float, width: int, height: int) -> Box:
+        """A square around box, `grow` times its size added on each side, inside the frame."""
+        x, y, w, h = box
+        side = min(int(max(w, h) * (1 + 2 * grow)), width, height)
+        left = min(max(0, x + w // 2 - side // 2), width - side)
+        top = min(max(0, y + h // 2 - side // 2), height - side)
+        return (left, top, side, side)
+
+    def _process(self, jpeg: bytes, track: _Track) -> Tuple[bytes, str]:
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return jpeg, UNDECODABLE
+        height, width = image.shape[:2]
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        face = None
+        if track.box is not None and track.since_detect < self.redetect_every:
+            region = self._around(track.box, 1.0, width, height)
+            face = self._detect(gray, region, TRACK_SIZE, MIN_TRACKED_FACE_FRACTION)
+        if face is not None:
+            outcome = TRACKED
+            track.since_detect += 1
+        else:
+            face = self._detect(gray, (0, 0, width, height), DETECT_SIZE, MIN_FACE_FRACTION)
+            outcome = DETECTED if face is not None else NO_FACE
+            track.since_detect = 0
+        track.box = face
+
+        if face is not None:
+            x, y, w, h = self._around(face, self.margin, width, height)
+            image = image[y:y + h, x:x + w]
+        scale = self.size / max(image.shape[:2])
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok or (face is None and len(encoded) >= len(jpeg)):
+            return jpeg, outcome
+        return encoded.tobytes(), outcome
+
+    def stats(self) -> dict:
+        stats = {
+            "enabled": self.enabled,
+            "size": self.size,
+            "rooms_tracked": len(self.rooms),
+            **self.outcomes,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+        if self._process_times:
+            stats["process_ms"] = percentiles_ms(self._process_times)
+        for frames, times in self._model_times.items():
+            if times:
+                stats[f"model_ms_{frames}"] = percentiles_ms(times)
+        return stats
+
+
+face_cropper = FaceCropper()
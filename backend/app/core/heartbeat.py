@@ -0,0 +1,137 @@
+"""
+Server-driven WebSocket heartbeat.
+
+Liveness used to depend on clients sending {"type": "ping"}, so a
+half-open connection stayed in its room until the next failed send, and
+in a two-person signaling room a ghost socket locked the real participant
+out. Every registered socket is now sent {"type": "heartbeat"} each
+`interval` seconds by one shared timer task, and any message received
+from it (clients answer with {"type": "heartbeat_ack"}) counts as alive.
+A socket that misses `missed_limit` heartbeats in a row is closed, and
+its endpoint's receive loop runs the usual cleanup: the seat goes back to
+the bus and candidates.left_at is written.
+"""
+import asyncio
+from typing import Callable, Dict, Optional, Set
+from fastapi import WebSocket
+from core import ws_codec
+from core.log import get_logger
+from core.config import HEARTBEAT_INTERVAL_SECONDS, HEARTBEAT_MISSED_LIMIT
+
+logger = get_logger("heartbeat")
+
+HEARTBEAT = "heartbeat"
+HEARTBEAT_ACK = "heartbeat_ack"
+
+CLOSE_HEARTBEAT_TIMEOUT = 4008
+
+_HEARTBEAT_TEXT = ws_codec.dumps({"type": HEARTBEAT})
+
+
+class _Connection:
+    __slots__ = ("websocket", "name", "send", "missed", "sending")
+
+    def __init__(self, websocket: WebSocket, name: str, send: Optional[Callable[[str], bool]]):
+        self.websocket = websocket
+        self.name = name
+        self.send = send  # e.g. SendQueue.send; None sends directly on the socket
+        self.missed = 0
+        self.sending: Optional[asyncio.Task] = None
+
+
+class Heartbeat:
+    """
+    One timer for every socket, rather than a task per connection. The
+    timer task runs while at least one socket is registered.
+    """
+
+    def __init__(
+        self,
+        interval: float = HEARTBEAT_INTERVAL_SECONDS,
+        missed_limit: int = HEARTBEAT_MISSED_LIMIT
+    ):
+        self.interval = interval
+        self.missed_limit = missed_limit
+        self.connections: Dict[WebSocket, _Connection] = {}
+        self.sent = 0
+        self.evicted = 0
+        self._closers: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def add(self, websocket: WebSocket, name: str = "", send: Optional[Callable[[str], bool]] = None):
+        """Start watching an accepted socket."""
+        if not self.enabled:
+            return
+        self.connections[websocket] = _Connection(websocket, name, send)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def discard(self, websocket: WebSocket):
+        conn = self.connections.pop(websocket, None)
+        if conn is not None and conn.sending is not None:
+            conn.sending.cancel()
+
+    def seen(self, websocket: WebSocket):
+        """Record that a message arrived from the socket."""
+        conn = self.connections.get(websocket)
+        if conn is not None:
+            conn.missed = 0
+
+    async def _run(self):
+        while self.connections:
+            await asyncio.sleep(self.interval)
+            self.beat()
+
+    def beat(self):
+        """Evict sockets over the missed limit and send the others a heartbeat."""
+        for conn in list(self.connections.values()):
+            if conn.missed >= self.missed_limit:
+                self._evict(conn)
+                continue
+            conn.missed += 1
+            if conn.send is not None:
+                conn.send(_HEARTBEAT_TEXT)
+            elif conn.sending is None or conn.sending.done():
+                # A send still pending from the last beat means the socket
+                # is not reading; it counts as missed either way
+                conn.sending = asyncio.create_task(self._send(conn))
+            self.sent += 1
+
+    async def _send(self, conn: _Connection):
+        try:
+            await conn.websocket.send_text(_HEARTBEAT_TEXT)
+        except Exception as e:
+            logger.debug("Heartbeat to %s failed: %s", conn.name, e)
+
+    def _evict(self, conn: _Connection):
+        self.discard(conn.websocket)
+        self.evicted += 1
+        logger.warning("Closing %s: no reply to %d heartbeats", conn.name, conn.missed)
+        closer = asyncio.create_task(self._close(conn))
+        self._closers.add(closer)
+        closer.add_done_callback(self._closers.discard)
+
+    async def _close(self, conn: _Connection):
+        """Close the socket; its receive loop then sees the disconnect and cleans up."""
+        try:
+            await asyncio.wait_for(
+                conn.websocket.close(code=CLOSE_HEARTBEAT_TIMEOUT, reason="Heartbeat timeout"), self.interval
+            )
+        except Exception as e:
+            logger.debug("Close of %s failed: %s", conn.name, e)
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "missed_limit": self.missed_limit,
+            "connections": len(self.connections),
+            "sent": self.sent,
+            "evicted": self.evicted,
+        }
+
+
+heartbeat = Heartbeat()
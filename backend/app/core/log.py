@@ -0,0 +1,121 @@
+"""
+Logging for the app.
+
+Records are handed to a queue on the calling thread and written to
+stdout by a background listener thread, so a slow terminal or log
+collector never blocks the event loop. Every module logs through
+get_logger("<module>"), i.e. the "sense.<module>" logger, so levels can
+be set per module with LOG_LEVELS.
+
+Per-message logs (one per relayed signaling message or analysed frame)
+go through sampled(), and every record passes a redaction filter so
+session ids, signed tokens, passwords and API keys never reach the log.
+"""
+import re
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+from core.config import LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_EVERY
+
+ROOT = "sense"
+
+_SECRET_PATTERNS = [
+    # Signed tokens (JWTs) anywhere in the text
+    (re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]+"), "[REDACTED]"),
+    (re.compile(r"(?i)\b(bearer\s+)\S+"), r"\1[REDACTED]"),
+    # key=value / key: value / "key": "value" for anything credential-like
+    (re.compile(r"(?i)\b(access_token|token|session_id|password|cookie|authorization|api_key|secret)"
+                r"(['\"]?\s*[:=]\s*['\"]?)[^\s'\",;&}]+"), r"\1\2[REDACTED]"),
+]
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    """Formats the message once and scrubs secrets from it (and any traceback)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return True
+
+
+class SampledLogger:
+    """
+    Emits one call in every `every` for high-rate messages. The level
+    check comes first, so a disabled level costs a single comparison.
+
+        relay_log = sampled(logger)
+        relay_log.debug("relayed %s", msg_type)
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = LOG_SAMPLE_EVERY):
+        self.logger = logger
+        self.every = max(1, every)
+        self._count = 0
+
+    def _log(self, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        self._count += 1
+        if (self._count - 1) % self.every == 0:
+            self.logger.log(level, f"{msg} [1 of every {self.every}]" if self.every > 1 else msg, *args)
+
+    def debug(self, msg: str, *args):
+        self._log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args):
+        self._log(logging.INFO, msg, *args)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def sampled(logger: logging.Logger, every: int = LOG_SAMPLE_EVERY) -> SampledLogger:
+    return SampledLogger(logger, every)
+
+
+_listener = None
+
+
+def setup_logging():
+    """Install the queue handler and start the writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RedactingFilter())
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(LOG_LEVEL.upper())
+    root.addHandler(handler)
+    root.propagate = False
+    for name, level in LOG_LEVELS.items():
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush everything still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,105 @@
+"""
+Background database maintenance.
+
+Expired sessions used to be deleted only when someone presented that exact
+token, so the sessions table grew with every signup and login. The sweeper
+deletes them in bounded batches on a timer and then returns the freed pages
+with an incremental vacuum.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from core.database import db
+from core.log import get_logger
+from core.config import SESSION_SWEEP_INTERVAL_SECONDS, SESSION_SWEEP_BATCH, INCREMENTAL_VACUUM_PAGES
+
+logger = get_logger("maintenance")
+
+
+class SessionSweeper:
+    def __init__(
+        self,
+        interval: float = SESSION_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = SESSION_SWEEP_BATCH,
+        vacuum_pages: int = INCREMENTAL_VACUUM_PAGES
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.rows_reclaimed = 0
+        self.pages_reclaimed = 0
+        self.last_run: Optional[dict] = None
+
+    async def sweep(self) -> dict:
+        """Delete every session that has expired, one batch per transaction."""
+        # expires_at is stored as an ISO-8601 UTC string, so string order is time order
+        now = datetime.now(timezone.utc).isoformat()
+        deleted = 0
+        while True:
+            count = await db.execute(
+                """DELETE FROM sessions WHERE rowid IN (
+                       SELECT rowid FROM sessions WHERE expires_at < ? LIMIT ?
+                   )""",
+                (now, self.batch_size)
+            )
+            deleted += count
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(0)  # Let queued request writes in between batches
+
+        pages = await db.write(self._incremental_vacuum)
+
+        self.runs += 1
+        self.rows_reclaimed += deleted
+        self.pages_reclaimed += pages
+        self.last_run = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "sessions_deleted": deleted,
+            "pages_freed": pages,
+        }
+        if deleted or pages:
+            logger.info("Deleted %d expired sessions, freed %d pages", deleted, pages)
+        return self.last_run
+
+    def _incremental_vacuum(self, conn) -> int:
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # execute() steps a row-less PRAGMA once, which frees a single page;
+        # executescript() runs it to completion.
+        conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return before - after
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.exception("Session sweep failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "sessions_deleted": self.rows_reclaimed,
+            "pages_freed": self.pages_reclaimed,
+            "last_run": self.last_run,
+        }
+
+
+session_sweeper = SessionSweeper()
@@ -0,0 +1,222 @@
+"""
+Meeting deadlines, kept in memory.
+
+The interview room used to ask GET /auth/meetings/{id}/remaining-time,
+a SELECT * and a timestamp parse per call. Each worker now loads a
+meeting's duration and start time once, and one timer task pushes
+{"type": "clock"} (every `sync_every` seconds, and to each peer as it
+connects) and a single {"type": "expired"} over the signaling sockets of
+the rooms it is watching. The REST endpoint answers from the same state.
+
+Start, duration changes, end and delete go out on the room bus, so every
+worker updates (or drops) its copy and no worker serves a stale deadline.
+"""
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+from core.bus import RoomBus, room_bus
+from core.database import db
+from core.log import get_logger
+from core.config import MEETING_CLOCK_TICK_SECONDS, MEETING_CLOCK_SYNC_SECONDS, MEETING_CLOCK_CACHE_SIZE
+
+logger = get_logger("meeting_clock")
+
+CHANNEL = "meeting-clock"
+
+
+def _epoch(started_at: str) -> float:
+    """started_at as stored by datetime.utcnow() -> seconds since the epoch."""
+    started = datetime.fromisoformat(str(started_at).replace(' ', 'T'))
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    return started.timestamp()
+
+
+class MeetingDeadline:
+    __slots__ = ("duration", "started_at", "started")
+
+    def __init__(self, duration: Optional[int], started_at: Optional[str]):
+        self.duration = duration  # Minutes, None for no limit
+        self.started_at = started_at  # As stored, for the REST response
+        self.started = _epoch(started_at) if started_at is not None else None
+
+    def remaining(self, now: float) -> Optional[float]:
+        if self.duration is None:
+            return None
+        if self.started is None:
+            return self.duration * 60
+        return max(0, self.duration * 60 - (now - self.started))
+
+    def as_dict(self, now: float) -> dict:
+        """The remaining-time response."""
+        remaining = self.remaining(now)
+        if remaining is None:
+            return {"remaining_seconds": None, "is_expired": False}
+        if self.started is None:
+            return {"remaining_seconds": int(remaining), "is_expired": False}
+        return {
+            "remaining_seconds": int(remaining),
+            "is_expired": remaining <= 0,
+            "duration_minutes": self.duration,
+            "started_at": self.started_at,
+        }
+
+    def clock_message(self, now: float) -> dict:
+        remaining = self.remaining(now)
+        return {
+            "type": "clock",
+            "remaining_seconds": None if remaining is None else int(remaining),
+            "duration_minutes": self.duration,
+            "started": self.started is not None,
+        }
+
+
+class _Watch:
+    __slots__ = ("push", "synced", "expired")
+
+    def __init__(self, push: Callable[[str, dict], None]):
+        self.push = push  # (room_id, message), e.g. ConnectionManager.send_to_room
+        self.synced = 0.0
+        self.expired = False
+
+
+class MeetingClock:
+    def __init__(
+        self,
+        bus: RoomBus = room_bus,
+        interval: float = MEETING_CLOCK_TICK_SECONDS,
+        sync_every: float = MEETING_CLOCK_SYNC_SECONDS,
+        cache_size: int = MEETING_CLOCK_CACHE_SIZE
+    ):
+        self.bus = bus
+        self.interval = interval
+        self.sync_every = sync_every
+        self.cache_size = cache_size
+        self._meetings: "OrderedDict[str, MeetingDeadline]" = OrderedDict()
+        self.watched: Dict[str, _Watch] = {}
+        self.loads = 0
+        self.pushed = 0
+        self.expired = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.bus.subscribe(CHANNEL, self._apply)
+
+    async def stop(self):
+        await self.bus.unsubscribe(CHANNEL, self._apply)
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def get(self, meeting_id: str) -> Optional[MeetingDeadline]:
+        """The meeting's deadline, read from the database only on first use."""
+        deadline = self._meetings.get(meeting_id)
+        if deadline is not None:
+            self._meetings.move_to_end(meeting_id)
+            return deadline
+        row = await db.fetch_one("SELECT duration, started_at FROM meetings WHERE id = ?", (meeting_id,))
+        if row is None:
+            return None
+        self.loads += 1
+        deadline = self._meetings.get(meeting_id)  # Loaded meanwhile, or updated over the bus
+        if deadline is None:
+            deadline = MeetingDeadline(row["duration"], row["started_at"])
+            self._remember(meeting_id, deadline)
+        return deadline
+
+    def _remember(self, meeting_id: str, deadline: MeetingDeadline):
+        self._meetings[meeting_id] = deadline
+        for key in list(self._meetings):
+            if len(self._meetings) <= self.cache_size:
+                break
+            if key not in self.watched:
+                del self._meetings[key]
+
+    async def update(self, meeting_id: str, **changes):
+        """
+        Tell every worker a meeting changed: duration=..., started_at=...,
+        or forget=True once it has ended or been deleted.
+        """
+        await self.bus.publish(CHANNEL, {"meeting": meeting_id, **changes})
+
+    async def _apply(self, channel: str, message: dict):
+        meeting_id = message["meeting"]
+        if message.get("forget"):
+            self._meetings.pop(meeting_id, None)
+            return
+        deadline = self._meetings.get(meeting_id)
+        if deadline is None:
+            return  # Loaded from the database when it is next needed
+        if "duration" in message:
+            deadline.duration = message["duration"]
+        if "started_at" in message:
+            deadline.started_at = message["started_at"]
+            deadline.started = _epoch(message["started_at"])
+        watch = self.watched.get(meeting_id)
+        if watch is not None:
+            watch.expired = False  # The new deadline may be later
+            self._push(meeting_id, watch, deadline.clock_message(time.time()))
+
+    async def watch(self, room_id: str, push: Callable[[str, dict], None]) -> Optional[dict]:
+        """
+        Push clock events for a room until unwatch(); returns the current
+        clock message for the peer that just connected (None if the
+        meeting does not exist).
+        """
+        if room_id not in self.watched:
+            # Before loading, so an unwatch() meanwhile is not undone
+            self.watched[room_id] = _Watch(push)
+            self.watched[room_id].synced = time.time()
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._run())
+        deadline = await self.get(room_id)
+        if deadline is None:
+            return None
+        return deadline.clock_message(time.time())
+
+    def unwatch(self, room_id: str):
+        self.watched.pop(room_id, None)
+
+    def _push(self, room_id: str, watch: _Watch, message: dict):
+        try:
+            watch.push(room_id, message)
+            self.pushed += 1
+        except Exception as e:
+            logger.warning("Clock push to room '%s' failed: %s", room_id, e)
+
+    async def _run(self):
+        while self.watched:
+            await asyncio.sleep(self.interval)
+            self.tick(time.time())
+
+    def tick(self, now: float):
+        for room_id, watch in list(self.watched.items()):
+            deadline = self._meetings.get(room_id)
+            if deadline is None or watch.expired:
+                continue
+            remaining = deadline.remaining(now)
+            if remaining is not None and deadline.started is not None and remaining <= 0:
+                watch.expired = True
+                self.expired += 1
+                logger.info("Meeting '%s' reached its %d minute limit", room_id, deadline.duration)
+                self._push(room_id, watch, {"type": "expired"})
+            elif now - watch.synced >= self.sync_every:
+                watch.synced = now
+                self._push(room_id, watch, deadline.clock_message(now))
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._meetings),
+            "watched": len(self.watched),
+            "loads": self.loads,
+            "pushed": self.pushed,
+            "expired": self.expired,
+        }
+
+
+meeting_clock = MeetingClock()
@@ -0,0 +1,98 @@
+"""
+In-process token-bucket rate limiting.
+
+Each policy in RATE_LIMITS allows `burst` requests at once and refills
+at `per_minute`. Buckets are keyed by whatever identifies the caller for
+that route (client IP, account name) and cost two floats each. A bucket
+that has been idle long enough to refill completely is indistinguishable
+from a new one, so it is dropped, which keeps memory bounded by the
+number of recently active keys.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from core.config import RATE_LIMITS, RATE_LIMIT_MAX_KEYS
+from core.log import get_logger
+
+logger = get_logger("rate_limit")
+
+
+class TokenBucketLimiter:
+    def __init__(self, burst: int, per_minute: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self.refill_seconds = burst / self.rate
+        self._buckets: OrderedDict = OrderedDict()  # key -> [tokens, last_seen], oldest first
+        self.allowed = 0
+        self.limited = 0
+
+    def _evict(self, now: float):
+        # Least recently seen first, so stop at the first bucket still refilling
+        while self._buckets:
+            key, (_, last_seen) = next(iter(self._buckets.items()))
+            if now - last_seen < self.refill_seconds and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def hit(self, key: str) -> Optional[float]:
+        """Take one token for key. Returns None if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        self._evict(now)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            return None
+        self.limited += 1
+        return (1 - bucket[0]) / self.rate
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+limiters = {name: TokenBucketLimiter(burst, per_minute) for name, (burst, per_minute) in RATE_LIMITS.items()}
+
+
+def check_rate_limit(policy: str, key: str):
+    """Raise 429 with Retry-After if `key` has used up its `policy` bucket."""
+    retry_after = limiters[policy].hit(key)
+    if retry_after is not None:
+        logger.warning("%s limit hit for %s", policy, key)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """
+    Route dependency limiting each client IP under one policy:
+
+        @router.post("/x", dependencies=[Depends(RateLimit("analyze"))])
+    """
+
+    def __init__(self, policy: str):
+        if policy not in limiters:
+            raise KeyError(f"No rate limit policy named {policy!r}")
+        self.policy = policy
+
+    async def __call__(self, request: Request):
+        check_rate_limit(self.policy, client_ip(request))
+
+
+def rate_limit_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,357 @@
+"""
+Database schema and versioned migrations.
+
+The schema lives here and nowhere else: init_db() and scripts/reset_db.py
+both call migrate(). Every step is recorded in the `schema_version` table,
+so a database that is already current costs a single version lookup at
+startup.
+
+To change the schema, append a new (version, description, step) entry to
+MIGRATIONS. Never edit a step that has already shipped. Steps must be
+idempotent, because databases created before versioning existed replay
+every step from version 1. A step that cannot run inside a transaction
+(VACUUM) sets `step.transactional = False`.
+"""
+import sqlite3
+from .log import get_logger
+
+logger = get_logger("db")
+
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table: str, column: str, declaration: str):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+# --- Migration Steps ---
+def _create_base_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            email TEXT,
+            full_name TEXT,
+            hashed_password TEXT,
+            profile_photo_url TEXT,
+            analysis_mode TEXT DEFAULT 'cloud',
+            role TEXT DEFAULT 'candidate',
+            disabled INTEGER DEFAULT 0,
+            resume_url TEXT,
+            resume_filename TEXT
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS meetings (
+            id TEXT PRIMARY KEY,
+            creator_username TEXT,
+            candidate_email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            ended_at TIMESTAMP,
+            active INTEGER DEFAULT 1,
+            duration INTEGER,
+            recording_url TEXT,
+            video_duration_seconds INTEGER,
+            interviewer_joined INTEGER DEFAULT 0,
+            is_analyzed INTEGER DEFAULT 0,
+            FOREIGN KEY(creator_username) REFERENCES users(username)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meeting_id TEXT,
+            name TEXT,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            left_at TIMESTAMP,
+            FOREIGN KEY(meeting_id) REFERENCES meetings(id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            username TEXT,
+            role TEXT,
+            expires_at TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS insights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meeting_id TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            emotion_json TEXT,
+            smart_nudge TEXT,
+            request_timestamp TIMESTAMP,
+            relative_seconds INTEGER,
+            FOREIGN KEY(meeting_id) REFERENCES meetings(id)
+        )
+    ''')
+
+    # Parsed resume content
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS resume_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT UNIQUE,
+            summary TEXT,
+            personal_info TEXT,          -- JSON
+            experience TEXT,             -- JSON array
+            skills_soft TEXT,            -- JSON array
+            skills_hard TEXT,            -- JSON array
+            projects TEXT,               -- JSON array
+            achievements TEXT,           -- JSON array
+            certificates TEXT,           -- JSON array (renamed from certifications)
+            education TEXT,              -- JSON array
+            links TEXT,                  -- JSON (portfolio, linkedin, instagram)
+            raw_json TEXT,               -- Full parsed data as JSON backup
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_email) REFERENCES users(email)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS meeting_summaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meeting_id TEXT,
+            summary TEXT,
+            overall_score INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(meeting_id) REFERENCES meetings(id)
+        )
+    ''')
+
+
+def _add_pre_versioning_columns(conn):
+    # Columns that were bolted on with try/except ALTER TABLE before this
+    # module existed. Databases created by step 1 already have all of them.
+    _add_column(conn, "users", "profile_photo_url", "TEXT")
+    _add_column(conn, "users", "analysis_mode", "TEXT DEFAULT 'cloud'")
+    _add_column(conn, "users", "resume_url", "TEXT")
+    _add_column(conn, "users", "resume_filename", "TEXT")
+    _add_column(conn, "users", "role", "TEXT DEFAULT 'candidate'")
+
+    _add_column(conn, "meetings", "candidate_email", "TEXT")
+    _add_column(conn, "meetings", "duration", "INTEGER")
+    _add_column(conn, "meetings", "started_at", "TIMESTAMP")
+    _add_column(conn, "meetings", "ended_at", "TIMESTAMP")
+    _add_column(conn, "meetings", "recording_url", "TEXT")
+    _add_column(conn, "meetings", "video_duration_seconds", "INTEGER")
+    _add_column(conn, "meetings", "interviewer_joined", "INTEGER DEFAULT 0")
+    _add_column(conn, "meetings", "is_analyzed", "INTEGER DEFAULT 0")
+
+    _add_column(conn, "candidates", "left_at", "TIMESTAMP")
+
+    _add_column(conn, "insights", "request_timestamp", "TIMESTAMP")
+    _add_column(conn, "insights", "relative_seconds", "INTEGER")
+
+    _add_column(conn, "resume_data", "experience", "TEXT")
+    _add_column(conn, "resume_data", "certificates", "TEXT")
+
+
+class MigrationError(Exception):
+    """A step cannot run on this database without losing or mixing up data."""
+
+
+def _normalize_meeting_ids(conn):
+    # Routes lower-case every meeting id before querying, so store them
+    # lower-cased too and the plain BINARY indexes below can serve lookups.
+    # Two meetings that differ only in case would merge; stop and name them.
+    collisions = conn.execute(
+        "SELECT group_concat(id, ', ') FROM meetings GROUP BY lower(id) HAVING count(*) > 1"
+    ).fetchall()
+    if collisions:
+        raise MigrationError(
+            "Meeting ids that differ only in case, rename or remove one of each before upgrading: "
+            + "; ".join(row[0] for row in collisions)
+        )
+    # Children follow their own meeting only; rows with no meeting are left alone
+    for table in ("candidates", "insights", "meeting_summaries"):
+        conn.execute(f"""
+            UPDATE {table} SET meeting_id = lower(meeting_id)
+            WHERE meeting_id IN (SELECT id FROM meetings WHERE id != lower(id))
+        """)
+    conn.execute("UPDATE meetings SET id = lower(id) WHERE id != lower(id)")
+
+
+def _create_hot_path_indexes(conn):
+    _normalize_meeting_ids(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_creator_created ON meetings(creator_username, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_candidate_created ON meetings(candidate_email, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_meeting_name ON candidates(meeting_id, name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_meeting_relative ON insights(meeting_id, relative_seconds)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_meeting_timestamp ON insights(meeting_id, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meeting_summaries_meeting ON meeting_summaries(meeting_id)")
+    # resume_data.user_email is UNIQUE, so SQLite already keeps an index for it
+    conn.execute("ANALYZE")
+
+
+def _index_session_expiry(conn):
+    # Lets core.maintenance delete expired sessions without scanning the table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+
+
+def _enable_incremental_vacuum(conn):
+    # Lets the sweeper hand freed pages back with PRAGMA incremental_vacuum.
+    # New databases get it before WAL and their first table (see
+    # ConnectionPool._open and migrate()); on an existing file it only takes
+    # effect after a full VACUUM, which rewrites the whole file, so that is
+    # left to scripts/vacuum_db.py rather than holding up every worker's
+    # startup.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        logger.warning("auto_vacuum is not incremental yet; run scripts/vacuum_db.py once to compact the file")
+
+_enable_incremental_vacuum.transactional = False
+
+
+# emotion_meter component -> typed insights column
+EMOTION_METER_COLUMNS = {
+    "anticipation": "em_anticipation",
+    "anxiety": "em_anxiety",
+    "self-doubt": "em_self_doubt",
+    "determination": "em_determination",
+    "relief": "em_relief",
+    "excitement": "em_excitement",
+    "neutral": "em_neutral",
+}
+
+
+def _add_insight_metric_columns(conn):
+    # The hot fields of emotion_json as real columns, so reports can aggregate
+    # in SQL. Precedence matches the report page: dominant_emotion before
+    # primary, confident_meter before the derived confidence.
+    _add_column(conn, "insights", "dominant_emotion", "TEXT")
+    _add_column(conn, "insights", "confidence", "INTEGER")
+    for column in EMOTION_METER_COLUMNS.values():
+        _add_column(conn, "insights", column, "INTEGER")
+
+    meters = ", ".join(
+        f"{column} = CAST(json_extract(emotion_json, '$.emotion_meter.\"{key}\"') AS INTEGER)"
+        for key, column in EMOTION_METER_COLUMNS.items()
+    )
+    conn.execute(f'''
+        UPDATE insights SET
+            dominant_emotion = COALESCE(json_extract(emotion_json, '$.dominant_emotion'),
+                                        json_extract(emotion_json, '$.primary')),
+            confidence = CAST(COALESCE(json_extract(emotion_json, '$.confident_meter'),
+                                       json_extract(emotion_json, '$.confidence')) AS INTEGER),
+            {meters}
+        WHERE json_valid(emotion_json)
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_meeting_emotion ON insights(meeting_id, dominant_emotion, confidence)")
+
+
+def _index_meeting_keyset(conn):
+    # Meeting lists page on (created_at, id); with id in the index the
+    # keyset comparison and the ORDER BY are both served without sorting.
+    conn.execute("DROP INDEX IF EXISTS idx_meetings_creator_created")
+    conn.execute("DROP INDEX IF EXISTS idx_meetings_candidate_created")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_creator_created_id ON meetings(creator_username, created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_candidate_created_id ON meetings(candidate_email, created_at, id)")
+
+
+def _index_insights_by_meeting_id(conn):
+    # (meeting_id, rowid): lets report polling read only the insights after
+    # a given id, in id order, without touching older rows.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_insights_meeting ON insights(meeting_id)")
+
+
+def _add_session_revocation(conn):
+    # Logout and password changes mark sessions revoked instead of deleting
+    # them, so every worker can pick revocations up (core.dependencies).
+    _add_column(conn, "sessions", "revoked_at", "TIMESTAMP")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_revoked_at ON sessions(revoked_at) WHERE revoked_at IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions(username)")
+
+
+# (version, description, step). Append only.
+MIGRATIONS = [
+    (1, "base schema", _create_base_tables),
+    (2, "columns added before schema versioning", _add_pre_versioning_columns),
+    (3, "indexes for hot lookups, lower-cased meeting ids", _create_hot_path_indexes),
+    (4, "index sessions by expiry", _index_session_expiry),
+    (5, "incremental auto-vacuum", _enable_incremental_vacuum),
+    (6, "typed insight metric columns", _add_insight_metric_columns),
+    (7, "keyset indexes for meeting lists", _index_meeting_keyset),
+    (8, "index insights by meeting and id", _index_insights_by_meeting_id),
+    (9, "session revocation", _add_session_revocation),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Runner ---
+def get_schema_version(conn) -> int:
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0  # Database predates versioning (or is empty)
+    return row[0] or 0
+
+
+def migrate(conn) -> int:
+    """
+    Bring the database up to SCHEMA_VERSION.
+    Returns the number of steps applied (0 when already current).
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return 0
+
+    # On an empty file auto_vacuum takes effect as long as no table exists
+    # yet and the file is not in WAL mode (ConnectionPool sets it before WAL)
+    if conn.execute("SELECT count(*) FROM sqlite_master").fetchone()[0] == 0:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    applied = 0
+    for version, description, step in MIGRATIONS:
+        if not getattr(step, "transactional", True):
+            if get_schema_version(conn) >= version:
+                continue
+            step(conn)  # Idempotent, so racing workers may both run it safely
+        # BEGIN IMMEDIATE takes the write lock up front, so when several
+        # workers start together only one of them applies each step.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            if getattr(step, "transactional", True):
+                step(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Applied migration %d: %s", version, description)
+        applied += 1
+    return applied
+
+
+def drop_all_tables(conn):
+    """Drop every table, including schema_version. Used by scripts/reset_db.py."""
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for (name,) in tables:
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+    conn.commit()
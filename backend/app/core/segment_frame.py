@@ -0,0 +1,83 @@
+"""
+Binary candidate segments for /api/gemini/ws/emotion/{room_id}.
+
+The JSON protocol sends each 7-second segment as a base64 data URL JPEG and
+a base64 WAV: a third more bytes on the wire, then a large JSON parse, a
+split(",") copy and a b64decode per part on the server. A binary frame is a
+fixed header followed by the raw bytes:
+
+    offset  size  field
+    0       2     magic b"SG"
+    2       1     version (1)
+    3       1     flags (bit 0: a capture time follows the header)
+    4       4     JPEG length, little-endian
+    8       4     WAV length, little-endian (0: no audio)
+    12      8     capture time, only with flag bit 0: milliseconds since
+                  the Unix epoch on the client's clock, float64 little-endian
+    ...     ...   JPEG bytes, then WAV bytes
+
+The capture time lets the server measure insight staleness from when the
+segment was taken rather than from when it arrived.
+
+decode() slices the two parts straight out of the received frame; they go
+to types.Blob as they are (it only accepts bytes, so one slice per part is
+the only copy left). JSON messages stay supported for older clients.
+"""
+import struct
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+MAGIC = b"SG"
+VERSION = 1
+HEADER = struct.Struct("<2sBBII")
+CAPTURED_AT = struct.Struct("<d")
+FLAG_CAPTURED_AT = 0x01
+
+
+class SegmentFrameError(ValueError):
+    """A binary frame that is not a well-formed segment."""
+
+
+class Segment(NamedTuple):
+    video: bytes
+    audio: Optional[bytes]
+    captured_at: Optional[datetime]  # UTC, from the client's clock; None from older clients
+
+
+def from_epoch_ms(ms) -> Optional[datetime]:
+    """A client timestamp (milliseconds since the epoch) as a UTC datetime, or None if it is not one."""
+    try:
+        return datetime.fromtimestamp(ms / 1000, timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def encode(video: bytes, audio: Optional[bytes] = None, captured_at: Optional[datetime] = None) -> bytes:
+    audio = audio or b""
+    flags = FLAG_CAPTURED_AT if captured_at is not None else 0
+    header = HEADER.pack(MAGIC, VERSION, flags, len(video), len(audio))
+    if captured_at is not None:
+        header += CAPTURED_AT.pack(captured_at.timestamp() * 1000)
+    return header + video + audio
+
+
+def decode(frame: bytes) -> Segment:
+    """Split a frame into its JPEG bytes, WAV bytes (or None) and capture time (or None)."""
+    if len(frame) < HEADER.size:
+        raise SegmentFrameError(f"frame of {len(frame)} bytes is shorter than the header")
+    magic, version, flags, video_len, audio_len = HEADER.unpack_from(frame)
+    if magic != MAGIC or version != VERSION:
+        raise SegmentFrameError(f"not a version {VERSION} segment frame")
+    start = HEADER.size
+    captured_at = None
+    if flags & FLAG_CAPTURED_AT:
+        if len(frame) < start + CAPTURED_AT.size:
+            raise SegmentFrameError(f"frame of {len(frame)} bytes is shorter than the header")
+        captured_at = from_epoch_ms(CAPTURED_AT.unpack_from(frame, start)[0])
+        start += CAPTURED_AT.size
+    if not video_len or start + video_len + audio_len != len(frame):
+        raise SegmentFrameError(
+            f"lengths {video_len} + {audio_len} do not match a {len(frame)} byte frame"
+        )
+    video_end = start + video_len
+    return Segment(frame[start:video_end], frame[video_end:] if audio_len else None, captured_at)
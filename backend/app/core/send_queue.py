@@ -0,0 +1,198 @@
+"""
+Outbound WebSocket queues.
+
+Broadcasting used to await send_json() for each peer in turn, so one peer
+with a full TCP buffer held up the sender's receive loop, and a dead socket
+was only noticed on the next failed send. Each socket now gets a bounded
+queue drained by its own writer task: a broadcast only enqueues, sends to
+different peers run concurrently, and a send that fails or takes longer
+than `timeout` (checked by one shared watchdog timer) closes the socket.
+
+When a queue is full the slow-consumer policy decides:
+
+- "disconnect": close the socket (1013, try again later)
+- "drop_oldest": discard the oldest queued message to make room
+- "drop_newest": discard the message being sent
+"""
+import asyncio
+from collections import deque
+from typing import Optional, Set
+from fastapi import WebSocket
+from core.log import get_logger
+from core.config import (
+    SIGNALING_SEND_QUEUE_SIZE, SIGNALING_SEND_TIMEOUT_SECONDS, SIGNALING_SLOW_CONSUMER_POLICY,
+    SEND_WATCHDOG_INTERVAL_SECONDS
+)
+
+logger = get_logger("send_queue")
+
+POLICIES = ("disconnect", "drop_oldest", "drop_newest")
+
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class SendStats:
+    """Counters shared by the queues of one manager."""
+
+    def __init__(self):
+        self.sent = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.slow_disconnects = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class SendWatchdog:
+    """
+    Enforces send timeouts for every queue with one timer, checked every
+    `interval` seconds, rather than arming a timer for each message.
+    """
+
+    def __init__(self, interval: float = SEND_WATCHDOG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.queues: Set["SendQueue"] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, queue: "SendQueue"):
+        self.queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def discard(self, queue: "SendQueue"):
+        self.queues.discard(queue)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self.queues:
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            for queue in list(self.queues):
+                queue.check_deadline(now)
+
+
+watchdog = SendWatchdog()
+
+
+class SendQueue:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        name: str = "",
+        stats: Optional[SendStats] = None,
+        size: int = SIGNALING_SEND_QUEUE_SIZE,
+        timeout: float = SIGNALING_SEND_TIMEOUT_SECONDS,
+        policy: str = SIGNALING_SLOW_CONSUMER_POLICY
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow consumer policy '{policy}', expected one of {POLICIES}")
+        self.websocket = websocket
+        self.name = name
+        self.stats = stats or SendStats()
+        self.size = size
+        self.timeout = timeout
+        self.policy = policy
+        self.closed = False
+        self._buffer = deque()
+        self._wakeup: Optional[asyncio.Future] = None
+        self._send_started: Optional[float] = None  # Loop time, while a send is in progress
+        self._timed_out = False
+        self._task: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._write_forever())
+            watchdog.add(self)
+
+    def send(self, text: str) -> bool:
+        """
+        Queue an encoded message (see core/ws_codec.py) without waiting.
+        Returns False if it will not be sent.
+        """
+        if self.closed:
+            return False
+        if len(self._buffer) >= self.size:
+            if self.policy == "drop_newest":
+                self.stats.dropped += 1
+                return False
+            if self.policy == "drop_oldest":
+                self._buffer.popleft()
+                self.stats.dropped += 1
+            else:
+                self.stats.slow_disconnects += 1
+                logger.warning("Closing slow peer %s: %d messages waiting", self.name, len(self._buffer))
+                self._abort("Peer too slow")
+                return False
+
+        self._buffer.append(text)
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+        return True
+
+    async def close(self):
+        """Stop the writer once the socket is gone; queued messages are discarded."""
+        self.closed = True
+        watchdog.discard(self)
+        self._buffer.clear()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def check_deadline(self, now: float):
+        if self._send_started is not None and now - self._send_started > self.timeout:
+            self._timed_out = True
+            self._task.cancel()
+
+    async def _write_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._buffer:
+                self._wakeup = loop.create_future()
+                await self._wakeup
+                continue
+
+            text = self._buffer.popleft()
+            self._send_started = loop.time()
+            try:
+                await self.websocket.send_text(text)
+                self.stats.sent += 1
+            except asyncio.CancelledError:
+                if not self._timed_out:
+                    raise
+                self.stats.timeouts += 1
+                logger.warning("Closing peer %s: send took over %.1fs", self.name, self.timeout)
+                self._abort("Send timed out")
+                return
+            except Exception as e:
+                self.stats.failures += 1
+                logger.warning("Closing peer %s: send failed: %s", self.name, e)
+                self._abort("Send failed")
+                return
+            finally:
+                self._send_started = None
+
+    def _abort(self, reason: str):
+        """Close the socket; its receive loop then sees the disconnect and cleans up."""
+        if self.closed:
+            return
+        self.closed = True
+        watchdog.discard(self)
+        self._buffer.clear()
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._closer = asyncio.create_task(self._close_socket(reason))
+
+    async def _close_socket(self, reason: str):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason=reason), self.timeout)
+        except Exception as e:
+            logger.debug("Close of peer %s failed: %s", self.name, e)
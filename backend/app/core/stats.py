@@ -0,0 +1,14 @@
+"""
+Latency summaries for the stats() of the status endpoints.
+"""
+from typing import Iterable
+
+
+def percentiles_ms(samples: Iterable[float]) -> dict:
+    """p50, p95 and max of durations in seconds, in milliseconds. samples must not be empty."""
+    seconds = sorted(samples)
+    return {
+        "p50": round(seconds[len(seconds) // 2] * 1000, 1),
+        "p95": round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] * 1000, 1),
+        "max": round(seconds[-1] * 1000, 1),
+    }
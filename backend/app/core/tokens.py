@@ -0,0 +1,33 @@
+"""
+Signed access tokens (AUTH_TOKEN_MODE = "jwt").
+
+A token carries the username, role and expiry, plus the id of the
+sessions row it was issued with (`jti`), so verifying it is pure CPU
+work. The sessions row is still written: it is where logout and
+password changes record revocations (see core.dependencies).
+"""
+from datetime import datetime
+from typing import Optional
+from jose import jwt, JWTError
+from .config import SECRET_KEY, ALGORITHM
+
+
+def create_access_token(session_id: str, username: str, role: str, expires_at: datetime) -> str:
+    claims = {"sub": username, "role": role, "jti": session_id, "exp": expires_at}
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str, verify_exp: bool = True) -> Optional[dict]:
+    """Claims of a valid token, or None if it is malformed, forged or expired."""
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": verify_exp})
+    except JWTError:
+        return None
+    if not all(isinstance(claims.get(key), str) for key in ("sub", "role", "jti")):
+        return None
+    return claims
+
+
+def is_access_token(token: str) -> bool:
+    """Signed tokens have three dot-separated parts; session ids have none."""
+    return token.count(".") == 2
@@ -1,14 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from routes.auth import router as auth_router
-from routes.signaling import router as signaling_router
-from routes.gemini_analysis import router as gemini_router
-from core.database import init_db, seed_db
+from routes.signaling import router as signaling_router, manager as signaling_manager
+from routes.gemini_analysis import router as gemini_router, insight_writer, gemini_scheduler
+from core.database import init_db, seed_db, pool, db, password_hasher, PasswordHasherBusy
+from core.dependencies import auth_cache_stats, revoked_sessions
+from core.maintenance import session_sweeper
+from core.rate_limit import rate_limit_stats
+from core.bus import room_bus
+from core.heartbeat import heartbeat
+from core.meeting_clock import meeting_clock
+from core.face_crop import face_cropper
+from core.log import setup_logging
 
-# Initialize Database on startup
-init_db()
-seed_db()
+setup_logging()
+
+# Initialize Database on startup (only seed when the schema was created or upgraded)
+if init_db():
+    seed_db()
 
 app = FastAPI(title="sense")
 
@@ -19,6 +30,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include Routers
@@ -30,10 +42,54 @@ if not os.path.exists("uploads"):
     os.makedirs("uploads")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts in progress, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.on_event("startup")
+async def start_background_workers():
+    await room_bus.start()
+    await meeting_clock.start()
+    password_hasher.start()
+    revoked_sessions.start()
+    session_sweeper.start()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await session_sweeper.stop()
+    await revoked_sessions.stop()
+    await meeting_clock.stop()
+    await room_bus.stop()
+    # Buffered insights must reach the database before it closes
+    await insight_writer.shutdown()
+    gemini_scheduler.close()
+    face_cropper.close()
+    db.close()
+    pool.close_all()
+    password_hasher.close()
+
 @app.get("/")
 async def root():
     return {"message": "Video Interview Platform API is running"}
 
+@app.get("/status")
+async def service_status():
+    """Internal counters for capacity monitoring."""
+    return {
+        "auth_cache": auth_cache_stats(),
+        "session_sweeper": session_sweeper.stats(),
+        "password_hasher": password_hasher.stats(),
+        "rate_limits": rate_limit_stats(),
+        "room_bus": room_bus.stats(),
+        "signaling": signaling_manager.stats(),
+        "heartbeat": heartbeat.stats(),
+        "meeting_clock": meeting_clock.stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     # Check for SSL files to run in secure mode (needed for camera/mic)
@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, HTTPException, Depends, status, Response, Cookie, UploadFile, File, Request, Form
+from fastapi import APIRouter, HTTPException, Depends, status, Response, Cookie, Header, UploadFile, File, Request, Form
 from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Optional, List
@@ -14,16 +14,26 @@ from datetime import datetime
 import shutil
 import os
 import json
+import base64
 import sqlite3
 import asyncio
+import time
 
 from core.database import (
-    get_db_connection, 
+    db,
     create_session, 
     verify_password, 
-    get_password_hash
+    get_password_hash,
+    PasswordHasherBusy
+)
+from core.config import REPORT_INSIGHTS_PAGE_SIZE, REPORT_INSIGHTS_MAX_PAGE
+from core.rate_limit import RateLimit, check_rate_limit, client_ip
+from core.meeting_clock import meeting_clock
+from core.log import get_logger
+from core.dependencies import (
+    get_current_user, get_current_interviewer, invalidate_user,
+    revoke_session, revoke_other_sessions
 )
-from core.dependencies import get_current_user, get_current_interviewer
 from models import (
     User, UserInDB, UserCreate, Token, 
     Meeting, CodeLoginRequest, CandidateJoinRequest, CreateMeetingRequest,
@@ -31,26 +41,59 @@ from models import (
 )
 
 router = APIRouter()
+logger = get_logger("auth")
+
+
+# --- Keyset pagination ---
+# List endpoints page on (created_at, id) and hand the position of the last
+# row back in the X-Next-Cursor header, so the body stays a plain list.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at, meeting_id: str) -> str:
+    raw = json.dumps([created_at, meeting_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, meeting_id = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, meeting_id
+
+
+def set_next_cursor(response: Response, rows: list, limit: int):
+    # A short page is the last one
+    if len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+def request_token(access_token: Optional[str], authorization: Optional[str]) -> Optional[str]:
+    """The token a request authenticated with: cookie first, then Bearer header."""
+    if access_token:
+        return access_token
+    if authorization:
+        scheme, _, param = authorization.partition(" ")
+        if scheme.lower() == "bearer":
+            return param
+    return None
+
 
 @router.post("/signup", response_model=Token)
 async def signup(user: UserCreate, response: Response):
-    conn = get_db_connection()
-    try:
-        existing_user = conn.execute("SELECT * FROM users WHERE username = ?", (user.username,)).fetchone()
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Username already registered")
-        
-        hashed_password = get_password_hash(user.password)
-        conn.execute(
-            "INSERT INTO users (username, email, full_name, hashed_password) VALUES (?, ?, ?, ?)",
-            (user.username, user.email, user.full_name, hashed_password)
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    existing_user = await db.fetch_one("SELECT * FROM users WHERE username = ?", (user.username,))
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Username already registered")
+    
+    hashed_password = await get_password_hash(user.password)
+    await db.execute(
+        "INSERT INTO users (username, email, full_name, hashed_password) VALUES (?, ?, ?, ?)",
+        (user.username, user.email, user.full_name, hashed_password)
+    )
     
     # Create Session
-    session_id, expires_at = create_session(user.username, "interviewer")
+    session_id, expires_at = await create_session(user.username, "interviewer")
     
     # Set Cookie
     response.set_cookie(
@@ -65,21 +108,22 @@ async def signup(user: UserCreate, response: Response):
     return {"access_token": session_id, "token_type": "bearer"}
 
 @router.post("/login")
-async def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(request: Request, response: Response, form_data: OAuth2PasswordRequestForm = Depends()):
+    # Every attempt costs a pbkdf2 verification: limit per caller and per account
+    check_rate_limit("login", client_ip(request))
+    check_rate_limit("login_account", form_data.username.lower())
     try:
-        conn = get_db_connection()
-        user_row = conn.execute("SELECT * FROM users WHERE username = ?", (form_data.username,)).fetchone()
-        conn.close()
+        user_row = await db.fetch_one("SELECT * FROM users WHERE username = ?", (form_data.username,))
         
         if not user_row:
             raise HTTPException(status_code=400, detail="Incorrect username or password")
         
         user = UserInDB(**dict(user_row))
-        if not verify_password(form_data.password, user.hashed_password):
+        if not await verify_password(form_data.password, user.hashed_password):
             raise HTTPException(status_code=400, detail="Incorrect username or password")
         
         # Create Session
-        session_id, expires_at = create_session(user.username, "interviewer")
+        session_id, expires_at = await create_session(user.username, "interviewer")
         
         # Set Cookie
         response.set_cookie(
@@ -90,15 +134,24 @@ async def login_for_access_token(response: Response, form_data: OAuth2PasswordRe
             expires=expires_at
         )
         return {"message": "Login successful"}
+    except PasswordHasherBusy:
+        raise  # Answered with 503 + Retry-After by the handler in main.py
     except Exception as e:
-        import traceback
-        traceback.print_exc() # Print to server logs
+        # Wrong credentials are routine; anything else gets a traceback
+        logger.warning("Login failed: %s", e, exc_info=not isinstance(e, HTTPException))
         raise HTTPException(status_code=400, detail=f"Login Failed: {str(e)}")
 
 @router.post("/logout")
-async def logout(response: Response, current_user: User = Depends(get_current_user)):
-    # In a real app, delete session from DB using the cookie value.
-    # For now, just clearing the cookie effectively logs them out client-side.
+async def logout(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    access_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    # Kill the session server-side too, not just the cookie
+    token = request_token(access_token, authorization)
+    if token:
+        await revoke_session(token)
     response.delete_cookie("access_token")
     return {"message": "Logged out successfully"}
 
@@ -108,8 +161,6 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 
 @router.put("/users/me", response_model=User)
 async def update_user_me(user_update: UserUpdate, current_user: User = Depends(get_current_user)):
-    conn = get_db_connection()
-    
     # Build update query dynamically
     fields = []
     values = []
@@ -127,21 +178,19 @@ async def update_user_me(user_update: UserUpdate, current_user: User = Depends(g
         values.append(user_update.analysis_mode)
         
     if not fields:
-        conn.close()
         return current_user
         
     values.append(current_user.username)
     query = f"UPDATE users SET {', '.join(fields)} WHERE username = ?"
     
-    conn.execute(query, tuple(values))
-    conn.commit()
-    
-    # Fetch updated user
-    updated_row = conn.execute("SELECT * FROM users WHERE username = ?", (current_user.username,)).fetchone()
-    conn.close()
-    
-    return UserInDB(**dict(updated_row))
+    def update(conn):
+        conn.execute(query, tuple(values))
+        # Fetch updated user
+        return conn.execute("SELECT * FROM users WHERE username = ?", (current_user.username,)).fetchone()
 
+    updated_row = await db.write(update)
+    invalidate_user(current_user.username)
+    
     return UserInDB(**dict(updated_row))
 
 @router.post("/users/me/photo")
@@ -164,39 +213,38 @@ async def upload_photo(file: UploadFile = File(...), current_user: User = Depend
     # Ideally should use a proper base URL from config
     photo_url = f"/uploads/profile/{filename}"
     
-    conn = get_db_connection()
-    conn.execute("UPDATE users SET profile_photo_url = ? WHERE username = ?", (photo_url, current_user.username))
-    conn.commit()
-    conn.close()
+    await db.execute("UPDATE users SET profile_photo_url = ? WHERE username = ?", (photo_url, current_user.username))
+    invalidate_user(current_user.username)
     
     return {"profile_photo_url": photo_url}
 
 @router.post("/change-password")
-async def change_password(pwd_change: PasswordChange, current_user: User = Depends(get_current_user)):
-    conn = get_db_connection()
-    user_row = conn.execute("SELECT * FROM users WHERE username = ?", (current_user.username,)).fetchone()
+async def change_password(
+    pwd_change: PasswordChange,
+    current_user: User = Depends(get_current_user),
+    access_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user_row = await db.fetch_one("SELECT * FROM users WHERE username = ?", (current_user.username,))
     
     user_in_db = UserInDB(**dict(user_row))
     
-    if not verify_password(pwd_change.old_password, user_in_db.hashed_password):
-        conn.close()
+    if not await verify_password(pwd_change.old_password, user_in_db.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
         
-    new_hashed_password = get_password_hash(pwd_change.new_password)
+    new_hashed_password = await get_password_hash(pwd_change.new_password)
     
-    conn.execute("UPDATE users SET hashed_password = ? WHERE username = ?", (new_hashed_password, current_user.username))
-    conn.commit()
-    conn.close()
+    await db.execute("UPDATE users SET hashed_password = ? WHERE username = ?", (new_hashed_password, current_user.username))
+    # Sign out every other device; the session making this request stays valid
+    await revoke_other_sessions(current_user.username, keep_token=request_token(access_token, authorization))
     
     return {"message": "Password updated successfully"}
 
-@router.post("/candidate-login")
+@router.post("/candidate-login", dependencies=[Depends(RateLimit("candidate_login"))])
 async def login_candidate(login_request: CodeLoginRequest, response: Response):
-    conn = get_db_connection()
     # Normalize code to lowercase
     code = login_request.code.lower()
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ? AND active = 1", (code,)).fetchone()
-    conn.close()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ? AND active = 1", (code,))
 
     if not meeting:
         raise HTTPException(status_code=400, detail="Invalid or Expired Meeting ID")
@@ -204,7 +252,7 @@ async def login_candidate(login_request: CodeLoginRequest, response: Response):
     username = f"candidate_{code}"
     
     # Create Session
-    session_id, expires_at = create_session(username, "candidate")
+    session_id, expires_at = await create_session(username, "candidate")
     
     # Set Cookie
     response.set_cookie(
@@ -226,11 +274,9 @@ class CreateMeetingRequest(PydanticBaseModel):
 @router.post("/meetings", response_model=Meeting)
 async def create_meeting(request: CreateMeetingRequest, current_user: User = Depends(get_current_interviewer)):
     # Validate candidate email exists in database
-    conn = get_db_connection()
-    candidate = conn.execute("SELECT username, email FROM users WHERE email = ?", (request.candidate_email.lower(),)).fetchone()
+    candidate = await db.fetch_one("SELECT username, email FROM users WHERE email = ?", (request.candidate_email.lower(),))
     
     if not candidate:
-        conn.close()
         raise HTTPException(status_code=404, detail="Candidate not registered. They must create an account first.")
     
     # Use provided ID or generate one
@@ -242,12 +288,10 @@ async def create_meeting(request: CreateMeetingRequest, current_user: User = Dep
     
     duration = request.duration
     
-    conn.execute(
+    await db.execute(
         "INSERT INTO meetings (id, creator_username, candidate_email, duration) VALUES (?, ?, ?, ?)",
         (meeting_id, current_user.username, request.candidate_email.lower(), duration)
     )
-    conn.commit()
-    conn.close()
     
     return Meeting(id=meeting_id, creator_username=current_user.username, active=True, created_at=datetime.utcnow(), duration=duration)
 
@@ -259,100 +303,109 @@ async def delete_meetings(request: DeleteMeetingsRequest, current_user: User = D
     if not request.ids:
         return {"message": "No meetings selected"}
         
-    conn = get_db_connection()
     # Create placeholders for the list of IDs
     placeholders = ', '.join('?' for _ in request.ids)
     
     # Ensure users can only delete their own meetings
     query = f"DELETE FROM meetings WHERE id IN ({placeholders}) AND creator_username = ?"
-    params = request.ids + [current_user.username]
+    params = [meeting_id.lower() for meeting_id in request.ids] + [current_user.username]
     
-    cursor = conn.execute(query, params)
-    deleted_count = cursor.rowcount
-    conn.commit()
-    conn.close()
+    deleted_count = await db.execute(query, params)
+    for meeting_id in params[:-1]:
+        await meeting_clock.update(meeting_id, forget=True)
     
     return {"message": f"Successfully deleted {deleted_count} meetings", "deleted_count": deleted_count}
 
 @router.delete("/meetings/{meeting_id}")
 async def delete_single_meeting(meeting_id: str, current_user: User = Depends(get_current_interviewer)):
     """Delete a single meeting by ID."""
-    conn = get_db_connection()
-    
     # Ensure user can only delete their own meeting
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ? AND creator_username = ?", 
-                           (meeting_id.lower(), current_user.username)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ? AND creator_username = ?", 
+                                 (meeting_id.lower(), current_user.username))
     if not meeting:
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found or access denied")
     
-    conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id.lower(),))
-    conn.commit()
-    conn.close()
+    await db.execute("DELETE FROM meetings WHERE id = ?", (meeting_id.lower(),))
+    await meeting_clock.update(meeting_id.lower(), forget=True)
     
     return {"message": "Meeting deleted successfully"}
 
 @router.get("/meetings", response_model=list[MeetingSummary])
 async def get_meetings(
+    response: Response,
     limit: int = 5,
-    offset: int = 0,
-    current_user: User = Depends(get_current_interviewer)
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_interviewer),
+    offset: int = 0
 ):
-    conn = get_db_connection()
-    meetings_rows = conn.execute(
-        "SELECT * FROM meetings WHERE creator_username = ? ORDER BY created_at DESC LIMIT ? OFFSET ?", 
-        (current_user.username, limit, offset)
-    ).fetchall()
-    
+    limit = max(1, min(limit, 100))
+    if offset:
+        # Kept for existing callers; the cursor in X-Next-Cursor replaces it
+        if cursor:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+        response.headers["Deprecation"] = "true"
+    offset = max(0, offset)
+    # Start above every real key; "~" sorts after any timestamp string
+    after = decode_cursor(cursor) if cursor else ("~", "")
+
+    # One statement for the page, its candidate names and the candidate's
+    # profile. The users join goes through rowid so a duplicated email can
+    # never duplicate a meeting.
+    meetings_rows = await db.fetch_all(
+        """SELECT m.*,
+                  u.full_name AS candidate_name,
+                  u.profile_photo_url AS candidate_profile_photo_url,
+                  (SELECT group_concat(c.name, char(31)) FROM candidates c
+                   WHERE c.meeting_id = m.id) AS candidate_names
+           FROM meetings m
+           LEFT JOIN users u ON u.rowid = (
+               SELECT rowid FROM users WHERE email = m.candidate_email LIMIT 1
+           )
+           WHERE m.creator_username = ? AND (m.created_at, m.id) < (?, ?)
+           ORDER BY m.created_at DESC, m.id DESC
+           LIMIT ? OFFSET ?""",
+        (current_user.username, after[0], after[1], limit, offset)
+    )
+    set_next_cursor(response, meetings_rows, limit)
+
     results = []
     for row in meetings_rows:
         meeting_dict = dict(row)
-        # Fetch candidates
-        candidates_rows = conn.execute(
-            "SELECT name FROM candidates WHERE meeting_id = ?", 
-            (meeting_dict['id'],)
-        ).fetchall()
-        candidates = [c['name'] for c in candidates_rows]
-        
-        meeting_dict['candidates'] = candidates
+        names = meeting_dict.pop('candidate_names')
+        meeting_dict['candidates'] = names.split(chr(31)) if names else []
         # boolean conversion for sqlite integer
         meeting_dict['active'] = bool(meeting_dict['active'])
-        
-        # Ensure duration is present (handle NULLs from DB)
-        if 'duration' not in meeting_dict or meeting_dict['duration'] is None:
-             meeting_dict['duration'] = None
-
-        # Fetch candidate profile details using candidate_email
-        if meeting_dict.get('candidate_email'):
-            candidate_user = conn.execute(
-                "SELECT full_name, profile_photo_url FROM users WHERE email = ?", 
-                (meeting_dict['candidate_email'],)
-            ).fetchone()
-            if candidate_user:
-                meeting_dict['candidate_name'] = candidate_user['full_name']
-                meeting_dict['candidate_profile_photo_url'] = candidate_user['profile_photo_url']
-
-
         results.append(MeetingSummary(**meeting_dict))
-    
-    conn.close()
     return results
 
 @router.get("/candidate/meetings")
-async def get_candidate_meetings(current_user: User = Depends(get_current_user)):
-    """Get all meetings scheduled for the current candidate (by email)."""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    
+async def get_candidate_meetings(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get meetings scheduled for the current candidate (by email), newest first.
+    Without limit or cursor this is every meeting, as before paging existed.
+    """
+    paged = limit is not None or cursor is not None
+    if paged:
+        limit = max(1, min(limit or 50, 100))
+    after = decode_cursor(cursor) if cursor else ("~", "")
+
     # Find meetings where this user's email is the candidate_email
-    meetings_rows = conn.execute(
+    meetings_rows = await db.fetch_all(
         """SELECT m.*, u.full_name as interviewer_name, u.email as interviewer_email 
            FROM meetings m 
            LEFT JOIN users u ON m.creator_username = u.username 
-           WHERE m.candidate_email = ? AND m.active = 1
-           ORDER BY m.created_at DESC""", 
-        (current_user.email.lower(),)
-    ).fetchall()
+           WHERE m.candidate_email = ? AND m.active = 1 AND (m.created_at, m.id) < (?, ?)
+           ORDER BY m.created_at DESC, m.id DESC
+           LIMIT ?""", 
+        (current_user.email.lower(), after[0], after[1], limit if paged else -1)  # -1: no limit
+    )
+    if paged:
+        set_next_cursor(response, meetings_rows, limit)
     
     results = []
     for row in meetings_rows:
@@ -360,48 +413,39 @@ async def get_candidate_meetings(current_user: User = Depends(get_current_user))
         meeting_dict['active'] = bool(meeting_dict.get('active', 1))
         results.append(meeting_dict)
     
-    conn.close()
     return results
 
 @router.post("/meetings/{meeting_id}/join")
 async def join_meeting(meeting_id: str, join_req: CandidateJoinRequest, current_user: User = Depends(get_current_user)):
     # Verify meeting exists
-    conn = get_db_connection()
     meeting_id = meeting_id.lower() # Normalize
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ? AND active = 1", (meeting_id,)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ? AND active = 1", (meeting_id,))
     if not meeting:
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found")
     
     # Check if interviewer has joined first
     if not meeting['interviewer_joined']:
-        conn.close()
         raise HTTPException(status_code=403, detail="Please wait for the interviewer to start the session")
 
     # Store candidate info
-    conn.execute(
+    await db.execute(
         "INSERT INTO candidates (meeting_id, name) VALUES (?, ?)",
         (meeting_id, join_req.name)
     )
-    conn.commit()
-    conn.close()
     
     return {"message": "Joined successfully"}
 
 
 @router.post("/meetings/{meeting_id}/end")
 async def end_meeting(meeting_id: str, current_user: User = Depends(get_current_user)):
-    conn = get_db_connection()
     meeting_id = meeting_id.lower() # Normalize
     # Check if meeting exists and belongs to user
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
     
     if not meeting:
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found")
         
     if meeting['creator_username'] != current_user.username:
-        conn.close()
         raise HTTPException(status_code=403, detail="Not authorized to end this meeting")
     
     # Calculate duration if started_at is set
@@ -414,23 +458,25 @@ async def end_meeting(meeting_id: str, current_user: User = Depends(get_current_
             elapsed_seconds = (ended_at - started_time).total_seconds()
             duration_minutes = int(elapsed_seconds / 60)  # Convert to minutes
         except Exception as e:
-            print(f"[Meeting] Failed to calculate duration: {e}")
+            logger.warning("Failed to calculate duration: %s", e)
         
-    conn.execute(
+    await db.execute(
         "UPDATE meetings SET active = 0, ended_at = ?, duration = ? WHERE id = ?", 
         (ended_at, duration_minutes, meeting_id)
     )
-    conn.commit()
-    conn.close()
+    # duration now holds the actual length; the clock reloads it if asked
+    await meeting_clock.update(meeting_id, forget=True)
+
+    # Make sure buffered insights are on disk before anyone asks for the report
+    from routes.gemini_analysis import insight_writer
+    await insight_writer.close_room(meeting_id)
     
     return {"message": "Meeting ended successfully", "duration_minutes": duration_minutes}
 
 @router.get("/meetings/{meeting_id}", response_model=Meeting)
 async def get_meeting_details(meeting_id: str):
-    conn = get_db_connection()
     meeting_id = meeting_id.lower() # Normalize
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
-    conn.close()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
     
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
@@ -445,86 +491,62 @@ class UpdateMeetingRequest(PydanticBaseModel):
 
 @router.patch("/meetings/{meeting_id}")
 async def update_meeting(meeting_id: str, update_req: UpdateMeetingRequest, current_user: User = Depends(get_current_interviewer)):
-    conn = get_db_connection()
     meeting_id = meeting_id.lower()
     
     # Check if meeting exists and belongs to user
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
     
     if not meeting:
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found")
         
     if meeting['creator_username'] != current_user.username:
-        conn.close()
         raise HTTPException(status_code=403, detail="Not authorized to modify this meeting")
     
     # Update duration
-    conn.execute("UPDATE meetings SET duration = ? WHERE id = ?", (update_req.duration, meeting_id))
-    conn.commit()
-    conn.close()
+    await db.execute("UPDATE meetings SET duration = ? WHERE id = ?", (update_req.duration, meeting_id))
+    await meeting_clock.update(meeting_id, duration=update_req.duration)
     
     return {"message": "Meeting updated successfully", "duration": update_req.duration}
 
 @router.post("/meetings/{meeting_id}/start")
 async def start_meeting(meeting_id: str, current_user: User = Depends(get_current_interviewer)):
     """Mark meeting as started and record the start time for timing verification"""
-    conn = get_db_connection()
     meeting_id = meeting_id.lower()
     
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
     
     if not meeting:
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found")
     
     if meeting['creator_username'] != current_user.username:
-        conn.close()
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Set started_at to current time and mark interviewer as joined
-    conn.execute("UPDATE meetings SET started_at = ?, interviewer_joined = 1 WHERE id = ?", (datetime.utcnow(), meeting_id))
-    conn.commit()
-    conn.close()
+    started_at = datetime.utcnow()
+    await db.execute("UPDATE meetings SET started_at = ?, interviewer_joined = 1 WHERE id = ?", (started_at, meeting_id))
+    await meeting_clock.update(meeting_id, started_at=str(started_at))
+
+    # relative_seconds for new insights must count from this start time
+    from routes.gemini_analysis import insight_writer
+    insight_writer.forget_start_time(meeting_id)
     
-    return {"message": "Meeting started", "started_at": datetime.utcnow().isoformat()}
+    return {"message": "Meeting started", "started_at": started_at.isoformat()}
 
 @router.get("/meetings/{meeting_id}/remaining-time")
 async def get_remaining_time(meeting_id: str):
-    """Get remaining time for a meeting based on server-side calculation"""
-    conn = get_db_connection()
+    """
+    Get remaining time for a meeting based on server-side calculation.
+    The interview room gets this pushed over signaling now; this is the
+    fallback, served from the same in-memory deadline.
+    """
     meeting_id = meeting_id.lower()
     
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    deadline = await meeting_clock.get(meeting_id)
     
-    if not meeting:
-        conn.close()
+    if not deadline:
         raise HTTPException(status_code=404, detail="Meeting not found")
     
-    conn.close()
-    
-    duration = meeting['duration']
-    started_at = meeting['started_at']
-    
-    # If no duration set (infinity), return null
-    if duration is None:
-        return {"remaining_seconds": None, "is_expired": False}
-    
-    # If not started yet, return full duration
-    if started_at is None:
-        return {"remaining_seconds": duration * 60, "is_expired": False}
-    
-    # Calculate remaining time
-    started_time = datetime.fromisoformat(str(started_at).replace(' ', 'T'))
-    elapsed = (datetime.utcnow() - started_time).total_seconds()
-    remaining = max(0, (duration * 60) - elapsed)
-    
-    return {
-        "remaining_seconds": int(remaining),
-        "is_expired": remaining <= 0,
-        "duration_minutes": duration,
-        "started_at": started_at
-    }
+    return deadline.as_dict(time.time())
 
 @router.post("/meetings/{meeting_id}/recording")
 async def upload_recording(meeting_id: str, duration: float = Form(None), file: UploadFile = File(...)):
@@ -544,13 +566,10 @@ async def upload_recording(meeting_id: str, duration: float = Form(None), file:
         
     recording_url = f"/{file_path}" # Relative URL
     
-    conn = get_db_connection()
-    conn.execute(
+    await db.execute(
         "UPDATE meetings SET recording_url = ?, video_duration_seconds = ?, ended_at = ?, active = 0 WHERE id = ?", 
         (recording_url, int(duration) if duration else None, datetime.utcnow(), meeting_id)
     )
-    conn.commit()
-    conn.close()
     
     return {"message": "Recording uploaded", "url": recording_url}
 
@@ -559,12 +578,9 @@ async def stream_recording(meeting_id: str, request: Request):
     """Stream meeting recording with Range request support for chunked delivery"""
     meeting_id = meeting_id.lower()
     
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row  # Add row_factory for dict-like access
-    meeting = conn.execute("SELECT recording_url FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
-    conn.close()
+    meeting = await db.fetch_one("SELECT recording_url FROM meetings WHERE id = ?", (meeting_id,))
     
-    print(f"[STREAM] Meeting ID: {meeting_id}, Recording URL: {meeting['recording_url'] if meeting else 'NOT FOUND'}")
+    logger.debug("Stream for meeting %s, recording URL: %s", meeting_id, meeting['recording_url'] if meeting else 'NOT FOUND')
     
     if not meeting or not meeting['recording_url']:
         raise HTTPException(status_code=404, detail="Recording not found")
@@ -572,7 +588,7 @@ async def stream_recording(meeting_id: str, request: Request):
     # Get the file path (remove leading slash if present)
     file_path = meeting['recording_url'].lstrip('/')
     
-    print(f"[STREAM] Looking for file: {file_path}, Exists: {os.path.exists(file_path)}")
+    logger.debug("Looking for recording file %s", file_path)
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Recording file not found on disk")
@@ -633,6 +649,27 @@ async def stream_recording(meeting_id: str, request: Request):
             }
         )
 
+async def get_insight_metrics(meeting_id: str) -> dict:
+    """Average confidence and emotion frequency for a meeting, computed in SQL."""
+    def query(conn):
+        totals = conn.execute(
+            "SELECT COUNT(*), ROUND(AVG(confidence)) FROM insights WHERE meeting_id = ?", (meeting_id,)
+        ).fetchone()
+        counts = conn.execute(
+            """SELECT dominant_emotion, COUNT(*) AS count FROM insights
+               WHERE meeting_id = ? AND dominant_emotion IS NOT NULL
+               GROUP BY dominant_emotion ORDER BY count DESC""",
+            (meeting_id,)
+        ).fetchall()
+        return {
+            "samples": totals[0],
+            "average_confidence": int(totals[1]) if totals[1] is not None else None,
+            "emotion_counts": [{"emotion": row[0], "count": row[1]} for row in counts],
+        }
+
+    return await db.read(query)
+
+
 @router.post("/meetings/{meeting_id}/analyze")
 async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_current_user)):
     """
@@ -640,16 +677,13 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
     Returns the summary and score.
     """
     meeting_id = meeting_id.lower()
-    conn = get_db_connection()
     
     # 1. Check meeting existence and permissions
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
     if not meeting:
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found")
         
     if meeting["creator_username"] != current_user.username:
-         conn.close()
          raise HTTPException(status_code=403, detail="Not authorized")
 
     # 2. Check if already analyzed. 
@@ -661,9 +695,8 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
 
     if is_analyzed:
         try:
-            summary_row = conn.execute("SELECT * FROM meeting_summaries WHERE meeting_id = ?", (meeting_id,)).fetchone()
+            summary_row = await db.fetch_one("SELECT * FROM meeting_summaries WHERE meeting_id = ?", (meeting_id,))
             if summary_row:
-                conn.close()
                 return {
                     "summary": summary_row["summary"],
                     "overall_score": summary_row["overall_score"]
@@ -672,10 +705,12 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
              pass
 
     # 3. Fetch Insights for Context
-    insights_rows = conn.execute("SELECT * FROM insights WHERE meeting_id = ? ORDER BY relative_seconds ASC", (meeting_id,)).fetchall()
+    insights_rows = await db.fetch_all(
+        "SELECT relative_seconds, dominant_emotion, confidence FROM insights WHERE meeting_id = ? ORDER BY relative_seconds ASC",
+        (meeting_id,)
+    )
     
     if not insights_rows:
-        conn.close()
         return {
             "summary": "No sufficient data to analyze.",
             "overall_score": 0
@@ -683,28 +718,16 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
 
     # Construct context string
     timeline_str = "Timeline of detected emotions:\n"
-    total_confidence = 0
-    valid_confidence_count = 0
-    
     for row in insights_rows:
-        try:
-            sec = row['relative_seconds']
-            if not row['emotion_json']: continue
-            data = json.loads(row['emotion_json'])
-            emotion = data.get('dominant_emotion') or data.get('primary', 'neutral')
-            conf = data.get('confidence') or data.get('confident_meter', 0)
-            
-            timeline_str += f"T+{sec}s: Emotion={emotion}, Confidence={conf}%\n"
-            
-            total_confidence += int(conf)
-            valid_confidence_count += 1
-        except:
-             pass
+        emotion = row['dominant_emotion'] or 'neutral'
+        timeline_str += f"T+{row['relative_seconds']}s: Emotion={emotion}, Confidence={row['confidence'] or 0}%\n"
+
+    metrics = await get_insight_metrics(meeting_id)
+    frequency_str = ", ".join(f"{e['emotion']}={e['count']}" for e in metrics["emotion_counts"])
 
     # 4. Gemini Call
-    from routes.gemini_analysis import emotion_manager
+    from routes.gemini_analysis import emotion_manager, gemini_scheduler, PRIORITY_BACKGROUND
     if not emotion_manager.genai_client:
-         conn.close()
          raise HTTPException(status_code=503, detail="AI Service unavailable")
 
     prompt = f"""
@@ -714,6 +737,8 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
     
     (Note: showing last ~150 entries max to fit context)
 
+    Across all {metrics["samples"]} samples: average confidence {metrics["average_confidence"]}%, emotion frequency: {frequency_str}
+
     Task:
     1. Provide a concise PROFESSIONAL SUMMARY (40-50 words) of the candidate's behavioral performance. Focus on their emotional stability, confidence trends, and overall engagement.
     2. Provide an OVERALL SCORE (0-100) based on confidence levels and positive/neutral emotion frequency. 
@@ -727,10 +752,13 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
     
     try:
         from google.genai import types
-        response = await asyncio.to_thread(
+        # After the meeting, so live segments from other rooms go first
+        response = await gemini_scheduler.run(
              emotion_manager.genai_client.models.generate_content,
              model="gemini-2.5-flash",
-             contents=[types.Content(parts=[types.Part(text=prompt)])]
+             contents=[types.Content(parts=[types.Part(text=prompt)])],
+             room=meeting_id,
+             priority=PRIORITY_BACKGROUND
         )
         
         response_text = response.text.strip()
@@ -743,42 +771,109 @@ async def analyze_meeting(meeting_id: str, current_user: User = Depends(get_curr
         score = result.get("overall_score", 0)
         
         # 5. Save to DB
-        conn.execute("INSERT INTO meeting_summaries (meeting_id, summary, overall_score) VALUES (?, ?, ?)", 
-                     (meeting_id, summary_text, score))
-        try:
-            conn.execute("UPDATE meetings SET is_analyzed = 1 WHERE id = ?", (meeting_id,))
-        except:
-            pass
-            
-        conn.commit()
-        conn.close()
+        def save_summary(conn):
+            conn.execute("INSERT INTO meeting_summaries (meeting_id, summary, overall_score) VALUES (?, ?, ?)", 
+                         (meeting_id, summary_text, score))
+            try:
+                conn.execute("UPDATE meetings SET is_analyzed = 1 WHERE id = ?", (meeting_id,))
+            except:
+                pass
+
+        await db.write(save_summary)
         
         return result
 
     except Exception as e:
-        print(f"Analysis Error: {e}")
-        conn.close()
+        logger.exception("Analysis error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def load_report_insights(
+    meeting_id: str,
+    since_id: Optional[int] = None,
+    since_seconds: Optional[int] = None,
+    limit: Optional[int] = None
+) -> dict:
+    """
+    Insights for the report, decoded for the client.
+
+    With no cursor and no limit this is every insight in timestamp order
+    (the original report). Otherwise rows come in id order starting after
+    since_id (or at since_seconds into the meeting), at most `limit` of
+    them, and `next_since_id` resumes exactly where the page ended.
+    """
+    if since_id is None and since_seconds is None and limit is None:
+        rows = await db.fetch_all(
+            "SELECT id, meeting_id, timestamp, emotion_json, smart_nudge, request_timestamp, relative_seconds "
+            "FROM insights WHERE meeting_id = ? ORDER BY timestamp ASC",
+            (meeting_id,)
+        )
+        has_more = False
+    else:
+        limit = max(1, min(limit or REPORT_INSIGHTS_PAGE_SIZE, REPORT_INSIGHTS_MAX_PAGE))
+        if since_id is not None:
+            rows = await db.fetch_all(
+                "SELECT id, meeting_id, timestamp, emotion_json, smart_nudge, request_timestamp, relative_seconds "
+                "FROM insights WHERE meeting_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (meeting_id, since_id, limit + 1)
+            )
+        elif since_seconds is not None:
+            rows = await db.fetch_all(
+                "SELECT id, meeting_id, timestamp, emotion_json, smart_nudge, request_timestamp, relative_seconds "
+                "FROM insights WHERE meeting_id = ? AND relative_seconds >= ? ORDER BY id LIMIT ?",
+                (meeting_id, since_seconds, limit + 1)
+            )
+        else:
+            rows = await db.fetch_all(
+                "SELECT id, meeting_id, timestamp, emotion_json, smart_nudge, request_timestamp, relative_seconds "
+                "FROM insights WHERE meeting_id = ? ORDER BY id LIMIT ?",
+                (meeting_id, limit + 1)
+            )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+    insight_list = []
+    for row in rows:
+        item = dict(row)
+        try:
+            item['emotion_data'] = json.loads(item['emotion_json'])
+        except:
+            item['emotion_data'] = {}
+        del item['emotion_json'] # Remove raw string
+        insight_list.append(item)
+
+    # Nothing new: hand the caller's cursor back so it can keep polling
+    next_since_id = max((item['id'] for item in insight_list), default=since_id)
+    return {"insights": insight_list, "next_since_id": next_since_id, "has_more": has_more}
+
+
 @router.get("/meetings/{meeting_id}/report")
-async def get_meeting_report(meeting_id: str, current_user: User = Depends(get_current_user)):
-    """Get full meeting report including recording and insights"""
+async def get_meeting_report(
+    meeting_id: str,
+    since_id: Optional[int] = None,
+    since_seconds: Optional[int] = None,
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get full meeting report including recording and insights.
+
+    Polling a live meeting: pass since_id (the previous next_since_id) or
+    since_seconds to get only the insights recorded after it, without the
+    meeting, participant and analysis sections.
+    """
     meeting_id = meeting_id.lower()
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    
-    print(f"[DEBUG] Fetching report for meeting_id: {meeting_id}")
+
+    if since_id is not None or since_seconds is not None:
+        if not await db.fetch_one("SELECT 1 FROM meetings WHERE id = ?", (meeting_id,)):
+            raise HTTPException(status_code=404, detail="Meeting not found")
+        return await load_report_insights(meeting_id, since_id, since_seconds, limit)
+
+    logger.debug("Fetching report for meeting %s", meeting_id)
     
     # Get Meeting
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (meeting_id,))
     if not meeting:
-        print(f"[DEBUG] Meeting not found in DB: {meeting_id}")
-        # Debug: list all meetings
-        all_meetings = conn.execute("SELECT id FROM meetings").fetchall()
-        print(f"[DEBUG] Available meetings: {[m['id'] for m in all_meetings]}")
-        
-        conn.close()
         raise HTTPException(status_code=404, detail="Meeting not found")
     
     # Create meeting dict first
@@ -790,10 +885,10 @@ async def get_meeting_report(meeting_id: str, current_user: User = Depends(get_c
     
     # Get candidate info from users table using candidate_email
     if meeting_dict.get('candidate_email'):
-        candidate_user_row = conn.execute(
+        candidate_user_row = await db.fetch_one(
             "SELECT full_name, profile_photo_url, resume_url FROM users WHERE email = ?", 
             (meeting_dict['candidate_email'],)
-        ).fetchone()
+        )
         if candidate_user_row:
             candidate_user = dict(candidate_user_row)
             candidate_name = candidate_user['full_name']
@@ -804,10 +899,10 @@ async def get_meeting_report(meeting_id: str, current_user: User = Depends(get_c
     
     # Get interviewer info from users table using creator_username
     if meeting_dict.get('creator_username'):
-        interviewer_user_row = conn.execute(
+        interviewer_user_row = await db.fetch_one(
             "SELECT full_name FROM users WHERE username = ?", 
             (meeting_dict['creator_username'],)
-        ).fetchone()
+        )
         if interviewer_user_row:
             interviewer_name = interviewer_user_row['full_name']
     
@@ -816,7 +911,7 @@ async def get_meeting_report(meeting_id: str, current_user: User = Depends(get_c
     meeting_dict['interviewer_name'] = interviewer_name
     
     # Get Candidate Session Duration from candidates table (for joined_at/left_at tracking)
-    candidates = conn.execute("SELECT name, joined_at, left_at FROM candidates WHERE meeting_id = ?", (meeting_id,)).fetchall()
+    candidates = await db.fetch_all("SELECT name, joined_at, left_at FROM candidates WHERE meeting_id = ?", (meeting_id,))
     
     # Calculate Candidate Session Duration
     candidate_duration_seconds = 0
@@ -833,41 +928,28 @@ async def get_meeting_report(meeting_id: str, current_user: User = Depends(get_c
     
     meeting_dict['candidate_duration_seconds'] = int(candidate_duration_seconds) if candidate_duration_seconds > 0 else None
     
-    # Get Insights
-    insights = conn.execute(
-        "SELECT * FROM insights WHERE meeting_id = ? ORDER BY timestamp ASC", 
-        (meeting_id,)
-    ).fetchall()
-    
-    insight_list = []
-    for row in insights:
-        item = dict(row)
-        try:
-            item['emotion_data'] = json.loads(item['emotion_json'])
-        except:
-            item['emotion_data'] = {}
-        del item['emotion_json'] # Remove raw string
-        insight_list.append(item)
-        
+    # Get Insights (the full emotion_data is still sent for the per-event
+    # reasoning text; the aggregates come from the typed columns)
+    insights_page = await load_report_insights(meeting_id, limit=limit)
+
     # Get Analysis (Summary & Score)
     analysis = None
     try:
-        print("Executing....")
-        summary_row = conn.execute("SELECT summary, overall_score FROM meeting_summaries WHERE meeting_id = ?", (meeting_id,)).fetchone()
-        print(summary_row)
+        summary_row = await db.fetch_one("SELECT summary, overall_score FROM meeting_summaries WHERE meeting_id = ?", (meeting_id,))
         if summary_row:
             analysis = {
                 "summary": summary_row["summary"],
                 "overall_score": summary_row["overall_score"]
             }
     except Exception as e:
-        print(f"[ERROR] Failed to fetch analysis: {e}")
+        logger.error("Failed to fetch analysis: %s", e)
 
-    conn.close()
-    
     return {
         "meeting": meeting_dict,
-        "insights": insight_list,
+        "insights": insights_page["insights"],
+        "next_since_id": insights_page["next_since_id"],
+        "has_more": insights_page["has_more"],
+        "metrics": await get_insight_metrics(meeting_id),
         "analysis": analysis
     }
 
@@ -922,10 +1004,11 @@ async def parse_resume_with_gemini(content: bytes, mime_type: str) -> dict:
                 config=types.GenerateContentConfig(response_mime_type="application/json")
             )
 
-        response = await asyncio.to_thread(call_gemini)
+        from routes.gemini_analysis import gemini_scheduler, PRIORITY_BACKGROUND
+        response = await gemini_scheduler.run(call_gemini, room="resume", priority=PRIORITY_BACKGROUND)
         return json.loads(response.text)
     except Exception as e:
-        print(f"Gemini Parsing Error: {e}")
+        logger.warning("Gemini resume parsing error: %s", e)
         return {}
 
 async def validate_resume_with_gemini(content: bytes, mime_type: str) -> bool:
@@ -948,11 +1031,12 @@ async def validate_resume_with_gemini(content: bytes, mime_type: str) -> bool:
                 config=types.GenerateContentConfig(response_mime_type="application/json")
             )
 
-        response = await asyncio.to_thread(call_gemini)
+        from routes.gemini_analysis import gemini_scheduler, PRIORITY_BACKGROUND
+        response = await gemini_scheduler.run(call_gemini, room="resume", priority=PRIORITY_BACKGROUND)
         data = json.loads(response.text)
         return data.get("is_resume", False)
     except Exception as e:
-        print(f"Gemini Validation Error: {e}")
+        logger.warning("Gemini resume validation error: %s", e)
         return False
 
 @router.post("/users/me/resume")
@@ -988,63 +1072,63 @@ async def upload_resume(
     # Parse Data
     parsed_data = await parse_resume_with_gemini(content, mime_type)
     
-    # DB Update (User Table)
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE users SET resume_url = ?, resume_filename = ? WHERE username = ?", 
-        (resume_url, file.filename, current_user.username)
-    )
-    
-    # DB Upsert (Resume Data Table)
-    # Check if entry exists
-    existing = conn.execute("SELECT id FROM resume_data WHERE user_email = ?", (current_user.email,)).fetchone()
-    
     raw_json = json.dumps(parsed_data)
-    
-    if existing:
-        conn.execute("""
-            UPDATE resume_data SET 
-                summary=?, personal_info=?, experience=?, skills_soft=?, skills_hard=?, 
-                projects=?, achievements=?, certificates=?, education=?, links=?, raw_json=?, updated_at=?
-            WHERE user_email=?
-        """, (
-            parsed_data.get('summary'),
-            json.dumps(parsed_data.get('personal_info')),
-            json.dumps(parsed_data.get('experience')),
-            json.dumps(parsed_data.get('skills_soft')),
-            json.dumps(parsed_data.get('skills_hard')),
-            json.dumps(parsed_data.get('projects')),
-            json.dumps(parsed_data.get('achievements')),
-            json.dumps(parsed_data.get('certificates')),
-            json.dumps(parsed_data.get('education')),
-            json.dumps(parsed_data.get('links')),
-            raw_json,
-            datetime.utcnow(),
-            current_user.email
-        ))
-    else:
-        conn.execute("""
-            INSERT INTO resume_data (
-                user_email, summary, personal_info, experience, skills_soft, skills_hard, 
-                projects, achievements, certificates, education, links, raw_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            current_user.email,
-            parsed_data.get('summary'),
-            json.dumps(parsed_data.get('personal_info')),
-            json.dumps(parsed_data.get('experience')),
-            json.dumps(parsed_data.get('skills_soft')),
-            json.dumps(parsed_data.get('skills_hard')),
-            json.dumps(parsed_data.get('projects')),
-            json.dumps(parsed_data.get('achievements')),
-            json.dumps(parsed_data.get('certificates')),
-            json.dumps(parsed_data.get('education')),
-            json.dumps(parsed_data.get('links')),
-            raw_json
-        ))
-    
-    conn.commit()
-    conn.close()
+
+    def save_resume(conn):
+        # DB Update (User Table)
+        conn.execute(
+            "UPDATE users SET resume_url = ?, resume_filename = ? WHERE username = ?", 
+            (resume_url, file.filename, current_user.username)
+        )
+        
+        # DB Upsert (Resume Data Table)
+        # Check if entry exists
+        existing = conn.execute("SELECT id FROM resume_data WHERE user_email = ?", (current_user.email,)).fetchone()
+        
+        if existing:
+            conn.execute("""
+                UPDATE resume_data SET 
+                    summary=?, personal_info=?, experience=?, skills_soft=?, skills_hard=?, 
+                    projects=?, achievements=?, certificates=?, education=?, links=?, raw_json=?, updated_at=?
+                WHERE user_email=?
+            """, (
+                parsed_data.get('summary'),
+                json.dumps(parsed_data.get('personal_info')),
+                json.dumps(parsed_data.get('experience')),
+                json.dumps(parsed_data.get('skills_soft')),
+                json.dumps(parsed_data.get('skills_hard')),
+                json.dumps(parsed_data.get('projects')),
+                json.dumps(parsed_data.get('achievements')),
+                json.dumps(parsed_data.get('certificates')),
+                json.dumps(parsed_data.get('education')),
+                json.dumps(parsed_data.get('links')),
+                raw_json,
+                datetime.utcnow(),
+                current_user.email
+            ))
+        else:
+            conn.execute("""
+                INSERT INTO resume_data (
+                    user_email, summary, personal_info, experience, skills_soft, skills_hard, 
+                    projects, achievements, certificates, education, links, raw_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                current_user.email,
+                parsed_data.get('summary'),
+                json.dumps(parsed_data.get('personal_info')),
+                json.dumps(parsed_data.get('experience')),
+                json.dumps(parsed_data.get('skills_soft')),
+                json.dumps(parsed_data.get('skills_hard')),
+                json.dumps(parsed_data.get('projects')),
+                json.dumps(parsed_data.get('achievements')),
+                json.dumps(parsed_data.get('certificates')),
+                json.dumps(parsed_data.get('education')),
+                json.dumps(parsed_data.get('links')),
+                raw_json
+            ))
+
+    await db.write(save_resume)
+    invalidate_user(current_user.username)
     
     return {
         "message": "Resume uploaded and processed successfully", 
@@ -1062,9 +1146,7 @@ async def get_resume_data(email: str, current_user: User = Depends(get_current_u
     if not (is_self or is_interviewer):
         raise HTTPException(status_code=403, detail="Not authorized to view this resume data")
 
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM resume_data WHERE user_email = ?", (email,)).fetchone()
-    conn.close()
+    row = await db.fetch_one("SELECT * FROM resume_data WHERE user_email = ?", (email,))
     
     if not row:
         return {} # Return empty if no data yet
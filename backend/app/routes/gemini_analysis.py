@@ -9,12 +9,30 @@ This module provides WebSocket endpoints for:
 
 import os
 import json
+import time
 import asyncio
 import base64
-from typing import Dict, List, Optional
+import functools
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Union
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
 from core.dependencies import get_current_user_ws
-from core.database import get_db_connection
+from core.rate_limit import RateLimit
+from core.log import get_logger, sampled
+from core.bus import RoomBus, room_bus
+from core import ws_codec, segment_frame
+from core.heartbeat import heartbeat
+from core.stats import percentiles_ms
+from core.face_crop import face_cropper
+from core.change_detector import change_detector
+from core.database import db
+from core.schema import EMOTION_METER_COLUMNS
+from core.config import (
+    INSIGHT_FLUSH_BATCH, INSIGHT_FLUSH_INTERVAL_SECONDS, ANALYSIS_STALENESS_SAMPLES, GEMINI_MAX_IN_FLIGHT,
+    GEMINI_WAIT_SAMPLES
+)
 from models import User
 from dotenv import load_dotenv
 
@@ -22,6 +40,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 router = APIRouter()
+logger = get_logger("emotion")
+gemini_logger = get_logger("gemini")
+# One line per analysed segment is far too many at scale
+segment_log = sampled(gemini_logger)
+result_log = sampled(gemini_logger)
 
 # --- Gemini Configuration ---
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -62,16 +85,267 @@ Objective: Analyze candidate emotions during video interviews to provide intervi
 """
 
 
+class InsightWriter:
+    """
+    Write-behind buffer for the insights table.
+
+    Rows are queued in memory and written in one transaction once
+    INSIGHT_FLUSH_BATCH rows are waiting or INSIGHT_FLUSH_INTERVAL_SECONDS
+    have passed, so interviewers never wait on SQLite. Meeting start times
+    are cached per room for computing relative_seconds.
+    """
+
+    COLUMNS = (
+        "meeting_id", "timestamp", "emotion_json", "smart_nudge", "request_timestamp", "relative_seconds",
+        "dominant_emotion", "confidence", *EMOTION_METER_COLUMNS.values()
+    )
+    INSERT_SQL = f"INSERT INTO insights ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+    def __init__(self, max_batch: int = INSIGHT_FLUSH_BATCH, flush_interval: float = INSIGHT_FLUSH_INTERVAL_SECONDS):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._rows: List[tuple] = []
+        self._start_times: Dict[str, Optional[datetime]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def _meeting_start(self, room_id: str) -> Optional[datetime]:
+        if room_id in self._start_times:
+            return self._start_times[room_id]
+
+        start_dt = None
+        meeting = await db.fetch_one("SELECT started_at, created_at FROM meetings WHERE id = ?", (room_id,))
+        if meeting:
+            start_time_str = meeting['started_at'] or meeting['created_at']
+            if start_time_str:
+                try:
+                    # Robust parsing for DB timestamps (UTC is default)
+                    start_dt = datetime.fromisoformat(str(start_time_str).replace(' ', 'T'))
+                    if start_dt.tzinfo is None:
+                        start_dt = start_dt.replace(tzinfo=timezone.utc)
+                except ValueError as e:
+                    logger.warning("Relative time calc error: %s", e)
+            # created_at is only a stand-in until the interviewer presses start
+            if meeting['started_at']:
+                self._start_times[room_id] = start_dt
+        return start_dt
+
+    def forget_start_time(self, room_id: str):
+        """Drop the cached start time, e.g. when a meeting is (re)started."""
+        self._start_times.pop(room_id, None)
+
+    async def add(self, room_id: str, emotion_data: dict, request_timestamp_dt: Optional[datetime]):
+        # Get IST timestamp (UTC+5:30)
+        ist = timezone(timedelta(hours=5, minutes=30))
+        ist_timestamp = datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S')
+        request_timestamp_str = request_timestamp_dt.strftime('%Y-%m-%d %H:%M:%S') if request_timestamp_dt else None
+
+        # Calculate relative seconds
+        relative_seconds = 0
+        if request_timestamp_dt:
+            start_dt = await self._meeting_start(room_id)
+            if start_dt:
+                # Convert request time to UTC for diff
+                diff = (request_timestamp_dt.astimezone(timezone.utc) - start_dt).total_seconds()
+                relative_seconds = int(max(0, diff))
+
+        self._rows.append((
+            room_id, ist_timestamp, json.dumps(emotion_data), emotion_data.get("smart_nudge", ""),
+            request_timestamp_str, relative_seconds, *self._metrics(emotion_data)
+        ))
+
+        if len(self._rows) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    @staticmethod
+    def _metrics(emotion_data: dict) -> tuple:
+        """Typed column values, same precedence as the schema backfill."""
+        def as_int(value):
+            try:
+                return int(float(value))
+            except (TypeError, ValueError):
+                return None
+
+        meter = emotion_data.get("emotion_meter")
+        if not isinstance(meter, dict):
+            meter = {}
+        confidence = emotion_data.get("confident_meter")
+        if confidence is None:
+            confidence = emotion_data.get("confidence")
+        return (
+            emotion_data.get("dominant_emotion") or emotion_data.get("primary"),
+            as_int(confidence),
+            *(as_int(meter.get(key)) for key in EMOTION_METER_COLUMNS)
+        )
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """Write every buffered row in a single transaction."""
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return
+            try:
+                await db.executemany(self.INSERT_SQL, rows)
+            except Exception as e:
+                # Keep the rows (in order) for the next flush instead of dropping them
+                self._rows[:0] = rows
+                logger.error("DB save error (%d insights re-queued): %s", len(rows), e)
+
+    async def close_room(self, room_id: str):
+        """Persist everything buffered before a room goes away."""
+        self.forget_start_time(room_id)
+        await self.flush()
+
+    async def shutdown(self):
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        await self.flush()
+        if self._rows:
+            logger.error("%d insights could not be saved on shutdown", len(self._rows))
+
+
+insight_writer = InsightWriter()
+
+
+# Scheduler priorities: live segments go before post-meeting work
+PRIORITY_LIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class GeminiScheduler:
+    """
+    Every generate_content call goes through run(). At most `max_in_flight`
+    run at once, on a thread pool of their own rather than the default
+    executor everything else uses for to_thread. Waiting calls are served
+    by priority (live segments before meeting summaries and resumes) and,
+    within a priority, one room at a time in turn, so a room with many
+    calls waiting cannot hold up the others.
+    """
+
+    def __init__(self, max_in_flight: int = GEMINI_MAX_IN_FLIGHT, samples: int = GEMINI_WAIT_SAMPLES):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        # Per priority: room -> waiting futures, rooms in turn order
+        self._waiting = (OrderedDict(), OrderedDict())
+        self._waits = (deque(maxlen=samples), deque(maxlen=samples))  # Seconds
+        self.started = [0, 0]
+        self.failed = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, fn, *args, room: str, priority: int = PRIORITY_LIVE, **kwargs):
+        """Call fn(*args, **kwargs) in the pool once a slot is free for this room."""
+        loop = asyncio.get_running_loop()
+        queued = loop.time()
+        await self._acquire(room, priority)
+        self._waits[priority].append(loop.time() - queued)
+        self.started[priority] += 1
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="gemini")
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._release()
+
+    async def _acquire(self, room: str, priority: int):
+        if self.in_flight < self.max_in_flight and not any(self._waiting):
+            self.in_flight += 1
+            return
+        granted = asyncio.get_running_loop().create_future()
+        self._waiting[priority].setdefault(room, deque()).append(granted)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if granted.done() and not granted.cancelled():
+                self._release()  # Handed a slot just as we were cancelled
+            raise
+
+    def _release(self):
+        """Hand the slot straight to the next waiting call, if there is one."""
+        for waiting in self._waiting:
+            while waiting:
+                room, calls = next(iter(waiting.items()))
+                granted = calls.popleft()
+                if calls:
+                    waiting.move_to_end(room)  # Other rooms go first next time
+                else:
+                    del waiting[room]
+                if not granted.done():
+                    granted.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        stats = {"max_in_flight": self.max_in_flight, "in_flight": self.in_flight, "failed": self.failed}
+        for priority, name in ((PRIORITY_LIVE, "live"), (PRIORITY_BACKGROUND, "background")):
+            waiting = self._waiting[priority]
+            stats[name] = {
+                "queued": sum(len(calls) for calls in waiting.values()),
+                "rooms_waiting": len(waiting),
+                "started": self.started[priority],
+            }
+            if self._waits[priority]:
+                stats[name]["wait_ms"] = percentiles_ms(self._waits[priority])
+        return stats
+
+
+gemini_scheduler = GeminiScheduler()
+
+
+def _timed(fn, *args, **kwargs) -> tuple:
+    """(fn(*args, **kwargs), seconds it took), timed in the worker thread."""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def _b64_part(data: str) -> bytes:
+    """Decode a base64 segment part from a JSON message, skipping any data URL prefix."""
+    if data.startswith("data:"):
+        data = data[data.index(",") + 1:]
+    return base64.b64decode(data)
+
+
+def _insights(room_id: str) -> str:
+    """Bus channel (and membership) of a room's interviewers."""
+    return f"insights:{room_id}"
+
+
+def _analysis(room_id: str) -> str:
+    """Bus channel that controls a room's candidate analysis stream."""
+    return f"analysis:{room_id}"
+
+
 class EmotionAnalysisManager:
-    """Manages emotion analysis sessions and WebSocket connections."""
+    """
+    Manages emotion analysis sessions and WebSocket connections.
+
+    The candidate and the interviewers may be connected to different
+    workers: insights are published on the room bus (the latest one
+    retained for interviewers who connect later), interviewers are counted
+    there, and the last one to leave stops the candidate's stream wherever
+    it is.
+    """
     
-    def __init__(self):
-        # Room ID -> List of interviewer WebSockets (for broadcasting insights)
+    def __init__(self, bus: RoomBus = room_bus):
+        self.bus = bus
+        # Room ID -> List of interviewer WebSockets on this worker (for broadcasting insights)
         self.interviewer_connections: Dict[str, List[WebSocket]] = {}
-        # Room ID -> Candidate WebSocket
+        # Room ID -> Candidate WebSocket on this worker
         self.candidate_connections: Dict[str, WebSocket] = {}
-        # Room ID -> Latest emotion data
-        self.latest_emotions: Dict[str, dict] = {}
         # Gemini client (initialized lazily)
         self._genai_client = None
     
@@ -82,139 +356,141 @@ class EmotionAnalysisManager:
             try:
                 from google import genai
                 self._genai_client = genai.Client(api_key=GOOGLE_API_KEY)
-                print("[GEMINI] Client initialized successfully")
+                gemini_logger.info("Client initialized successfully")
             except Exception as e:
-                print(f"[GEMINI] Failed to initialize client: {e}")
+                gemini_logger.error("Failed to initialize client: %s", e)
         return self._genai_client
     
     async def connect_interviewer(self, websocket: WebSocket, room_id: str):
         """Connect an interviewer to receive emotion insights."""
         await websocket.accept()
+        await self.bus.join(_insights(room_id))
         if room_id not in self.interviewer_connections:
             self.interviewer_connections[room_id] = []
+            await self.bus.subscribe(_insights(room_id), self._send_to_interviewers)
         self.interviewer_connections[room_id].append(websocket)
-        print(f"[EMOTION] Interviewer connected to room '{room_id}'. Total: {len(self.interviewer_connections[room_id])}")
+        heartbeat.add(websocket, name=f"interviewer in room '{room_id}'")
+        logger.info("Interviewer connected to room '%s'. Total on this worker: %d", room_id, len(self.interviewer_connections[room_id]))
         
         # Send latest emotion data if available
-        if room_id in self.latest_emotions:
-            await websocket.send_json({
-                "type": "emotion_update",
-                "emotion": self.latest_emotions[room_id]
-            })
+        latest = await self.bus.retained(_insights(room_id))
+        if latest:
+            await websocket.send_text(ws_codec.dumps(latest))
     
     async def connect_candidate(self, websocket: WebSocket, room_id: str):
         """Connect a candidate to send video/audio for analysis."""
+        if room_id not in self.candidate_connections:
+            await self.bus.subscribe(_analysis(room_id), self._control_candidate)
         await websocket.accept()
         self.candidate_connections[room_id] = websocket
-        print(f"[EMOTION] Candidate connected for analysis in room '{room_id}'")
+        heartbeat.add(websocket, name=f"candidate in room '{room_id}'")
+        logger.info("Candidate connected for analysis in room '%s'", room_id)
     
     async def disconnect_interviewer(self, websocket: WebSocket, room_id: str):
         """Disconnect an interviewer. If no interviewers remain, stop the candidate's analysis."""
-        if room_id in self.interviewer_connections:
-            if websocket in self.interviewer_connections[room_id]:
-                self.interviewer_connections[room_id].remove(websocket)
-            if not self.interviewer_connections[room_id]:
-                del self.interviewer_connections[room_id]
-                # No interviewers left - stop the candidate's emotion analysis
-                if room_id in self.candidate_connections:
-                    try:
-                        candidate_ws = self.candidate_connections[room_id]
-                        await candidate_ws.close(code=1000, reason="Interviewer disconnected")
-                        print(f"[EMOTION] Stopped candidate analysis for room '{room_id}' - Interviewer left")
-                    except Exception as e:
-                        print(f"[EMOTION] Error closing candidate connection: {e}")
-                    finally:
-                        self.disconnect_candidate(room_id)
-                # Clean up latest emotions data for this room
-                if room_id in self.latest_emotions:
-                    del self.latest_emotions[room_id]
-        print(f"[EMOTION] Interviewer disconnected from room '{room_id}'")
+        heartbeat.discard(websocket)
+        connections = self.interviewer_connections.get(room_id)
+        if connections is None or websocket not in connections:
+            return  # Already cleaned up after a failed send
+        connections.remove(websocket)
+        if not connections:
+            del self.interviewer_connections[room_id]
+            await self.bus.unsubscribe(_insights(room_id), self._send_to_interviewers)
+
+        if await self.bus.leave(_insights(room_id)) == 0:
+            # No interviewers left on any worker - stop the candidate's emotion analysis
+            await self.bus.publish(_analysis(room_id), {"type": "stop"})
+            # Clean up latest emotions data for this room
+            await self.bus.clear(_insights(room_id))
+            await insight_writer.close_room(room_id)
+        logger.info("Interviewer disconnected from room '%s'", room_id)
     
-    def disconnect_candidate(self, room_id: str):
-        """Disconnect a candidate."""
-        if room_id in self.candidate_connections:
+    async def disconnect_candidate(self, room_id: str, websocket: Optional[WebSocket] = None):
+        """
+        Disconnect a candidate. With `websocket`, only if it is still the
+        room's candidate socket (not one that replaced it since).
+        """
+        current = self.candidate_connections.get(room_id)
+        if websocket is not None:
+            heartbeat.discard(websocket)
+            if current is not websocket:
+                return
+        if current is not None:
+            heartbeat.discard(current)
             del self.candidate_connections[room_id]
-        print(f"[EMOTION] Candidate disconnected from room '{room_id}'")
+            await self.bus.unsubscribe(_analysis(room_id), self._control_candidate)
+        logger.info("Candidate disconnected from room '%s'", room_id)
+
+    async def _control_candidate(self, channel: str, message: dict):
+        room_id = channel.split(":", 1)[1]
+        candidate_ws = self.candidate_connections.get(room_id)
+        if message.get("type") != "stop" or candidate_ws is None:
+            return
+        try:
+            await candidate_ws.close(code=1000, reason="Interviewer disconnected")
+            logger.info("Stopped candidate analysis for room '%s' - interviewer left", room_id)
+        except Exception as e:
+            logger.warning("Error closing candidate connection: %s", e)
+        finally:
+            await self.disconnect_candidate(room_id, candidate_ws)
+        # Insights buffered on this worker belong to the room that just ended
+        await insight_writer.close_room(room_id)
     
     async def broadcast_to_interviewers(self, room_id: str, emotion_data: dict):
         """Broadcast emotion update to all connected interviewers in a room."""
-        self.latest_emotions[room_id] = emotion_data
-        
-        if room_id in self.interviewer_connections:
-            # Save to Database (Sync for simplicity, consider async for prod)
+        # Internal field, not JSON serializable - keep it out of what we send
+        request_timestamp_dt = emotion_data.pop("_request_timestamp", None)
+        message = {"type": "emotion_update", "emotion": emotion_data}
+        await self.bus.publish(_insights(room_id), message, retain=True)
+
+        # Persist only while someone is watching, after they have their update (write-behind)
+        if room_id in self.interviewer_connections or await self.bus.members(_insights(room_id)):
             try:
-                from core.database import get_db_connection
-                from datetime import datetime, timezone, timedelta
-                
-                # Get IST timestamp (UTC+5:30)
-                ist = timezone(timedelta(hours=5, minutes=30))
-                ist_timestamp = datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Extract request timestamp
-                request_timestamp_dt = emotion_data.pop("_request_timestamp", None)
-                request_timestamp_str = request_timestamp_dt.strftime('%Y-%m-%d %H:%M:%S') if request_timestamp_dt else None
-                
-                conn = get_db_connection()
-                
-                # Calculate relative seconds
-                relative_seconds = 0
-                if request_timestamp_dt:
-                    meeting = conn.execute("SELECT started_at, created_at FROM meetings WHERE id = ?", (room_id,)).fetchone()
-                    if meeting:
-                        start_time_str = meeting['started_at'] or meeting['created_at']
-                        if start_time_str:
-                            try:
-                                # Robust parsing for DB timestamps (UTC is default)
-                                start_dt = datetime.fromisoformat(str(start_time_str).replace(' ', 'T'))
-                                if start_dt.tzinfo is None:
-                                    start_dt = start_dt.replace(tzinfo=timezone.utc)
-                                
-                                # Convert request time to UTC for diff
-                                req_utc = request_timestamp_dt.astimezone(timezone.utc)
-                                diff = (req_utc - start_dt).total_seconds()
-                                relative_seconds = int(max(0, diff))
-                            except Exception as e:
-                                print(f"[EMOTION] Relative time calc error: {e}")
-
-                conn.execute(
-                    "INSERT INTO insights (meeting_id, timestamp, emotion_json, smart_nudge, request_timestamp, relative_seconds) VALUES (?, ?, ?, ?, ?, ?)",
-                    (room_id, ist_timestamp, json.dumps(emotion_data), emotion_data.get("smart_nudge", ""), request_timestamp_str, relative_seconds)
-                )
-                conn.commit()
-                conn.close()
+                await insight_writer.add(room_id, emotion_data, request_timestamp_dt)
             except Exception as e:
-                print(f"[EMOTION] DB Save Error: {e}")
+                logger.error("DB save error: %s", e)
 
-            message = {"type": "emotion_update", "emotion": emotion_data}
-            disconnected = []
-            
-            for ws in self.interviewer_connections[room_id]:
-                try:
-                    await ws.send_json(message)
-                except Exception as e:
-                    print(f"[EMOTION] Failed to send to interviewer: {e}")
-                    disconnected.append(ws)
-            
-            # Clean up disconnected sockets
-            for ws in disconnected:
-                await self.disconnect_interviewer(ws, room_id)
+    async def _send_to_interviewers(self, channel: str, message: dict):
+        room_id = channel.split(":", 1)[1]
+        text = ws_codec.dumps(message)  # Once for every interviewer
+        disconnected = []
+        for ws in list(self.interviewer_connections.get(room_id, ())):
+            try:
+                await ws.send_text(text)
+            except Exception as e:
+                logger.warning("Failed to send to interviewer: %s", e)
+                disconnected.append(ws)
+
+        # Clean up disconnected sockets
+        for ws in disconnected:
+            await self.disconnect_interviewer(ws, room_id)
     
-    async def analyze_multimodal(self, room_id: str, frame_data: str, audio_data: Optional[str] = None) -> Optional[dict]:
+    async def analyze_multimodal(
+        self,
+        room_id: str,
+        frame_data: Union[str, bytes],
+        audio_data: Union[str, bytes, None] = None,
+        captured_at: Optional[datetime] = None,
+        stateless: bool = False
+    ) -> Optional[dict]:
         """
         Analyze video frame and 7-second audio segment using Gemini API.
         
         Args:
             room_id: The interview room ID
-            frame_data: Base64 encoded JPEG image (representative frame)
-            audio_data: Base64 encoded WAV audio (7 seconds of audio)
+            frame_data: JPEG image (representative frame), raw bytes from a binary
+                frame or base64 (optionally a data URL) from a JSON one
+            audio_data: WAV audio (7 seconds of audio), raw or base64 likewise
+            captured_at: When the segment was received, if it waited for analysis
+            stateless: A one-off frame, not part of a room's stream: no face
+                tracking and no carrying over, so nothing is kept for room_id
         """
-        # Capture IST timestamp at the start of the request
-        from datetime import datetime, timezone, timedelta
+        # Capture IST timestamp at the start of the request (or when the segment arrived)
         ist = timezone(timedelta(hours=5, minutes=30))
-        request_timestamp_dt = datetime.now(ist)
+        request_timestamp_dt = captured_at.astimezone(ist) if captured_at else datetime.now(ist)
 
         if not self.genai_client:
-            print("[GEMINI] No API key configured, using mock data")
+            segment_log.debug("No API key configured, using mock data")
             res = self._generate_mock_emotion()
             res["_request_timestamp"] = request_timestamp_dt
             return res
@@ -222,14 +498,25 @@ class EmotionAnalysisManager:
         try:
             from google.genai import types
             
-            print(f"[GEMINI] Processing 7-second segment for room '{room_id}'...")
-            
-            # Remove data URL prefix from video if present
-            if frame_data.startswith("data:image"):
-                frame_data = frame_data.split(",")[1]
-            image_bytes = base64.b64decode(frame_data)
-            print(f"[GEMINI] Video frame: {len(image_bytes)} bytes")
+            segment_log.debug("Processing 7-second segment for room '%s'", room_id)
             
+            image_bytes = frame_data if isinstance(frame_data, bytes) else _b64_part(frame_data)
+            # Just the face, scaled down: fewer bytes and image tokens per call
+            image_bytes = await face_cropper.process(None if stateless else room_id, image_bytes)
+            audio_bytes = None
+            if audio_data:
+                audio_bytes = audio_data if isinstance(audio_data, bytes) else _b64_part(audio_data)
+
+            # Same face, still silent: the last result stands, no call needed
+            signature = carried_over = None
+            if not stateless:
+                signature = await change_detector.signature(image_bytes, audio_bytes)
+                carried_over = change_detector.carry_over(room_id, signature)
+            if carried_over is not None:
+                segment_log.debug("Segment for room '%s' unchanged, result carried over", room_id)
+                carried_over["_request_timestamp"] = request_timestamp_dt
+                return carried_over
+                        
             contents_list = [
                 types.Part(text=EMOTION_SYSTEM_PROMPT),
                 types.Part(
@@ -241,13 +528,7 @@ class EmotionAnalysisManager:
             ]
 
             # Add audio if provided (7 seconds of captured audio)
-            if audio_data:
-                # Remove data URL prefix from audio if present
-                if audio_data.startswith("data:audio"):
-                    audio_data = audio_data.split(",")[1]
-                audio_bytes = base64.b64decode(audio_data)
-                print(f"[GEMINI] Audio segment: {len(audio_bytes)} bytes (~7 seconds)")
-                
+            if audio_bytes:
                 contents_list.append(
                     types.Part(
                         inline_data=types.Blob(
@@ -259,11 +540,14 @@ class EmotionAnalysisManager:
             
             contents_list.append(types.Part(text="Analyze this 7-second interview segment."))
 
-            response = await asyncio.to_thread(
+            response, seconds = await gemini_scheduler.run(
+                _timed,
                 self.genai_client.models.generate_content,
                 model=MODEL,
-                contents=[types.Content(parts=contents_list)]
+                contents=[types.Content(parts=contents_list)],
+                room=room_id
             )
+            face_cropper.record_model_call(seconds)
             
             # Parse the response
             response_text = response.text.strip()
@@ -300,14 +584,20 @@ class EmotionAnalysisManager:
             elif "confidence" not in emotion_data:
                 emotion_data["confidence"] = emotion_data.get("engagement_score", 7) * 10
             
-            print(f"[GEMINI] ✓ Sentiment: {emotion_data.get('primary')} | Confidence: {emotion_data.get('confidence')}% | Priority: {emotion_data.get('smart_nudge_priority', 'N/A')}")
+            result_log.debug(
+                "Sentiment: %s | Confidence: %s%% | Priority: %s",
+                emotion_data.get('primary'), emotion_data.get('confidence'), emotion_data.get('smart_nudge_priority', 'N/A')
+            )
             
+            if not stateless:
+                change_detector.analyzed_segment(room_id, signature, emotion_data)
+
             # Inject request timestamp
             emotion_data["_request_timestamp"] = request_timestamp_dt
             return emotion_data
             
         except Exception as e:
-            print(f"[GEMINI] ✗ Analysis failed: {e}")
+            gemini_logger.warning("Analysis failed: %s", e)
             res = self._generate_mock_emotion()
             res["_request_timestamp"] = request_timestamp_dt
             return res
@@ -351,6 +641,118 @@ class EmotionAnalysisManager:
 emotion_manager = EmotionAnalysisManager()
 
 
+class _Mailbox:
+    __slots__ = ("segment", "wakeup", "worker")
+
+    def __init__(self):
+        # (video, audio, received_at, client capture time or None, received loop time)
+        self.segment: Optional[tuple] = None
+        self.wakeup = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+
+
+class AnalysisMailbox:
+    """
+    One slot per room between the candidate's receive loop and Gemini.
+
+    The receive loop only posts segments; a worker task per room analyzes
+    whatever is in the slot and delivers the result. A segment that arrives
+    while the previous one is still waiting replaces it, so a slow model
+    call never builds a backlog and interviewers always get an analysis of
+    the most recent segment.
+
+    Staleness is the time from the candidate's client capturing a segment
+    to its insight being delivered. It uses the capture time the client
+    sends, so it includes the time the segment spent on the way and relies
+    on the client's clock; segments without one (older clients) and
+    samples made negative by a clock running ahead are left out.
+    queue_to_delivery is the server's part alone: from the segment
+    arriving to its insight being delivered.
+    """
+
+    def __init__(
+        self,
+        analyze: Callable[..., Awaitable[Optional[dict]]],
+        deliver: Callable[[str, dict], Awaitable[None]],
+        samples: int = ANALYSIS_STALENESS_SAMPLES
+    ):
+        self.analyze = analyze
+        self.deliver = deliver
+        self.rooms: Dict[str, _Mailbox] = {}
+        self.staleness: deque = deque(maxlen=samples)  # Seconds, capture to delivery
+        self.queue_to_delivery: deque = deque(maxlen=samples)  # Seconds, arrival to delivery
+        self.posted = 0
+        self.superseded = 0
+        self.delivered = 0
+
+    def post(
+        self,
+        room_id: str,
+        video: Union[str, bytes],
+        audio: Union[str, bytes, None] = None,
+        captured_at: Optional[datetime] = None
+    ):
+        mailbox = self.rooms.get(room_id)
+        if mailbox is None:
+            mailbox = self.rooms[room_id] = _Mailbox()
+            mailbox.worker = asyncio.create_task(self._work(room_id, mailbox))
+        if mailbox.segment is not None:
+            self.superseded += 1
+        mailbox.segment = (video, audio, datetime.now(timezone.utc), captured_at, asyncio.get_running_loop().time())
+        mailbox.wakeup.set()
+        self.posted += 1
+
+    async def close_room(self, room_id: str):
+        """Drop the waiting segment and stop the room's worker, mid-analysis or not."""
+        mailbox = self.rooms.pop(room_id, None)
+        if mailbox is None:
+            return
+        mailbox.segment = None
+        mailbox.worker.cancel()
+        try:
+            await mailbox.worker
+        except asyncio.CancelledError:
+            pass
+
+    async def _work(self, room_id: str, mailbox: _Mailbox):
+        loop = asyncio.get_running_loop()
+        while True:
+            await mailbox.wakeup.wait()
+            mailbox.wakeup.clear()
+            if mailbox.segment is None:
+                continue
+            (video, audio, received_at, captured_at, received), mailbox.segment = mailbox.segment, None
+            try:
+                result = await self.analyze(room_id, video, audio, captured_at=received_at)
+                if result:
+                    await self.deliver(room_id, result)
+                    self.delivered += 1
+                    self.queue_to_delivery.append(loop.time() - received)
+                    if captured_at is not None:
+                        staleness = (datetime.now(timezone.utc) - captured_at).total_seconds()
+                        if staleness >= 0:
+                            self.staleness.append(staleness)
+            except Exception as e:
+                logger.exception("Analysis for room '%s' failed: %s", room_id, e)
+
+    def stats(self) -> dict:
+        stats = {
+            "rooms": len(self.rooms),
+            "waiting": sum(1 for mailbox in self.rooms.values() if mailbox.segment is not None),
+            "posted": self.posted,
+            "superseded": self.superseded,
+            "delivered": self.delivered,
+        }
+        if self.staleness:
+            stats["staleness_ms"] = percentiles_ms(self.staleness)
+        if self.queue_to_delivery:
+            stats["queue_to_delivery_ms"] = percentiles_ms(self.queue_to_delivery)
+        return stats
+
+
+analysis_mailbox = AnalysisMailbox(emotion_manager.analyze_multimodal, emotion_manager.broadcast_to_interviewers)
+
+
 # --- WebSocket Endpoints ---
 
 @router.websocket("/ws/emotion/{room_id}")
@@ -358,11 +760,13 @@ async def emotion_analysis_endpoint(websocket: WebSocket, room_id: str, user: Us
     """
     WebSocket endpoint for candidates to send video/audio for emotion analysis.
     
-    Expected message format:
+    Segments arrive as binary frames (see core/segment_frame.py) or, from
+    older clients, as JSON:
     {
         "type": "multimodal_frame",
         "video": "base64...",
-        "audio": "base64..." (optional)
+        "audio": "base64..." (optional),
+        "captured_at": 1767259800125 (optional, ms since the epoch)
     }
     """
     room_id = room_id.lower()
@@ -370,9 +774,7 @@ async def emotion_analysis_endpoint(websocket: WebSocket, room_id: str, user: Us
     # --- Authorization Check ---
     is_authorized = False
     if user.role == "candidate":
-        conn = get_db_connection()
-        meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (room_id,)).fetchone()
-        conn.close()
+        meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (room_id,))
         
         # Check if meeting exists and user is the candidate
         if meeting:
@@ -382,35 +784,50 @@ async def emotion_analysis_endpoint(websocket: WebSocket, room_id: str, user: Us
                 is_authorized = True
     
     if not is_authorized:
-        print(f"[EMOTION] Unauthorized candidate access attempt for room {room_id} by {user.username}")
+        logger.warning("Unauthorized candidate access attempt for room %s by %s", room_id, user.username)
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
     # --- Check if analysis is enabled (local mode = skip analysis) ---
-    conn = get_db_connection()
-    meeting = conn.execute("SELECT creator_username FROM meetings WHERE id = ?", (room_id,)).fetchone()
-    if meeting:
-        creator = conn.execute("SELECT analysis_mode FROM users WHERE username = ?", (meeting["creator_username"],)).fetchone()
-        if creator and creator["analysis_mode"] == "local":
-            print(f"[EMOTION] Skipping analysis for room '{room_id}' - Local mode enabled by interviewer")
-            conn.close()
-            await emotion_manager.connect_candidate(websocket, room_id)
-            # Keep connection alive but don't process analysis
-            try:
-                while True:
-                    data = await websocket.receive_json()
-                    if data.get("type") == "ping":
-                        await websocket.send_json({"type": "pong"})
-            except WebSocketDisconnect:
-                emotion_manager.disconnect_candidate(room_id)
-            return
-    conn.close()
+    creator = await db.fetch_one(
+        """SELECT u.analysis_mode FROM meetings m
+           JOIN users u ON u.username = m.creator_username
+           WHERE m.id = ?""",
+        (room_id,)
+    )
+    if creator and creator["analysis_mode"] == "local":
+        logger.info("Skipping analysis for room '%s' - local mode enabled by interviewer", room_id)
+        await emotion_manager.connect_candidate(websocket, room_id)
+        # Keep connection alive but don't process analysis
+        try:
+            while True:
+                data = await ws_codec.receive_any(websocket)
+                heartbeat.seen(websocket)
+                if isinstance(data, dict) and data.get("type") == "ping":
+                    await websocket.send_json({"type": "pong"})
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.exception("Error in candidate connection: %s", e)
+        await emotion_manager.disconnect_candidate(room_id, websocket)
+        return
 
     await emotion_manager.connect_candidate(websocket, room_id)
     
     try:
         while True:
-            data = await websocket.receive_json()
+            data = await ws_codec.receive_any(websocket)
+            heartbeat.seen(websocket)
+
+            if isinstance(data, bytes):
+                try:
+                    video_data, audio_data, captured_at = segment_frame.decode(data)
+                except segment_frame.SegmentFrameError as e:
+                    logger.warning("Dropping malformed segment for room '%s': %s", room_id, e)
+                    continue
+                analysis_mailbox.post(room_id, video_data, audio_data, captured_at)
+                continue
+
             msg_type = data.get("type")
             
             if msg_type == "multimodal_frame":
@@ -418,20 +835,23 @@ async def emotion_analysis_endpoint(websocket: WebSocket, room_id: str, user: Us
                 audio_data = data.get("audio")
                 
                 if video_data:
-                    # Analyze the frame + audio
-                    emotion_result = await emotion_manager.analyze_multimodal(room_id, video_data, audio_data)
-                    
-                    if emotion_result:
-                        await emotion_manager.broadcast_to_interviewers(room_id, emotion_result)
+                    # Analyzed (and sent to interviewers) by the room's worker; never waits here
+                    captured_at = segment_frame.from_epoch_ms(data.get("captured_at"))
+                    analysis_mailbox.post(room_id, video_data, audio_data, captured_at)
             
             elif msg_type == "ping":
                 await websocket.send_json({"type": "pong"})
                 
     except WebSocketDisconnect:
-        emotion_manager.disconnect_candidate(room_id)
+        pass
     except Exception as e:
-        print(f"[EMOTION] Error in candidate connection: {e}")
-        emotion_manager.disconnect_candidate(room_id)
+        logger.exception("Error in candidate connection: %s", e)
+    # Unless a newer candidate socket has taken over the room
+    if emotion_manager.candidate_connections.get(room_id, websocket) is websocket:
+        await analysis_mailbox.close_room(room_id)
+        face_cropper.forget(room_id)
+        change_detector.forget(room_id)
+    await emotion_manager.disconnect_candidate(room_id, websocket)
 
 
 
@@ -451,32 +871,30 @@ async def insights_endpoint(websocket: WebSocket, room_id: str, user: User = Dep
     # --- Authorization Check ---
     is_authorized = False
     if user.role == "interviewer":
-        conn = get_db_connection()
-        meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (room_id,)).fetchone()
-        conn.close()
+        meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (room_id,))
         
         # Check if meeting exists and user is the creator
         if meeting and meeting["creator_username"] == user.username:
             is_authorized = True
             
     if not is_authorized:
-        print(f"[EMOTION] Unauthorized interviewer access attempt for room {room_id} by {user.username}")
+        logger.warning("Unauthorized interviewer access attempt for room %s by %s", room_id, user.username)
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await emotion_manager.connect_interviewer(websocket, room_id)
-    
     try:
+        await emotion_manager.connect_interviewer(websocket, room_id)
         while True:
             # Keep connection alive, handle pings
-            data = await websocket.receive_json()
+            data = await ws_codec.receive_json(websocket)
+            heartbeat.seen(websocket)
             if data.get("type") == "ping":
                 await websocket.send_json({"type": "pong"})
                 
     except WebSocketDisconnect:
         await emotion_manager.disconnect_interviewer(websocket, room_id)
     except Exception as e:
-        print(f"[EMOTION] Error in interviewer connection: {e}")
+        logger.exception("Error in interviewer connection: %s", e)
         await emotion_manager.disconnect_interviewer(websocket, room_id)
 
 
@@ -487,6 +905,10 @@ async def emotion_status():
         "service": "gemini_emotion_analysis",
         "api_configured": GOOGLE_API_KEY is not None,
         "model": MODEL,
+        "analysis": analysis_mailbox.stats(),
+        "scheduler": gemini_scheduler.stats(),
+        "face_crop": face_cropper.stats(),
+        "change_detector": change_detector.stats(),
         "active_rooms": list(emotion_manager.candidate_connections.keys()),
         "interviewer_connections": {
             room: len(connections) 
@@ -504,7 +926,7 @@ class AnalyzeRequest(BaseModel):
     frames_count: Optional[int] = 1
     audio: Optional[str] = None
 
-@router.post("/analyze")
+@router.post("/analyze", dependencies=[Depends(RateLimit("analyze"))])
 async def analyze_frame(request: AnalyzeRequest):
     """
     HTTP endpoint for analyzing a single frame via Gemini API.
@@ -514,7 +936,8 @@ async def analyze_frame(request: AnalyzeRequest):
         emotion_data = await emotion_manager.analyze_multimodal(
             room_id="docs-demo",
             frame_data=request.frame,
-            audio_data=request.audio
+            audio_data=request.audio,
+            stateless=True  # Unrelated callers share this name; keep nothing between them
         )
         
         if emotion_data:
@@ -531,7 +954,7 @@ async def analyze_frame(request: AnalyzeRequest):
             }
             
     except Exception as e:
-        print(f"[GEMINI] Analyze endpoint error: {e}")
+        gemini_logger.exception("Analyze endpoint error: %s", e)
         return {
             "success": False,
             "error": str(e),
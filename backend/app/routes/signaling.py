@@ -1,73 +1,306 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
-from typing import Dict, List
+import asyncio
+import weakref
+from collections import deque
+from typing import Dict, List, Optional, Set
 from core.dependencies import get_current_user_ws
-from core.database import get_db_connection
+from core.database import db
+from core.bus import RoomBus, room_bus
+from core.send_queue import SendQueue, SendStats
+from core import ws_codec
+from core.heartbeat import heartbeat, HEARTBEAT_ACK
+from core.meeting_clock import meeting_clock
+from core.config import ROOM_PARTICIPANT_LIMIT, SIGNALING_ICE_BATCH_MS, SIGNALING_NEGOTIATION_SAMPLES
+from core.log import get_logger, sampled
+from core.stats import percentiles_ms
 from models import User
 from datetime import datetime
 
 router = APIRouter()
+logger = get_logger("signaling")
+relay_log = sampled(logger)  # One line per relayed SDP/ICE message otherwise
 
 # --- Connection Manager ---
-# --- Connection Manager ---
+ICE_CANDIDATE = "candidate"
+ICE_BATCH = "ice_batch"
+# Sent by a client once its peer connection is up; ends the negotiation
+# in the relay metrics and is not passed on
+CONNECTED = "connected"
+
+
+def _channel(room_id: str) -> str:
+    return f"signal:{room_id}"
+
+
+class IceBatcher:
+    """
+    Holds the trickle-ICE candidates for one peer for `window` seconds and
+    sends them as a single {"type": "ice_batch", "candidates": [...]} frame.
+    Any other message flushes the batch first, so order is kept.
+    """
+
+    def __init__(self, peer: SendQueue, window: float):
+        self.peer = peer
+        self.window = window
+        self.pending: List[dict] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def add(self, candidate: dict):
+        self.pending.append(candidate)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self) -> int:
+        """Send whatever is pending; returns the number of candidates sent."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.pending:
+            return 0
+        candidates, self.pending = self.pending, []
+        self.peer.send(ws_codec.dumps({"type": ICE_BATCH, "candidates": candidates}))
+        return len(candidates)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.pending.clear()
+
+
+class _Negotiation:
+    __slots__ = ("started", "messages", "frames")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.messages = 0  # Relayed from clients
+        self.frames = 0  # Written to this worker's sockets
+
+
+class RelayMetrics:
+    """
+    Per-negotiation relay counts. A negotiation starts with an offer and
+    ends with the first "connected" report from either peer; recent ones
+    are kept for the messages-per-negotiation and time-to-connected stats.
+    """
+
+    def __init__(self, samples: int = SIGNALING_NEGOTIATION_SAMPLES):
+        self.open: Dict[str, _Negotiation] = {}
+        self.completed: deque = deque(maxlen=samples)  # (messages, frames, seconds)
+        self.relayed = 0
+        self.frames = 0
+        self.ice_candidates = 0
+        self.ice_batches = 0
+        self.abandoned = 0
+
+    def relayed_message(self, room_id: str, message_type: str):
+        self.relayed += 1
+        if message_type == "offer":
+            if room_id in self.open:
+                self.abandoned += 1  # Renegotiated before connecting
+            self.open[room_id] = _Negotiation(asyncio.get_running_loop().time())
+        negotiation = self.open.get(room_id)
+        if negotiation is not None:
+            negotiation.messages += 1
+
+    def sent_frames(self, room_id: str, count: int):
+        self.frames += count
+        negotiation = self.open.get(room_id)
+        if negotiation is not None:
+            negotiation.frames += count
+
+    def connected(self, room_id: str):
+        negotiation = self.open.pop(room_id, None)
+        if negotiation is not None:
+            elapsed = asyncio.get_running_loop().time() - negotiation.started
+            self.completed.append((negotiation.messages, negotiation.frames, elapsed))
+
+    def forget(self, room_id: str):
+        if self.open.pop(room_id, None) is not None:
+            self.abandoned += 1
+
+    def as_dict(self) -> dict:
+        stats = {
+            "relayed": self.relayed,
+            "frames": self.frames,
+            "ice_candidates": self.ice_candidates,
+            "ice_batches": self.ice_batches,
+            "negotiations": len(self.completed),
+            "negotiating": len(self.open),
+            "abandoned": self.abandoned,
+        }
+        if self.completed:
+            messages, frames, seconds = zip(*self.completed)
+            stats.update({
+                "messages_per_negotiation": round(sum(messages) / len(messages), 1),
+                "frames_per_negotiation": round(sum(frames) / len(frames), 1),
+                "time_to_connected_ms": percentiles_ms(seconds),
+            })
+        return stats
+
+
 class ConnectionManager:
-    def __init__(self):
-        # Room ID -> List of WebSockets
-        self.rooms: Dict[str, List[WebSocket]] = {}
+    """
+    Signaling rooms. Seats are taken on the room bus, so the two-person
+    limit holds across workers, and relayed messages go out on the room's
+    channel; each worker delivers them to its own sockets.
+
+    Delivery only puts the message on each peer's SendQueue, whose writer
+    task does the actual send, so a stalled peer never holds up the sender.
+    Peers that opted into ICE batching get their candidates through an
+    IceBatcher instead; offers and answers still go out immediately.
+    """
+
+    def __init__(self, bus: RoomBus = room_bus):
+        self.bus = bus
+        # Room ID -> send queues of the WebSockets connected to this worker
+        self.rooms: Dict[str, Set[SendQueue]] = {}
+        self.peers: Dict[WebSocket, SendQueue] = {}
+        self.send_stats = SendStats()
+        self.batchers: Dict[SendQueue, IceBatcher] = {}
+        self.metrics = RelayMetrics()
+        # Serialize subscribing and unsubscribing a room's channel; a lock
+        # lives only while some connect or release still holds it
+        self._room_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _peer_id(self, websocket: WebSocket) -> str:
+        return f"{self.bus.node}:{id(websocket)}"
+
+    def _room_lock(self, room_id: str) -> asyncio.Lock:
+        lock = self._room_locks.get(room_id)
+        if lock is None:
+            lock = self._room_locks[room_id] = asyncio.Lock()
+        return lock
 
-    async def connect(self, websocket: WebSocket, room_id: str) -> bool:
+    async def connect(self, websocket: WebSocket, room_id: str, ice_batch: bool = False) -> bool:
         """Connect a websocket to a room. Returns False if room is full (2 max)."""
-        if room_id not in self.rooms:
-            self.rooms[room_id] = []
-        
         # Enforce 2-person limit
-        if len(self.rooms[room_id]) >= 2:
+        if not await self.bus.join(_channel(room_id), limit=ROOM_PARTICIPANT_LIMIT):
             await websocket.accept()
             await websocket.send_json({"type": "error", "message": "Room is full. Maximum 2 participants allowed."})
             await websocket.close(code=4003, reason="Room full")
-            print(f"[SIGNALING] Rejected connection to room '{room_id}' - room is full (2 max)")
+            logger.info("Rejected connection to room '%s' - room is full (%d max)", room_id, ROOM_PARTICIPANT_LIMIT)
             return False
-        
-        await websocket.accept()
-        self.rooms[room_id].append(websocket)
-        print(f"[SIGNALING] Client connected to room '{room_id}'. Total clients in room: {len(self.rooms[room_id])}")
-        print(f"[SIGNALING] All active rooms: {list(self.rooms.keys())}")
+
+        # Subscribe before accepting, so the peer cannot send anything this
+        # worker is not yet listening for. The room is listed only once the
+        # subscription is in place, and under its lock, so a second client
+        # cannot skip ahead of it and a failed subscribe leaves nothing behind
+        async with self._room_lock(room_id):
+            try:
+                if room_id not in self.rooms:
+                    await self.bus.subscribe(_channel(room_id), self._deliver)
+                    self.rooms[room_id] = set()
+                await websocket.accept()
+            except Exception:
+                await self._close_if_empty(room_id)
+                await self.bus.leave(_channel(room_id))
+                raise
+            peer = SendQueue(websocket, name=self._peer_id(websocket), stats=self.send_stats)
+            peer.start()
+            heartbeat.add(websocket, name=f"peer {peer.name} in room '{room_id}'", send=peer.send)
+            self.peers[websocket] = peer
+            self.rooms[room_id].add(peer)
+        if ice_batch and SIGNALING_ICE_BATCH_MS > 0:
+            self.batchers[peer] = IceBatcher(peer, SIGNALING_ICE_BATCH_MS / 1000)
+        clock = await meeting_clock.watch(room_id, self.send_to_room)
+        if clock is not None:
+            peer.send(ws_codec.dumps(clock))
+        logger.info("Client connected to room '%s'. Clients in room on this worker: %d, active rooms: %d",
+                    room_id, len(self.rooms[room_id]), len(self.rooms))
         return True
 
-    def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.rooms:
-            if websocket in self.rooms[room_id]:
-                self.rooms[room_id].remove(websocket)
-            if not self.rooms[room_id]:
-                del self.rooms[room_id]
-        print(f"[SIGNALING] Client disconnected from room '{room_id}'")
+    async def disconnect(self, websocket: WebSocket, room_id: str):
+        heartbeat.discard(websocket)
+        peer = self.peers.pop(websocket, None)
+        if peer is None:
+            return
+        batcher = self.batchers.pop(peer, None)
+        if batcher is not None:
+            batcher.close()
+        await peer.close()
+        self.rooms.get(room_id, set()).discard(peer)
+        await self._release(room_id)
+        logger.info("Client disconnected from room '%s'", room_id)
+
+    async def _release(self, room_id: str):
+        """Give a seat back, and stop listening once no local client is left."""
+        async with self._room_lock(room_id):
+            await self._close_if_empty(room_id)
+        await self.bus.leave(_channel(room_id))
+
+    async def _close_if_empty(self, room_id: str):
+        # Called with the room's lock held
+        if not self.rooms.get(room_id):
+            self.rooms.pop(room_id, None)
+            self.metrics.forget(room_id)
+            meeting_clock.unwatch(room_id)
+            await self.bus.unsubscribe(_channel(room_id), self._deliver)
 
     async def broadcast_to_others(self, message: dict, sender: WebSocket, room_id: str):
-        if room_id in self.rooms:
-            other_clients = [c for c in self.rooms[room_id] if c != sender]
-            print(f"[SIGNALING] Broadcasting '{message.get('type')}' to {len(other_clients)} other client(s) in room '{room_id}'")
-            for connection in other_clients:
-                try:
-                    await connection.send_json(message)
-                    print(f"[SIGNALING] Successfully sent to a peer")
-                except Exception as e:
-                    print(f"[SIGNALING] Failed to send to peer: {e}")
-        else:
-            print(f"[SIGNALING] Room '{room_id}' not found for broadcast!")
+        await self.bus.publish(_channel(room_id), {"from": self._peer_id(sender), "data": message})
+
+    def send_to_room(self, room_id: str, message: dict):
+        """A server message (clock, expiry) for every client of the room on this worker."""
+        peers = self.rooms.get(room_id)
+        if peers:
+            text = ws_codec.dumps(message)
+            for peer in peers:
+                peer.send(text)
+
+    async def _deliver(self, channel: str, envelope: dict):
+        room_id = channel.split(":", 1)[1]
+        message = envelope["data"]
+        message_type = message.get("type")
+        if message_type == CONNECTED:
+            self.metrics.connected(room_id)
+            return
+        self.metrics.relayed_message(room_id, message_type)
+        other_peers = [p for p in self.rooms.get(room_id, ()) if p.name != envelope["from"]]
+        relay_log.debug("Relaying '%s' to %d other client(s) in room '%s'", message_type, len(other_peers), room_id)
+        text = None
+        frames = 0
+        for peer in other_peers:
+            batcher = self.batchers.get(peer)
+            if batcher is not None:
+                if message_type == ICE_CANDIDATE:
+                    if not batcher.pending:
+                        frames += 1  # The batch this candidate starts
+                        self.metrics.ice_batches += 1
+                    self.metrics.ice_candidates += 1
+                    batcher.add(message.get("candidate"))
+                    continue
+                batcher.flush()
+            if text is None:
+                text = ws_codec.dumps(message)  # Once, whatever the number of peers
+            peer.send(text)
+            frames += 1
+        self.metrics.sent_frames(room_id, frames)
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self.rooms),
+            "peers": len(self.peers),
+            "queued": sum(len(peer) for peer in self.peers.values()),
+            "ice_batching": len(self.batchers),
+            **self.send_stats.as_dict(),
+            "relay": self.metrics.as_dict(),
+        }
 
 manager = ConnectionManager()
 
 # --- Routes ---
 
 @router.websocket("/ws/{room_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: str, user: User = Depends(get_current_user_ws)):
+async def websocket_endpoint(
+    websocket: WebSocket, room_id: str, ice_batch: bool = False, user: User = Depends(get_current_user_ws)
+):
     # Normalize room_id to lowercase for consistency
     room_id = room_id.lower()
-    print(f"[SIGNALING] New WebSocket connection attempt for room: '{room_id}' by user: {user.username} ({user.role})")
+    logger.info("Connection attempt for room '%s' by %s (%s)", room_id, user.username, user.role)
     
     # --- Authorization Check ---
-    conn = get_db_connection()
-    meeting = conn.execute("SELECT * FROM meetings WHERE id = ?", (room_id,)).fetchone()
-    conn.close()
+    meeting = await db.fetch_one("SELECT * FROM meetings WHERE id = ?", (room_id,))
     
     if not meeting:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Meeting not found")
@@ -83,59 +316,55 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, user: User = De
             is_authorized = True
         # If no candidate assigned yet, and this is a registered candidate, assign them
         elif not meeting["candidate_email"] and user.email:
-            conn = get_db_connection()
-            conn.execute("UPDATE meetings SET candidate_email = ? WHERE id = ?", (user.email, room_id))
-            conn.commit()
-            conn.close()
+            await db.execute("UPDATE meetings SET candidate_email = ? WHERE id = ?", (user.email, room_id))
             is_authorized = True
-            print(f"[SIGNALING] Assigned candidate {user.email} to meeting {room_id}")
+            logger.info("Assigned candidate %s to meeting %s", user.email, room_id)
         # Or if logged in via code (guest)
         elif user.username == f"candidate_{room_id}":
             is_authorized = True
 
     if not is_authorized:
-        print(f"[SIGNALING] Authorization failed for user {user.username} in room {room_id}")
+        logger.warning("Authorization failed for user %s in room %s", user.username, room_id)
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not authorized for this meeting")
         return
 
-    conn = get_db_connection()
-    conn.execute("INSERT OR IGNORE INTO candidates (meeting_id, name, joined_at) VALUES (?, ?, ?)", 
-                 (room_id, user.full_name or user.username, datetime.utcnow()))
-    conn.commit()
-    conn.close()
+    await db.execute("INSERT OR IGNORE INTO candidates (meeting_id, name, joined_at) VALUES (?, ?, ?)", 
+                     (room_id, user.full_name or user.username, datetime.utcnow()))
 
     # Try to connect - will be rejected if room is full
-    connected = await manager.connect(websocket, room_id)
+    connected = await manager.connect(websocket, room_id, ice_batch=ice_batch)
     if not connected:
         return  # Connection was rejected (room full)
     
     try:
         while True:
-            data = await websocket.receive_json()
-            msg_type = data.get('type', 'unknown')
-            print(f"[SIGNALING] Received '{msg_type}' in room '{room_id}'")
+            data = await ws_codec.receive_json(websocket)
+            heartbeat.seen(websocket)
+            if data.get("type") == HEARTBEAT_ACK:
+                continue  # Only for this server, never relayed
             await manager.broadcast_to_others(data, websocket, room_id)
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, room_id)
-        
-        # Track leave time if candidate
-        if user.role == "candidate":
-            conn = get_db_connection()
-            # Update the latest entry for this candidate in this meeting
-            conn.execute("""
-                UPDATE candidates 
-                SET left_at = ? 
-                WHERE id = (
-                    SELECT id FROM candidates 
-                    WHERE meeting_id = ? AND name = ? 
-                    ORDER BY id DESC LIMIT 1
-                )
-            """, (datetime.utcnow(), room_id, user.full_name or user.username))
-            conn.commit()
-            conn.close()
-            print(f"[SIGNALING] Tracked candidate disconnect for {user.username}")
-
-        # Notify others that peer left
-        await manager.broadcast_to_others({"type": "peer_left"}, websocket, room_id)
+        pass
+    except Exception as e:
+        logger.exception("Error in signaling connection for room '%s': %s", room_id, e)
+
+    # Give the seat back even when the socket failed some other way
+    await manager.disconnect(websocket, room_id)
+
+    # Track leave time if candidate
+    if user.role == "candidate":
+        # Update the latest entry for this candidate in this meeting
+        await db.execute("""
+            UPDATE candidates 
+            SET left_at = ? 
+            WHERE id = (
+                SELECT id FROM candidates 
+                WHERE meeting_id = ? AND name = ? 
+                ORDER BY id DESC LIMIT 1
+            )
+        """, (datetime.utcnow(), room_id, user.full_name or user.username))
+        logger.info("Tracked candidate disconnect for %s", user.username)
 
+    # Notify others that peer left
+    await manager.broadcast_to_others({"type": "peer_left"}, websocket, room_id)
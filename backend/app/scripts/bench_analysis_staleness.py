@@ -0,0 +1,97 @@
+"""
+Insight staleness with a slow model: inline analysis vs the mailbox.
+
+The candidate sends a segment every 7 s; when Gemini takes longer than
+that, the old receive loop analyzed every segment in turn, so each insight
+was older than the last. AnalysisMailbox keeps only the newest waiting
+segment per room. Time is scaled down 100x: a segment every 70 ms, 20 ms
+on the way from the client's capture to the server, and an analysis
+taking 150 ms.
+
+Staleness is the time from the client capturing a segment to its insight
+being delivered (the capture time travels with the segment). Exits
+non-zero if the mailbox's worst case is not bounded by about two analyses
+plus the time on the way.
+
+Run from the app root:  python scripts/bench_analysis_staleness.py [segments]
+"""
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+SEGMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+SEGMENT_INTERVAL = 0.07
+TRANSIT = 0.02
+ANALYSIS_SECONDS = 0.15
+
+
+async def slow_analyze(room_id, video, audio=None, captured_at=None):
+    await asyncio.sleep(ANALYSIS_SECONDS)
+    return {"dominant_emotion": "neutral", "segment": video}
+
+
+async def inline():
+    """The old loop: the socket buffer queues segments while one is analyzed."""
+    loop = asyncio.get_running_loop()
+    buffered: asyncio.Queue = asyncio.Queue()
+    staleness = []
+
+    async def candidate():
+        for n in range(SEGMENTS):
+            buffered.put_nowait((n, loop.time() - TRANSIT))
+            await asyncio.sleep(SEGMENT_INTERVAL)
+
+    async def receive_loop():
+        for _ in range(SEGMENTS):
+            n, arrived = await buffered.get()
+            await slow_analyze("bench", str(n))
+            staleness.append(loop.time() - arrived)
+
+    await asyncio.gather(candidate(), receive_loop())
+    return staleness, SEGMENTS
+
+
+async def mailbox():
+    from routes.gemini_analysis import AnalysisMailbox
+
+    delivered = []
+
+    async def deliver(room_id, result):
+        delivered.append(result["segment"])
+
+    box = AnalysisMailbox(slow_analyze, deliver, samples=SEGMENTS)
+    for n in range(SEGMENTS):
+        captured_at = datetime.now(timezone.utc) - timedelta(seconds=TRANSIT)
+        box.post("bench", str(n), captured_at=captured_at)
+        await asyncio.sleep(SEGMENT_INTERVAL)
+    await asyncio.sleep(ANALYSIS_SECONDS * 2)  # Let the last one through
+    await box.close_room("bench")
+    return list(box.staleness), len(delivered), box.stats()
+
+
+def summary(staleness) -> str:
+    s = sorted(staleness)
+    return f"p50 {s[len(s) // 2] * 1000:7.0f}ms  p95 {s[int(len(s) * 0.95)] * 1000:7.0f}ms  max {s[-1] * 1000:7.0f}ms"
+
+
+def main():
+    old, old_count = asyncio.run(inline())
+    new, new_count, stats = asyncio.run(mailbox())
+
+    print(f"{SEGMENTS} segments {SEGMENT_INTERVAL * 1000:.0f}ms apart, {TRANSIT * 1000:.0f}ms on the way, "
+          f"analysis takes {ANALYSIS_SECONDS * 1000:.0f}ms")
+    print(f"inline   {old_count:>3} insights  {summary(old)}")
+    print(f"mailbox  {new_count:>3} insights  {summary(new)}  ({stats['superseded']} superseded)")
+    print(f"mailbox queue to delivery  p50 {stats['queue_to_delivery_ms']['p50']:7.0f}ms")
+
+    bound = 2 * ANALYSIS_SECONDS + SEGMENT_INTERVAL + TRANSIT
+    if max(new) > bound:
+        print(f"FAIL: mailbox staleness {max(new) * 1000:.0f}ms exceeds {bound * 1000:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Model calls skipped by ChangeDetector over a simulated interview.
+
+Segments are built like the client's: a JPEG frame (from a photo, or a
+synthetic image) with camera noise, and 7 s of 16-bit WAV at 44.1 kHz,
+either background noise or bursts of speech-level sound. The interview
+goes through phases:
+
+- talking: the candidate sits still and speaks; every segment is analyzed
+- still: still and silent; results are carried over
+- moving: silent but moving around; every segment is analyzed
+
+Prints the calls made and skipped per phase and the time taken to sign a
+segment (frame hash and voice check). Exits non-zero if a talking or
+moving segment is carried over, if nothing is carried over while still,
+or if more than CHANGE_MAX_CARRIED_OVER are carried over in a row.
+
+Run from the app root:  python scripts/bench_change_detector.py [photo]
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2
+import numpy as np
+
+from core.change_detector import ChangeDetector, frame_hash
+from core.config import CHANGE_MAX_CARRIED_OVER
+
+PHOTO = sys.argv[1] if len(sys.argv) > 1 else None
+PHASES = (("talking", 8), ("still", 16), ("moving", 8), ("still", 8))
+FRAME_SIDE = 384
+SAMPLE_RATE = 44100
+SEGMENT_SECONDS = 7
+rng = np.random.default_rng(0)
+
+
+def base_image():
+    if PHOTO:
+        image = cv2.imread(PHOTO, cv2.IMREAD_COLOR)
+        if image is None:
+            sys.exit(f"cannot read {PHOTO}")
+    else:
+        image = cv2.GaussianBlur(rng.integers(0, 255, (FRAME_SIDE, FRAME_SIDE, 3), dtype=np.uint8), (0, 0), 8)
+        image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+    return cv2.resize(image, (FRAME_SIDE * 5 // 4, FRAME_SIDE * 5 // 4))
+
+
+def frame(image, shift: int) -> bytes:
+    """A camera frame: a window into the image plus sensor noise, as JPEG."""
+    offset = FRAME_SIDE // 8 + shift
+    window = image[offset:offset + FRAME_SIDE, offset:offset + FRAME_SIDE].astype(np.int16)
+    noisy = np.clip(window + rng.normal(0, 3, window.shape), 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", noisy, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def wav(talking: bool) -> bytes:
+    n = SAMPLE_RATE * SEGMENT_SECONDS
+    samples = rng.normal(0, 10 ** (-55 / 20), n)  # Room noise
+    if talking:
+        syllables = (np.arange(n) // (SAMPLE_RATE // 5)) % 3 != 2  # Sound two fifths of a second in three
+        samples += syllables * rng.normal(0, 10 ** (-20 / 20), n)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+    header = (
+        b"RIFF" + (36 + len(pcm)).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little")
+        + (1).to_bytes(2, "little") + (1).to_bytes(2, "little") + SAMPLE_RATE.to_bytes(4, "little")
+        + (SAMPLE_RATE * 2).to_bytes(4, "little") + (2).to_bytes(2, "little") + (16).to_bytes(2, "little")
+        + b"data" + len(pcm).to_bytes(4, "little")
+    )
+    return header + pcm
+
+
+def segments():
+    image = base_image()
+    for phase, count in PHASES:
+        for n in range(count):
+            shift = (n % 4) * FRAME_SIDE // 24 if phase == "moving" else 0
+            yield phase, frame(image, shift), wav(phase == "talking")
+
+
+async def run():
+    detector = ChangeDetector()
+    results = {}
+    in_a_row = longest = 0
+    sign_times = []
+    for phase, jpeg, audio in segments():
+        started = time.perf_counter()
+        signature = await detector.signature(jpeg, audio)
+        sign_times.append(time.perf_counter() - started)
+        counts = results.setdefault(phase, [0, 0])  # analyzed, carried over
+        if detector.carry_over("bench", signature) is not None:
+            counts[1] += 1
+            in_a_row += 1
+            longest = max(longest, in_a_row)
+        else:
+            detector.analyzed_segment("bench", signature, {"dominant_emotion": "neutral", "_request_timestamp": None})
+            counts[0] += 1
+            in_a_row = 0
+    return results, longest, sign_times, detector.stats()
+
+
+def main():
+    results, longest, sign_times, stats = asyncio.run(run())
+    image = base_image()
+    still = bin(frame_hash(frame(image, 0)) ^ frame_hash(frame(image, 0))).count("1")
+    moved = bin(frame_hash(frame(image, 0)) ^ frame_hash(frame(image, FRAME_SIDE // 24))).count("1")
+
+    print(f"{sum(n for _, n in PHASES)} segments from {PHOTO or 'a synthetic image'}")
+    print(f"frame hash distance: same scene {still} bits, moved {FRAME_SIDE // 24}px {moved} bits")
+    print(f"{'phase':<10}{'analyzed':>10}{'carried over':>14}")
+    for phase, (analyzed, carried) in results.items():
+        print(f"{phase:<10}{analyzed:>10}{carried:>14}")
+    sign_times.sort()
+    print(f"skip rate {stats['skip_rate']:.0%}, signing a segment p50 {sign_times[len(sign_times) // 2] * 1000:.1f}ms "
+          f"max {sign_times[-1] * 1000:.1f}ms")
+
+    failures = []
+    for phase in ("talking", "moving"):
+        if results[phase][1]:
+            failures.append(f"{results[phase][1]} {phase} segments carried over")
+    if not results["still"][1]:
+        failures.append("nothing carried over while still and silent")
+    if longest > CHANGE_MAX_CARRIED_OVER:
+        failures.append(f"{longest} carried over in a row")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Requests/sec on /auth/users/me and /auth/meetings with and without the
+pooled WAL connection layer.
+
+Run from the app root:  python scripts/bench_db_pool.py [requests]
+Uses a throwaway database in a temp directory, never the real users.db.
+"""
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+MEETINGS = 50
+
+
+def setup():
+    workdir = tempfile.mkdtemp(prefix="sense-bench-")
+    os.chdir(workdir)
+
+    import main
+    from core import database
+    from fastapi.testclient import TestClient
+
+    session_id, _ = asyncio.run(database.create_session("bench@sense.com", "interviewer"))
+    conn = database.get_db_connection()
+    conn.execute(
+        "INSERT INTO users (username, email, full_name, hashed_password, role) VALUES (?, ?, ?, ?, ?)",
+        ("bench@sense.com", "bench@sense.com", "Bench", "x", "interviewer")
+    )
+    conn.executemany(
+        "INSERT INTO meetings (id, creator_username, candidate_email) VALUES (?, ?, ?)",
+        [(f"bench{i:04d}", "bench@sense.com", "sukesh.kandasamy@gmail.com") for i in range(MEETINGS)]
+    )
+    conn.commit()
+    conn.close()
+
+    client = TestClient(main.app)
+    client.cookies.set("access_token", session_id)
+    return database, client
+
+
+def run(client, path):
+    client.get(path)  # warm up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get(path)
+        assert response.status_code == 200, response.text
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    database, client = setup()
+    paths = ["/auth/users/me", "/auth/meetings"]
+
+    # Baseline: fresh connection per call, rollback journal, no PRAGMA tuning.
+    # Routes hold a reference to database.db, so swap the pool underneath it.
+    db = database.db
+    db._writer.submit(db._close_writer).result()
+    database.pool.close_all()
+    raw = sqlite3.connect(database.DB_NAME)
+    raw.execute("PRAGMA journal_mode = DELETE")
+    raw.close()
+    database.pool = db.pool = database.ConnectionPool(database.DB_NAME, max_idle=0, tune=False)
+    before = {path: run(client, path) for path in paths}
+
+    db._writer.submit(db._close_writer).result()
+    database.pool = db.pool = database.ConnectionPool(database.DB_NAME)
+    after = {path: run(client, path) for path in paths}
+
+    print(f"{'endpoint':<20}{'before req/s':>15}{'after req/s':>15}{'speedup':>10}")
+    for path in paths:
+        print(f"{path:<20}{before[path]:>15.0f}{after[path]:>15.0f}{after[path] / before[path]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
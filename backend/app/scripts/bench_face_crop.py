@@ -0,0 +1,128 @@
+"""
+Frames sent to Gemini with and without the face crop.
+
+Builds a run of candidate frames the way the client does (a 768x768 JPEG
+at quality 0.7) from a photo, moving the camera a little between segments,
+and runs them through FaceCropper twice: tracking the face between
+segments, and searching every whole frame. Prints bytes per frame before
+and after and the processing time per frame.
+
+With GOOGLE_API_KEY set, a few frames are also sent to the model as they
+are and cropped, and the call time and prompt tokens are compared.
+
+Pass a photo with a face (any format OpenCV reads); without one a
+synthetic frame with no face is used, which is only scaled down. Exits
+non-zero if processing makes frames larger, or if no face is found in a
+photo that was given.
+
+Run from the app root:  python scripts/bench_face_crop.py [photo] [segments]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2
+import numpy as np
+
+from core.face_crop import FaceCropper, DETECTED, TRACKED, NO_FACE
+
+PHOTO = sys.argv[1] if len(sys.argv) > 1 else None
+SEGMENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+FRAME_SIDE = 768
+CLIENT_QUALITY = 70
+MODEL_CALLS = 3
+
+
+def client_frames() -> list:
+    """JPEGs as the candidate's browser sends them, the camera drifting between segments."""
+    if PHOTO:
+        source = cv2.imread(PHOTO, cv2.IMREAD_COLOR)
+        if source is None:
+            sys.exit(f"cannot read {PHOTO}")
+        # Room around the photo, so the drifting camera keeps the face in frame
+        pad = max(source.shape[:2]) // 5
+        source = cv2.copyMakeBorder(source, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=(128, 128, 128))
+    else:
+        rng = np.random.default_rng(0)
+        source = cv2.GaussianBlur(rng.integers(0, 255, (720, 720, 3), dtype=np.uint8), (0, 0), 3)
+    side = int(FRAME_SIDE * 1.25)
+    source = cv2.resize(source, (side, side), interpolation=cv2.INTER_CUBIC)
+    random.seed(0)
+    x = y = (side - FRAME_SIDE) // 2
+    frames = []
+    for _ in range(SEGMENTS):
+        x = min(max(0, x + random.randint(-12, 12)), side - FRAME_SIDE)
+        y = min(max(0, y + random.randint(-12, 12)), side - FRAME_SIDE)
+        window = source[y:y + FRAME_SIDE, x:x + FRAME_SIDE]
+        frames.append(cv2.imencode(".jpg", window, [cv2.IMWRITE_JPEG_QUALITY, CLIENT_QUALITY])[1].tobytes())
+    return frames
+
+
+async def run(frames: list, redetect_every: int):
+    cropper = FaceCropper(redetect_every=redetect_every, workers=1)
+    out = []
+    started = time.perf_counter()
+    for frame in frames:
+        out.append(await cropper.process("bench", frame))
+    elapsed = time.perf_counter() - started
+    cropper.close()
+    return out, elapsed / len(frames), cropper.stats()
+
+
+def model_calls(original: bytes, processed: bytes):
+    from google import genai
+    from google.genai import types
+    from routes.gemini_analysis import MODEL, EMOTION_SYSTEM_PROMPT
+
+    client = genai.Client(api_key=os.environ["GOOGLE_API_KEY"])
+    print()
+    print(f"{'model call':<12}{'seconds':>10}{'prompt tokens':>15}")
+    for name, image in (("original", original), ("processed", processed)):
+        times, tokens = [], None
+        for _ in range(MODEL_CALLS):
+            started = time.perf_counter()
+            response = client.models.generate_content(model=MODEL, contents=[types.Content(parts=[
+                types.Part(text=EMOTION_SYSTEM_PROMPT),
+                types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=image)),
+                types.Part(text="Analyze this 7-second interview segment."),
+            ])])
+            times.append(time.perf_counter() - started)
+            tokens = response.usage_metadata.prompt_token_count
+        print(f"{name:<12}{sorted(times)[len(times) // 2]:>10.2f}{tokens:>15}")
+
+
+def main():
+    frames = client_frames()
+    tracked_out, tracked_time, tracked = asyncio.run(run(frames, redetect_every=5))
+    _, full_time, full = asyncio.run(run(frames, redetect_every=0))
+    if not tracked["enabled"]:
+        print("FAIL: OpenCV with bundled face cascades is not installed")
+        sys.exit(1)
+
+    bytes_in = sum(len(frame) for frame in frames)
+    bytes_out = sum(len(frame) for frame in tracked_out)
+    print(f"{SEGMENTS} frames from {PHOTO or 'a synthetic image with no face'}, sent at {tracked['size']}px")
+    print(f"bytes per frame   {bytes_in // SEGMENTS:>8} -> {bytes_out // SEGMENTS} ({(1 - bytes_out / bytes_in) * 100:.0f}% less)")
+    print(f"{'search':<18}{'ms per frame':>13}{'whole frame':>13}{'tracked':>9}{'no face':>9}")
+    for name, per_frame, stats in (("track the face", tracked_time, tracked), ("every whole frame", full_time, full)):
+        print(f"{name:<18}{per_frame * 1000:>13.1f}{stats[DETECTED]:>13}{stats[TRACKED]:>9}{stats[NO_FACE]:>9}")
+
+    if os.getenv("GOOGLE_API_KEY"):
+        model_calls(frames[0], tracked_out[0])
+    else:
+        print("model call time: set GOOGLE_API_KEY to compare")
+
+    if bytes_out > bytes_in:
+        print("FAIL: processed frames are larger")
+        sys.exit(1)
+    if PHOTO and tracked[NO_FACE] == SEGMENTS:
+        print("FAIL: no face found in the photo")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
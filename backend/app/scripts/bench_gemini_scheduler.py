@@ -0,0 +1,129 @@
+"""
+Gemini calls through GeminiScheduler vs straight asyncio.to_thread.
+
+The model call is replaced by a blocking sleep (CALL_SECONDS). Three
+scenarios, each run both ways:
+
+- default pool: while 20 calls run, how long a plain to_thread() job
+  (what the rest of the app uses the default executor for) waits
+- fairness: one room has 40 calls waiting when 5 other rooms send one
+  each; how long those 5 wait
+- priority: 12 post-meeting jobs are queued, then a live segment
+  arrives; how long the live call waits
+
+Exits non-zero if the scheduler lets more than max_in_flight calls run at
+once, or does not beat to_thread on fairness and priority.
+
+Run from the app root:  python scripts/bench_gemini_scheduler.py
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from routes.gemini_analysis import GeminiScheduler, PRIORITY_LIVE, PRIORITY_BACKGROUND
+
+CALL_SECONDS = 0.05
+MAX_IN_FLIGHT = 4
+
+
+class FakeModel:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(CALL_SECONDS)
+        with self._lock:
+            self.running -= 1
+
+
+def make_call(scheduler, model):
+    """Returns call(room, priority) -> seconds until the call started."""
+    async def call(room: str, priority: int = PRIORITY_LIVE) -> float:
+        queued = time.perf_counter()
+        started = []
+
+        def timed():
+            started.append(time.perf_counter())
+            model.generate_content()
+
+        if scheduler is None:
+            await asyncio.to_thread(timed)
+        else:
+            await scheduler.run(timed, room=room, priority=priority)
+        return started[0] - queued
+    return call
+
+
+async def default_pool(scheduler, model) -> float:
+    call = make_call(scheduler, model)
+    calls = [asyncio.create_task(call(f"room{n}")) for n in range(20)]
+    await asyncio.sleep(0.01)
+    queued = time.perf_counter()
+    await asyncio.to_thread(lambda: None)
+    waited = time.perf_counter() - queued
+    await asyncio.gather(*calls)
+    return waited
+
+
+async def fairness(scheduler, model) -> float:
+    call = make_call(scheduler, model)
+    flood = [asyncio.create_task(call("busy")) for _ in range(40)]
+    await asyncio.sleep(0.01)
+    others = await asyncio.gather(*(call(f"room{n}") for n in range(5)))
+    await asyncio.gather(*flood)
+    return max(others)
+
+
+async def priority(scheduler, model) -> float:
+    call = make_call(scheduler, model)
+    jobs = [asyncio.create_task(call(f"meeting{n}", PRIORITY_BACKGROUND)) for n in range(12)]
+    await asyncio.sleep(0.01)
+    live = await call("live")
+    await asyncio.gather(*jobs)
+    return live
+
+
+def run(scenario, scheduled: bool):
+    model = FakeModel()
+    scheduler = GeminiScheduler(max_in_flight=MAX_IN_FLIGHT) if scheduled else None
+    try:
+        return asyncio.run(scenario(scheduler, model)), model.peak
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+
+
+def main():
+    print(f"model call {CALL_SECONDS * 1000:.0f}ms, scheduler max_in_flight {MAX_IN_FLIGHT}, "
+          f"default pool {min(32, (os.cpu_count() or 1) + 4)} threads")
+    print(f"{'scenario':<44}{'to_thread':>12}{'scheduler':>12}")
+    failures = []
+    for name, scenario in (
+        ("other to_thread job waits (default pool)", default_pool),
+        ("5 quiet rooms wait behind a busy one", fairness),
+        ("live segment waits behind 12 summaries", priority),
+    ):
+        (before, _), (after, peak) = run(scenario, False), run(scenario, True)
+        print(f"{name:<44}{before * 1000:>10.0f}ms{after * 1000:>10.0f}ms")
+        if peak > MAX_IN_FLIGHT:
+            failures.append(f"{name}: {peak} calls ran at once")
+        if scenario is not default_pool and after >= before:
+            failures.append(f"{name}: no better than to_thread")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Frames written per WebRTC negotiation with and without ICE batching.
+
+Replays negotiations between two in-memory peers through the signaling
+ConnectionManager: an offer, an answer, then a trickle-ICE burst from each
+side (candidates 0.5 ms apart, as a browser gathers them), then the
+"connected" report. Peers connect once without and once with ice_batch,
+and the relay metrics from /status are printed for each.
+
+Exits non-zero if a candidate is lost or reordered, or if batching does
+not cut the frames written.
+
+Run from the app root:  python scripts/bench_ice_batching.py [negotiations]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+NEGOTIATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+CANDIDATES_PER_SIDE = 20
+CANDIDATE_GAP_SECONDS = 0.0005
+
+
+class FakeSocket:
+    """Stands in for a WebSocket and keeps the ICE candidates it receives, in order."""
+
+    def __init__(self):
+        self.frames = 0
+        self.candidates = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def send_text(self, text):
+        self.frames += 1
+        message = json.loads(text)
+        if message["type"] == "candidate":
+            self.candidates.append(message["candidate"]["candidate"])
+        elif message["type"] == "ice_batch":
+            self.candidates.extend(c["candidate"] for c in message["candidates"])
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+
+def candidate(side: str, n: int) -> dict:
+    return {
+        "type": "candidate",
+        "candidate": {
+            "candidate": f"candidate:{side}{n} 1 udp 2122260223 192.0.2.{n} 5{n:04d} typ host generation 0",
+            "sdpMid": "0",
+            "sdpMLineIndex": 0,
+        },
+    }
+
+
+async def trickle(manager, sender, side: str, room_id: str):
+    for n in range(CANDIDATES_PER_SIDE):
+        await manager.broadcast_to_others(candidate(side, n), sender, room_id)
+        await asyncio.sleep(CANDIDATE_GAP_SECONDS)
+
+
+async def negotiate(manager, a, b, room_id: str):
+    await manager.broadcast_to_others({"type": "offer", "offer": {"sdp": "v=0"}}, a, room_id)
+    await manager.broadcast_to_others({"type": "answer", "answer": {"sdp": "v=0"}}, b, room_id)
+    await asyncio.gather(trickle(manager, a, "a", room_id), trickle(manager, b, "b", room_id))
+    await manager.broadcast_to_others({"type": "connected"}, a, room_id)
+
+
+async def run(ice_batch: bool):
+    from routes.signaling import ConnectionManager
+    from core.bus import LocalBus
+
+    bus = LocalBus()
+    await bus.start()
+    manager = ConnectionManager(bus)
+    a, b = FakeSocket(), FakeSocket()
+    for peer in (a, b):
+        await manager.connect(peer, "bench", ice_batch=ice_batch)
+
+    start = time.perf_counter()
+    for _ in range(NEGOTIATIONS):
+        await negotiate(manager, a, b, "bench")
+    await asyncio.sleep(0.1)  # Last batch and the send queues
+    elapsed = time.perf_counter() - start
+
+    expected = {
+        "a": [candidate("b", n)["candidate"]["candidate"] for n in range(CANDIDATES_PER_SIDE)] * NEGOTIATIONS,
+        "b": [candidate("a", n)["candidate"]["candidate"] for n in range(CANDIDATES_PER_SIDE)] * NEGOTIATIONS,
+    }
+    intact = a.candidates == expected["a"] and b.candidates == expected["b"]
+    stats = manager.stats()["relay"]
+    for peer in (a, b):
+        await manager.disconnect(peer, "bench")
+    await bus.stop()
+    return a.frames + b.frames, elapsed, intact, stats
+
+
+def main():
+    os.chdir(tempfile.mkdtemp(prefix="sense-ice-"))
+    from core.database import init_db
+    init_db()  # The manager looks up each room's meeting clock
+    unbatched = asyncio.run(run(ice_batch=False))
+    batched = asyncio.run(run(ice_batch=True))
+
+    print(f"{NEGOTIATIONS} negotiations, {CANDIDATES_PER_SIDE} candidates per side, {CANDIDATE_GAP_SECONDS * 1000:.1f}ms apart")
+    print(f"{'mode':<12}{'frames':>9}{'per negotiation':>17}{'seconds':>10}  candidates")
+    for name, (frames, elapsed, intact, _) in (("per message", unbatched), ("ice_batch", batched)):
+        print(f"{name:<12}{frames:>9}{frames / NEGOTIATIONS:>17.1f}{elapsed:>10.2f}  {'in order' if intact else 'LOST OR REORDERED'}")
+    print()
+    print("relay metrics with ice_batch:")
+    print(json.dumps(batched[3], indent=2))
+
+    if not (unbatched[2] and batched[2]):
+        print("FAIL: ICE candidates lost or reordered")
+        sys.exit(1)
+    if batched[0] >= unbatched[0]:
+        print("FAIL: batching did not reduce the frames written")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+WebSocket ping latency during a login storm.
+
+Starts the app with uvicorn (once hashing inline on the event loop, once
+with the password-hash process pool), keeps a signaling WebSocket open
+and pings it while LOGINS concurrent logins hit /auth/login. Exits
+non-zero if the pooled run lets the worst ping exceed the threshold.
+
+The logins are spread over ACCOUNTS accounts and SOURCE_IPS loopback
+addresses so that none of them trips the login rate limits.
+
+Run from the app root:  python scripts/bench_login_storm.py [threshold_ms]
+Each run uses a throwaway database in a temp directory.
+"""
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+import statistics
+import subprocess
+
+import httpx
+import websockets
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+THRESHOLD_MS = float(sys.argv[1]) if len(sys.argv) > 1 else 100.0
+PORT = 8799
+LOGINS = 64
+ACCOUNTS = 16  # 4 logins each, under the per-account limit
+SOURCE_IPS = 8  # 127.0.0.2-9, 8 logins each, under the per-IP limit
+PING_INTERVAL = 0.02
+USER = "storm0@sense.com"
+CANDIDATE = "candidate@sense.com"
+PASSWORD = "storm-password"
+
+
+def start_server(workdir: str, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, PASSWORD_HASH_WORKERS=str(workers))
+    env.pop("GOOGLE_API_KEY", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_ROOT, "--port", str(PORT)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def pinger(ws, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        pong = await ws.ping()
+        await pong
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(PING_INTERVAL)
+
+
+async def storm(workdir: str) -> dict:
+    base = f"http://127.0.0.1:{PORT}"
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        # Meetings can only be created for a registered candidate
+        await client.post("/auth/signup", json={"username": CANDIDATE, "email": CANDIDATE, "full_name": "Candidate", "password": PASSWORD})
+        client.cookies.clear()
+        for n in range(ACCOUNTS):
+            client.cookies.clear()
+            await client.post("/auth/signup", json={"username": f"storm{n}@sense.com", "email": f"storm{n}@sense.com", "full_name": "Storm", "password": PASSWORD})
+        await client.post("/auth/login", data={"username": USER, "password": PASSWORD})
+        conn = sqlite3.connect(os.path.join(workdir, "users.db"))
+        conn.execute("UPDATE users SET role = 'interviewer' WHERE username = ?", (USER,))
+        conn.commit()
+        conn.close()
+        await client.post("/auth/meetings", json={"candidate_email": CANDIDATE, "id": "stormroom"})
+        cookie = {"Cookie": f"access_token={client.cookies['access_token']}"}
+
+        # Built up front: creating a client loads an SSL context, which
+        # would stall this loop (and the pings) in the middle of the storm
+        clients = [
+            httpx.AsyncClient(base_url=base, timeout=60,
+                              transport=httpx.AsyncHTTPTransport(local_address=f"127.0.0.{2 + n % SOURCE_IPS}"))
+            for n in range(LOGINS)
+        ]
+
+        async def login(n: int):
+            r = await clients[n].post("/auth/login", data={"username": f"storm{n % ACCOUNTS}@sense.com", "password": PASSWORD})
+            return r.status_code
+
+        async with websockets.connect(f"ws://127.0.0.1:{PORT}/ws/stormroom", additional_headers=cookie) as ws:
+            stop = asyncio.Event()
+            samples = []
+            ping_task = asyncio.create_task(pinger(ws, stop, samples))
+            await asyncio.sleep(0.5)  # Idle baseline
+
+            start = time.perf_counter()
+            codes = await asyncio.gather(*(login(n) for n in range(LOGINS)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await ping_task
+
+        for c in clients:
+            await c.aclose()
+
+    return {
+        "p50": statistics.median(samples),
+        "p99": sorted(samples)[int(len(samples) * 0.99) - 1],
+        "max": max(samples),
+        "ok": codes.count(200),
+        "busy": codes.count(503),
+        "limited": codes.count(429),
+        "seconds": elapsed,
+    }
+
+
+def run(workers: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="sense-storm-")
+    server = start_server(workdir, workers)
+    try:
+        return asyncio.run(storm(workdir))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    inline = run(0)
+    pooled = run(int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+
+    print(f"{LOGINS} concurrent logins")
+    print(f"{'mode':<10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'200':>6}{'503':>6}{'429':>6}{'storm s':>9}")
+    for name, r in (("inline", inline), ("pool", pooled)):
+        print(f"{name:<10}{r['p50']:>9.1f}{r['p99']:>9.1f}{r['max']:>9.1f}{r['ok']:>6}{r['busy']:>6}{r['limited']:>6}{r['seconds']:>9.2f}")
+
+    if pooled["limited"]:
+        print("FAIL: logins were rate limited, so the storm did not reach the hasher")
+        sys.exit(1)
+
+    if pooled["max"] > THRESHOLD_MS:
+        print(f"FAIL: worst ping {pooled['max']:.1f}ms exceeds {THRESHOLD_MS}ms")
+        sys.exit(1)
+    print(f"OK: pings stayed under {THRESHOLD_MS}ms during the storm")
+
+
+if __name__ == "__main__":
+    main()
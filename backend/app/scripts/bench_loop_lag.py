@@ -0,0 +1,85 @@
+"""
+Event-loop lag while SQLite writes are saturated.
+
+A ticker task measures how late asyncio wakes it up while writer tasks
+hammer the insights table, once with blocking sqlite3 calls made directly
+on the loop (the old behaviour) and once through core.database.db.
+Exits non-zero if the async layer lets lag exceed the threshold.
+
+Run from the app root:  python scripts/bench_loop_lag.py [threshold_ms]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+THRESHOLD_MS = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+DURATION = 3.0
+WRITERS = 8
+TICK = 0.005
+
+INSERT = "INSERT INTO insights (meeting_id, emotion_json, smart_nudge) VALUES (?, ?, ?)"
+ROW = ("lagtest", '{"dominant_emotion": "neutral", "confident_meter": 50}' * 20, "")
+
+
+async def ticker(stop: asyncio.Event):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        worst = max(worst, time.perf_counter() - start - TICK)
+    return worst * 1000
+
+
+async def measure(write):
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stop))
+    count = 0
+
+    async def writer():
+        nonlocal count
+        while not stop.is_set():
+            await write()
+            count += 1
+            await asyncio.sleep(0)
+
+    writers = [asyncio.create_task(writer()) for _ in range(WRITERS)]
+    await asyncio.sleep(DURATION)
+    stop.set()
+    await asyncio.gather(*writers)
+    return await tick, count / DURATION
+
+
+async def main():
+    os.chdir(tempfile.mkdtemp(prefix="sense-lag-"))
+    from core import database
+    database.init_db()
+
+    async def blocking_write():
+        conn = database.get_db_connection()
+        conn.execute(INSERT, ROW)
+        conn.commit()
+        conn.close()
+
+    async def async_write():
+        await database.db.execute(INSERT, ROW)
+
+    blocking_lag, blocking_rate = await measure(blocking_write)
+    async_lag, async_rate = await measure(async_write)
+    database.db.close()
+
+    print(f"{'mode':<12}{'max lag ms':>12}{'writes/s':>12}")
+    print(f"{'blocking':<12}{blocking_lag:>12.1f}{blocking_rate:>12.0f}")
+    print(f"{'async db':<12}{async_lag:>12.1f}{async_rate:>12.0f}")
+
+    if async_lag > THRESHOLD_MS:
+        print(f"FAIL: event-loop lag {async_lag:.1f}ms exceeds {THRESHOLD_MS}ms")
+        sys.exit(1)
+    print(f"OK: event-loop lag stayed under {THRESHOLD_MS}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
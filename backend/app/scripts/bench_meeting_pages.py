@@ -0,0 +1,138 @@
+"""
+Meeting-list latency at the first page and 10,000 rows deep.
+
+Compares the old GET /auth/meetings (LIMIT/OFFSET plus a candidates and a
+users query per meeting) with the current single-query keyset version.
+Exits non-zero if the keyset endpoint is not flat, i.e. a deep page costs
+more than DEPTH_RATIO times the first one.
+
+Run from the app root:  python scripts/bench_meeting_pages.py [repeats]
+Uses a throwaway database in a temp directory, never the real users.db.
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import statistics
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+MEETINGS = 12_000
+DEEP = 10_000
+PAGE = 5
+DEPTH_RATIO = 3.0
+INTERVIEWER = "bench@sense.com"
+
+
+def setup():
+    os.chdir(tempfile.mkdtemp(prefix="sense-pages-"))
+
+    import main
+    from core import database
+    from fastapi.testclient import TestClient
+
+    session_id, _ = asyncio.run(database.create_session(INTERVIEWER, "interviewer"))
+    with database.db_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (username, email, full_name, hashed_password, role) VALUES (?, ?, ?, ?, ?)",
+            (INTERVIEWER, INTERVIEWER, "Bench", "x", "interviewer")
+        )
+        conn.executemany(
+            "INSERT INTO users (username, email, full_name, hashed_password, role) VALUES (?, ?, ?, ?, ?)",
+            [(f"c{i}@sense.com", f"c{i}@sense.com", f"Candidate {i}", "x", "candidate") for i in range(500)]
+        )
+        conn.executemany(
+            "INSERT INTO meetings (id, creator_username, candidate_email, created_at) VALUES (?, ?, ?, ?)",
+            [(f"m{i:06d}", INTERVIEWER, f"c{i % 500}@sense.com", f"2025-01-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00")
+             for i in range(MEETINGS)]
+        )
+        conn.executemany(
+            "INSERT INTO candidates (meeting_id, name) VALUES (?, ?)",
+            [(f"m{i:06d}", f"Candidate {i % 500}") for i in range(MEETINGS)]
+        )
+        conn.commit()
+
+    client = TestClient(main.app)
+    client.cookies.set("access_token", session_id)
+    return database, client
+
+
+def old_page(conn, offset):
+    """The pre-keyset implementation, kept here for comparison."""
+    rows = conn.execute(
+        "SELECT * FROM meetings WHERE creator_username = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+        (INTERVIEWER, PAGE, offset)
+    ).fetchall()
+    results = []
+    for row in rows:
+        meeting = dict(row)
+        meeting['candidates'] = [c['name'] for c in conn.execute(
+            "SELECT name FROM candidates WHERE meeting_id = ?", (meeting['id'],)
+        ).fetchall()]
+        conn.execute(
+            "SELECT full_name, profile_photo_url FROM users WHERE email = ?", (meeting['candidate_email'],)
+        ).fetchone()
+        results.append(meeting)
+    return results
+
+
+def median_ms(fn):
+    fn()  # warm up
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    database, client = setup()
+    from routes.auth import encode_cursor
+    from core.dependencies import load_user
+
+    with database.db_connection() as conn:
+        # Cursor for the row just above position DEEP, i.e. what a client
+        # holds after paging that far.
+        row = conn.execute(
+            "SELECT created_at, id FROM meetings WHERE creator_username = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+            (INTERVIEWER, DEEP - 1)
+        ).fetchone()
+        deep_cursor = encode_cursor(row['created_at'], row['id'])
+
+        old_first = median_ms(lambda: old_page(conn, 0))
+        old_deep = median_ms(lambda: old_page(conn, DEEP))
+
+    # The route itself, minus HTTP, so both rows measure data access only
+    from fastapi import Response
+    from routes.auth import get_meetings
+    user = asyncio.run(load_user(INTERVIEWER))
+    loop = asyncio.new_event_loop()
+
+    def fetch(cursor):
+        page = loop.run_until_complete(get_meetings(Response(), PAGE, cursor, user))
+        assert len(page) == PAGE
+
+    new_first = median_ms(lambda: fetch(None))
+    new_deep = median_ms(lambda: fetch(deep_cursor))
+    loop.close()
+
+    # And once end to end, to make sure the cursor round-trips over HTTP
+    response = client.get("/auth/meetings", params={"limit": PAGE, "cursor": deep_cursor})
+    assert response.status_code == 200 and response.headers.get("X-Next-Cursor"), response.text
+
+    print(f"{'':<12}{'offset 0 ms':>14}{f'offset {DEEP} ms':>18}")
+    print(f"{'offset/N+1':<12}{old_first:>14.3f}{old_deep:>18.3f}")
+    print(f"{'keyset':<12}{new_first:>14.3f}{new_deep:>18.3f}")
+
+    if new_deep > new_first * DEPTH_RATIO:
+        print(f"FAIL: deep page is {new_deep / new_first:.1f}x slower than the first")
+        sys.exit(1)
+    print("OK: keyset latency is flat with depth")
+
+
+if __name__ == "__main__":
+    main()
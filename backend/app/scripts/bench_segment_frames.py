@@ -0,0 +1,94 @@
+"""
+Server CPU per candidate segment: JSON/base64 vs binary frames.
+
+A segment is a 768x768 JPEG (random bytes of a typical size) and 7 seconds
+of 16-bit mono WAV at 44.1 kHz. For each protocol this measures what the
+server does between the frame arriving and the Gemini request being
+built: UTF-8 decoding the text frame, parsing the JSON, stripping the data
+URL prefixes and b64decoding each part, or decoding the binary header and
+slicing out the parts; then the types.Part/Blob objects for the request.
+
+Exits non-zero if the binary protocol costs more CPU or bytes per segment
+than the JSON one, or does not round-trip the segment.
+
+Run from the app root:  python scripts/bench_segment_frames.py [segments]
+"""
+import os
+import sys
+import time
+import base64
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from google.genai import types
+
+from core import ws_codec, segment_frame
+from routes.gemini_analysis import _b64_part
+
+SEGMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+JPEG_BYTES = 80 * 1024
+WAV_BYTES = 44 + 7 * 44100 * 2
+
+
+def parts(image_bytes: bytes, audio_bytes: bytes) -> list:
+    return [
+        types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=image_bytes)),
+        types.Part(inline_data=types.Blob(mime_type="audio/wav", data=audio_bytes)),
+    ]
+
+
+def from_json(frame: bytes) -> list:
+    data = ws_codec.loads(frame.decode())  # The server decodes text frames to str
+    return parts(_b64_part(data["video"]), _b64_part(data["audio"]))
+
+
+def from_binary(frame: bytes) -> list:
+    video, audio, _ = segment_frame.decode(frame)
+    return parts(video, audio)
+
+
+def cpu_per_segment(handle, frame: bytes) -> float:
+    handle(frame)  # Warm up
+    start = time.process_time()
+    for _ in range(SEGMENTS):
+        handle(frame)
+    return (time.process_time() - start) / SEGMENTS
+
+
+def main():
+    jpeg, wav = os.urandom(JPEG_BYTES), os.urandom(WAV_BYTES)
+    json_frame = ws_codec.dumps({
+        "type": "multimodal_frame",
+        "video": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode(),
+        "audio": "data:audio/wav;base64," + base64.b64encode(wav).decode(),
+    }).encode()
+    captured_at = datetime(2026, 1, 1, 9, 30, 0, 125000, tzinfo=timezone.utc)
+    binary_frame = segment_frame.encode(jpeg, wav, captured_at)
+
+    intact = all(
+        [p.inline_data.data for p in handle(frame)] == [jpeg, wav]
+        for handle, frame in ((from_json, json_frame), (from_binary, binary_frame))
+    ) and segment_frame.decode(binary_frame).captured_at == captured_at
+    results = [
+        ("json", len(json_frame), cpu_per_segment(from_json, json_frame)),
+        ("binary", len(binary_frame), cpu_per_segment(from_binary, binary_frame)),
+    ]
+
+    print(f"{SEGMENTS} segments: {JPEG_BYTES // 1024} KB JPEG + {WAV_BYTES // 1024} KB WAV, json backend {ws_codec.BACKEND}")
+    print(f"{'protocol':<10}{'KB on wire':>12}{'CPU per segment':>18}")
+    for name, size, cpu in results:
+        print(f"{name:<10}{size / 1024:>12.0f}{cpu * 1000:>16.2f}ms")
+    (_, json_size, json_cpu), (_, binary_size, binary_cpu) = results
+    print(f"binary saves {(1 - binary_size / json_size) * 100:.0f}% of the bytes and {(1 - binary_cpu / json_cpu) * 100:.0f}% of the CPU")
+
+    if not intact:
+        print("FAIL: a protocol did not round-trip the segment")
+        sys.exit(1)
+    if binary_cpu >= json_cpu or binary_size >= json_size:
+        print("FAIL: binary frames are no cheaper than JSON")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Signaling relay throughput before and after the logging pipeline.
+
+Relays ICE-candidate sized messages between two in-memory peers through
+ConnectionManager.broadcast_to_others. "print" is the old relay loop,
+which printed one line on receive, one per broadcast and one per peer.
+"logging" is the current manager (through the in-process room bus and
+the per-peer send queues) at the default INFO level, and "logging+debug"
+turns on the sampled per-message debug line. A run ends when the
+receiving peer has been sent every message.
+
+Then a peer whose sends never complete joins a room: the old loop stops
+relaying at the first message, the current one keeps relaying and closes
+the stalled peer once its queue fills. Exits non-zero if it does not.
+
+stdout is pointed at a file while measuring. That is the cheapest sink
+print() can hit, so the "print" numbers are a best case. A terminal or
+a container log pipe is slower.
+
+Run from the app root:  python scripts/bench_signaling_relay.py [messages]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+MESSAGE = {
+    "type": "ice-candidate",
+    "candidate": {
+        "candidate": "candidate:842163049 1 udp 1677729535 203.0.113.7 46154 typ srflx raddr 10.0.0.5 rport 46154 generation 0",
+        "sdpMid": "0",
+        "sdpMLineIndex": 0,
+    },
+}
+
+
+class FakeSocket:
+    """Stands in for a WebSocket: send_json serializes like Starlette does."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        json.dumps(data, separators=(",", ":"))
+        self.sent += 1
+
+    async def send_text(self, text):
+        self.sent += 1
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.close_code = code
+
+
+class StalledSocket(FakeSocket):
+    """A peer whose TCP buffer is full: sends never complete."""
+
+    async def send_json(self, data):
+        await asyncio.Event().wait()
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+
+class PrintingManager:
+    """The relay loop as it was, print() calls included."""
+
+    def __init__(self, rooms):
+        self.rooms = rooms
+
+    async def broadcast_to_others(self, message: dict, sender, room_id: str):
+        if room_id in self.rooms:
+            other_clients = [c for c in self.rooms[room_id] if c != sender]
+            print(f"[SIGNALING] Broadcasting '{message.get('type')}' to {len(other_clients)} other client(s) in room '{room_id}'")
+            for connection in other_clients:
+                try:
+                    await connection.send_json(message)
+                    print(f"[SIGNALING] Successfully sent to a peer")
+                except Exception as e:
+                    print(f"[SIGNALING] Failed to send to peer: {e}")
+        else:
+            print(f"[SIGNALING] Room '{room_id}' not found for broadcast!")
+
+
+async def relay(manager, sender, receiver, room_id, log_receive, messages=MESSAGES):
+    target = receiver.sent + messages
+    start = time.perf_counter()
+    for _ in range(messages):
+        if log_receive:
+            print(f"[SIGNALING] Received '{MESSAGE.get('type', 'unknown')}' in room '{room_id}'")
+        await manager.broadcast_to_others(MESSAGE, sender, room_id)
+        await asyncio.sleep(0)  # The next message would come from receive_json()
+    while receiver.sent < target:
+        await asyncio.sleep(0)
+    return messages / (time.perf_counter() - start)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="sense-relay-")
+    os.chdir(workdir)
+    from core.log import setup_logging, shutdown_logging
+    from core.database import init_db
+    from routes.signaling import manager
+
+    setup_logging()
+    init_db()  # The manager looks up each room's meeting clock
+    a, b = FakeSocket(), FakeSocket()
+    printing = PrintingManager({"bench": [a, b]})
+
+    async def run_all():
+        before = await relay(printing, a, b, "bench", log_receive=True)
+        for peer in (a, b):
+            await manager.connect(peer, "bench")
+        after = await relay(manager, a, b, "bench", log_receive=False)
+        logging.getLogger("sense.signaling").setLevel(logging.DEBUG)
+        debug = await relay(manager, a, b, "bench", log_receive=False)
+        logging.getLogger("sense.signaling").setLevel(logging.INFO)
+
+        sender, stalled = FakeSocket(), StalledSocket()
+        old_loop = PrintingManager({"stalled": [sender, stalled]})
+        try:
+            await asyncio.wait_for(old_loop.broadcast_to_others(MESSAGE, sender, "stalled"), 1)
+            old_blocked = False
+        except asyncio.TimeoutError:
+            old_blocked = True
+        for peer in (sender, stalled):
+            await manager.connect(peer, "stalled")
+        start = time.perf_counter()
+        for _ in range(1000):
+            await manager.broadcast_to_others(MESSAGE, sender, "stalled")
+            await asyncio.sleep(0)
+        stalled_ms = (time.perf_counter() - start) * 1000
+        await asyncio.sleep(0.1)  # Let the close go out
+        return before, after, debug, old_blocked, stalled_ms, getattr(stalled, "close_code", None)
+
+    # Send everything written to stdout (print and the log listener) to a file
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    sink = open(os.path.join(workdir, "stdout.log"), "w")
+    os.dup2(sink.fileno(), 1)
+    try:
+        before, after, debug, old_blocked, stalled_ms, close_code = asyncio.run(run_all())
+        sys.stdout.flush()
+        shutdown_logging()
+    finally:
+        os.dup2(saved_stdout, 1)
+        sink.close()
+
+    print(f"{MESSAGES} relayed messages, 2 peers")
+    print(f"{'mode':<16}{'msgs/s':>12}{'speedup':>10}")
+    for name, rate in (("print", before), ("logging", after), ("logging+debug", debug)):
+        print(f"{name:<16}{rate:>12.0f}{rate / before:>9.2f}x")
+
+    print()
+    print(f"stalled peer, old loop: {'blocked at the first message' if old_blocked else 'kept relaying'}")
+    print(f"stalled peer, send queues: 1000 messages relayed in {stalled_ms:.1f}ms, peer closed with {close_code}")
+    if close_code != 1013:
+        print("FAIL: the stalled peer was not closed as a slow consumer")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Per-message JSON cost on the WebSocket paths, before and after ws_codec.
+
+"before" is what Starlette's send_json/receive_json did: stdlib json,
+encoded again for every recipient. "stdlib once" is the ws_codec fallback
+(encode once per broadcast), and "codec" is ws_codec as configured here
+(orjson when installed). Payloads are a Chrome-sized SDP offer, an ICE
+candidate, an emotion update, and a candidate frame with a JPEG and 7 s of
+16 kHz audio (only ever received, never broadcast).
+
+Exits non-zero if the codec is slower than "before" for any payload.
+
+Run from the app root:  python scripts/bench_ws_codec.py
+"""
+import os
+import sys
+import json
+import base64
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core import ws_codec
+
+
+def sdp_offer() -> dict:
+    lines = [
+        "v=0", "o=- 4611731400430051336 2 IN IP4 127.0.0.1", "s=-", "t=0 0",
+        "a=group:BUNDLE 0 1", "a=extmap-allow-mixed", "a=msid-semantic: WMS stream",
+    ]
+    for mid, kind, payloads in ((0, "audio", range(96, 110)), (1, "video", range(96, 128))):
+        lines += [
+            f"m={kind} 9 UDP/TLS/RTP/SAVPF {' '.join(map(str, payloads))}",
+            "c=IN IP4 0.0.0.0", "a=rtcp:9 IN IP4 0.0.0.0",
+            "a=ice-ufrag:7sFv", "a=ice-pwd:dOTZKZNVlO9RSGsEGM63JXT2",
+            "a=ice-options:trickle", "a=fingerprint:sha-256 " + ":".join(["A1"] * 32),
+            "a=setup:actpass", f"a=mid:{mid}", "a=sendrecv", "a=rtcp-mux",
+        ]
+        for pt in payloads:
+            lines += [
+                f"a=rtpmap:{pt} {'opus/48000/2' if kind == 'audio' else 'VP8/90000'}",
+                f"a=rtcp-fb:{pt} transport-cc", f"a=fmtp:{pt} minptime=10;useinbandfec=1",
+            ]
+        lines += [f"a=ssrc:{1000 + mid} cname:Yq3yPBt7l9rJsbDe", f"a=ssrc:{1000 + mid} msid:stream track{mid}"]
+    return {"type": "offer", "offer": {"type": "offer", "sdp": "\r\n".join(lines) + "\r\n"}}
+
+
+ICE = {
+    "type": "ice-candidate",
+    "candidate": {
+        "candidate": "candidate:842163049 1 udp 1677729535 203.0.113.7 46154 typ srflx raddr 10.0.0.5 rport 46154 generation 0 ufrag 7sFv network-cost 999",
+        "sdpMid": "0",
+        "sdpMLineIndex": 0,
+        "usernameFragment": "7sFv",
+    },
+}
+
+EMOTION = {
+    "type": "emotion_update",
+    "emotion": {
+        "dominant_emotion": "nervous",
+        "confident_meter": 42,
+        "emotion_meter": {
+            "anticipation": 55, "anxiety": 61, "self-doubt": 38, "determination": 47,
+            "relief": 12, "excitement": 20, "neutral": 30,
+        },
+        "reasoning": "Frequent glances away from the camera and a slightly hurried speech rate "
+                     "suggest mild anxiety, though the candidate keeps a steady posture and "
+                     "completes sentences clearly.",
+        "smart_nudge": "Give the candidate a moment and ask a follow-up on a topic they know well.",
+        "timestamp": "2026-10-17T11:50:12.123456+05:30",
+    },
+}
+
+FRAME = json.dumps({
+    "type": "multimodal_frame",
+    "video": "data:image/jpeg;base64," + base64.b64encode(os.urandom(60 * 1024)).decode(),
+    "audio": "data:audio/wav;base64," + base64.b64encode(os.urandom(7 * 16000 * 2)).decode(),
+}, separators=(",", ":"))
+
+
+def per_call_us(fn) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main():
+    stdlib_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+    def starlette_dumps(data):
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    rows = []
+    for name, message, recipients in (
+        ("SDP offer -> 1 peer", sdp_offer(), 1),
+        ("ICE candidate -> 1 peer", ICE, 1),
+        ("emotion -> 3 interviewers", EMOTION, 3),
+    ):
+        before = per_call_us(lambda: [starlette_dumps(message) for _ in range(recipients)])
+        once = per_call_us(lambda: stdlib_dumps(message))
+        codec = per_call_us(lambda: ws_codec.dumps(message))
+        rows.append((f"send {name}", len(ws_codec.dumps(message)), before, once, codec))
+
+    for name, text in (("SDP offer", json.dumps(sdp_offer())), ("candidate frame", FRAME)):
+        before = per_call_us(lambda: json.loads(text))
+        codec = per_call_us(lambda: ws_codec.loads(text))
+        rows.append((f"receive {name}", len(text), before, before, codec))
+
+    print(f"codec backend: {ws_codec.BACKEND}")
+    print(f"{'path':<36}{'bytes':>9}{'before us':>11}{'stdlib once':>13}{'codec us':>10}{'speedup':>9}")
+    slower = []
+    for name, size, before, once, codec in rows:
+        print(f"{name:<36}{size:>9}{before:>11.1f}{once:>13.1f}{codec:>10.1f}{before / codec:>8.1f}x")
+        if codec > before:
+            slower.append(name)
+
+    if slower:
+        print(f"FAIL: codec slower than before for {', '.join(slower)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Incremental auto_vacuum on a new database.
+
+SQLite only takes an auto_vacuum change on a file with no tables yet, and
+ignores it once the file is in WAL mode. Creates fresh databases the two
+ways the app does, and checks that both end up with auto_vacuum
+incremental (2):
+
+- startup: init_db() through the tuned connection pool (WAL)
+- scripts/reset_db.py: migrate() on a plain sqlite3 connection
+
+Exits non-zero on the first failed check.
+
+Run from the app root:  python scripts/check_auto_vacuum.py
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(APP_ROOT)
+
+
+def check(condition: bool, what: str):
+    if not condition:
+        print(f"FAIL: {what}")
+        sys.exit(1)
+    print(f"ok    {what}")
+
+
+def pragmas(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        return (conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+                conn.execute("PRAGMA journal_mode").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="sense-vacuum-")
+    # DB_NAME is relative, so the app's pool opens its database here
+    os.chdir(workdir)
+    from core.config import DB_NAME
+    from core.database import init_db, pool
+    from core.schema import migrate
+
+    check(init_db() > 0, "startup migrates a new database")
+    pool.close_all()
+    auto_vacuum, journal_mode = pragmas(DB_NAME)
+    check(journal_mode == "wal", f"startup database is in WAL mode ({journal_mode})")
+    check(auto_vacuum == 2, f"startup database has incremental auto_vacuum ({auto_vacuum})")
+
+    plain = os.path.join(workdir, "plain.db")
+    conn = sqlite3.connect(plain)
+    migrate(conn)
+    conn.close()
+    auto_vacuum, _ = pragmas(plain)
+    check(auto_vacuum == 2, f"migrate() on a plain connection gives incremental auto_vacuum ({auto_vacuum})")
+
+    print("OK: new databases vacuum incrementally")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Dead WebSocket eviction by the server-driven heartbeat.
+
+Starts the app with a short heartbeat (HEARTBEAT_INTERVAL_SECONDS=0.5,
+HEARTBEAT_MISSED_LIMIT=2) and uvicorn's protocol-level pings turned off,
+then opens "ghost" sockets: raw TCP connections that complete the
+WebSocket handshake and never read or write again, like a half-open
+connection. Checks that:
+
+- a ghost candidate holding a signaling seat locks the real candidate out
+- it is evicted, frees the seat, sends peer_left and sets candidates.left_at
+- a peer that answers heartbeats stays connected throughout
+- ghost emotion and insights sockets are dropped from their rooms
+
+Exits non-zero on the first failed check.
+
+Run from the app root:  python scripts/check_heartbeat.py
+"""
+import os
+import sys
+import json
+import time
+import socket
+import base64
+import asyncio
+import sqlite3
+import tempfile
+import subprocess
+
+import httpx
+import websockets
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PORT = 8813
+BASE = f"127.0.0.1:{PORT}"
+ROOM = "heartbeatroom"
+INTERVIEWER = "interviewer@sense.com"
+CANDIDATE = "candidate@sense.com"
+PASSWORD = "heartbeat-password"
+INTERVAL = 0.5
+MISSED_LIMIT = 2
+EVICTION_WAIT = INTERVAL * (MISSED_LIMIT + 2) + 1  # Last beat, close, cleanup
+TIMEOUT = 5
+
+
+def start_server(workdir: str) -> subprocess.Popen:
+    env = dict(os.environ, HEARTBEAT_INTERVAL_SECONDS=str(INTERVAL), HEARTBEAT_MISSED_LIMIT=str(MISSED_LIMIT))
+    env.pop("GOOGLE_API_KEY", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_ROOT, "--port", str(PORT),
+         "--ws-ping-interval", "3600"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://{BASE}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"server on port {PORT} did not start")
+
+
+def check(condition: bool, what: str):
+    if not condition:
+        print(f"FAIL: {what}")
+        sys.exit(1)
+    print(f"ok    {what}")
+
+
+async def login(username: str) -> dict:
+    async with httpx.AsyncClient(base_url=f"http://{BASE}") as client:
+        r = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+        r.raise_for_status()
+        return {"Cookie": f"access_token={client.cookies['access_token']}"}
+
+
+def ghost(path: str, headers: dict) -> socket.socket:
+    """Complete the handshake, then never touch the socket again."""
+    sock = socket.create_connection(("127.0.0.1", PORT))
+    key = base64.b64encode(os.urandom(16)).decode()
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {BASE}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\nCookie: {headers['Cookie']}\r\n\r\n"
+    )
+    sock.sendall(request.encode())
+    response = b""
+    while b"\r\n\r\n" not in response:
+        response += sock.recv(1)
+    if not response.startswith(b"HTTP/1.1 101"):
+        raise RuntimeError(f"handshake for {path} failed: {response.splitlines()[0]}")
+    return sock
+
+
+async def answer_heartbeats(ws, received: list):
+    """A live client: acknowledge heartbeats, keep everything else."""
+    async for text in ws:
+        message = json.loads(text)
+        if message.get("type") == "heartbeat":
+            await ws.send(json.dumps({"type": "heartbeat_ack"}))
+        else:
+            received.append(message)
+
+
+async def wait_for_message(received: list, kind: str) -> bool:
+    for _ in range(int(TIMEOUT / 0.05)):
+        if any(m.get("type") == kind for m in received):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def status() -> dict:
+    return httpx.get(f"http://{BASE}/status").json()
+
+
+async def signaling_checks(workdir: str):
+    iv = await login(INTERVIEWER)
+    cand = await login(CANDIDATE)
+    url = f"ws://{BASE}/ws/{ROOM}"
+
+    async with websockets.connect(url, additional_headers=iv, ping_interval=None) as interviewer:
+        received = []
+        listener = asyncio.create_task(answer_heartbeats(interviewer, received))
+        stale = ghost(f"/ws/{ROOM}", cand)
+
+        async with websockets.connect(url, additional_headers=cand, ping_interval=None) as locked_out:
+            reply = json.loads(await asyncio.wait_for(locked_out.recv(), TIMEOUT))
+            check(reply.get("type") == "error" and "full" in reply.get("message", ""), "ghost candidate holds the seat")
+
+        started = time.perf_counter()
+        await asyncio.sleep(EVICTION_WAIT)
+        check(status()["signaling"]["peers"] == 1, f"ghost evicted (within {time.perf_counter() - started:.1f}s)")
+        check(await wait_for_message(received, "peer_left"), "interviewer told the ghost left")
+
+        conn = sqlite3.connect(os.path.join(workdir, "users.db"))
+        left_at = conn.execute(
+            "SELECT left_at FROM candidates WHERE meeting_id = ? ORDER BY id DESC LIMIT 1", (ROOM,)
+        ).fetchone()
+        conn.close()
+        check(left_at is not None and left_at[0] is not None, "candidates.left_at written for the ghost")
+
+        async with websockets.connect(url, additional_headers=cand, ping_interval=None) as candidate:
+            cand_received = []
+            cand_listener = asyncio.create_task(answer_heartbeats(candidate, cand_received))
+            await interviewer.send(json.dumps({"type": "offer", "offer": {"sdp": "v=0"}}))
+            check(await wait_for_message(cand_received, "offer"), "candidate can rejoin and receives the offer")
+            await asyncio.sleep(EVICTION_WAIT)
+            check(not cand_listener.done() and not listener.done(), "peers answering heartbeats stay connected")
+            cand_listener.cancel()
+
+        listener.cancel()
+        stale.close()
+
+
+async def emotion_checks():
+    iv = await login(INTERVIEWER)
+    cand = await login(CANDIDATE)
+    stale_candidate = ghost(f"/api/gemini/ws/emotion/{ROOM}", cand)
+    stale_interviewer = ghost(f"/api/gemini/ws/insights/{ROOM}", iv)
+    await asyncio.sleep(0.2)
+    before = httpx.get(f"http://{BASE}/api/gemini/emotion/status").json()
+    check(ROOM in before["active_rooms"] and before["interviewer_connections"].get(ROOM) == 1, "ghost emotion sockets joined")
+
+    await asyncio.sleep(EVICTION_WAIT)
+    after = httpx.get(f"http://{BASE}/api/gemini/emotion/status").json()
+    check(ROOM not in after["active_rooms"], "ghost candidate dropped from the emotion room")
+    check(ROOM not in after["interviewer_connections"], "ghost interviewer dropped from the insights room")
+    stale_candidate.close()
+    stale_interviewer.close()
+
+
+async def setup(workdir: str):
+    async with httpx.AsyncClient(base_url=f"http://{BASE}") as client:
+        for username in (CANDIDATE, INTERVIEWER):
+            client.cookies.clear()
+            r = await client.post("/auth/signup", json={"username": username, "email": username, "full_name": username, "password": PASSWORD})
+            r.raise_for_status()
+        conn = sqlite3.connect(os.path.join(workdir, "users.db"))
+        conn.execute("UPDATE users SET role = 'interviewer' WHERE username = ?", (INTERVIEWER,))
+        conn.commit()
+        conn.close()
+    iv = await login(INTERVIEWER)
+    async with httpx.AsyncClient(base_url=f"http://{BASE}", headers=iv) as client:
+        r = await client.post("/auth/meetings", json={"candidate_email": CANDIDATE, "id": ROOM})
+        r.raise_for_status()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="sense-heartbeat-")
+    server = start_server(workdir)
+    try:
+        asyncio.run(setup(workdir))
+        asyncio.run(signaling_checks(workdir))
+        asyncio.run(emotion_checks())
+        stats = status()["heartbeat"]
+        check(stats["evicted"] >= 3 and stats["connections"] == 0, f"heartbeat stats {stats}")
+    finally:
+        server.terminate()
+        server.wait()
+    print("OK: dead sockets are evicted")
+
+
+if __name__ == "__main__":
+    main()
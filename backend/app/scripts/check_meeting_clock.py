@@ -0,0 +1,149 @@
+"""
+Meeting clock pushed over signaling.
+
+Starts the app, creates a 2 minute meeting and checks that:
+
+- both peers get a "clock" message as they connect, counting from /start
+- changing the duration pushes a new clock to both peers
+- GET /remaining-time is answered from memory: repeated calls add no
+  database loads (meeting_clock.loads in /status)
+- a deadline in the past pushes "expired" within a tick
+- ending the meeting drops the cached deadline
+
+Exits non-zero on the first failed check.
+
+Run from the app root:  python scripts/check_meeting_clock.py
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import tempfile
+import subprocess
+
+import httpx
+import websockets
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PORT = 8814
+BASE = f"127.0.0.1:{PORT}"
+ROOM = "clockroom"
+INTERVIEWER = "interviewer@sense.com"
+CANDIDATE = "candidate@sense.com"
+PASSWORD = "clock-password"
+REQUESTS = 200
+TIMEOUT = 5
+
+
+def start_server(workdir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.pop("GOOGLE_API_KEY", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_ROOT, "--port", str(PORT)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://{BASE}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"server on port {PORT} did not start")
+
+
+def check(condition: bool, what: str):
+    if not condition:
+        print(f"FAIL: {what}")
+        sys.exit(1)
+    print(f"ok    {what}")
+
+
+async def login(username: str) -> dict:
+    async with httpx.AsyncClient(base_url=f"http://{BASE}") as client:
+        r = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+        r.raise_for_status()
+        return {"Cookie": f"access_token={client.cookies['access_token']}"}
+
+
+async def next_of(ws, kind: str) -> dict:
+    """The next message of a type, skipping heartbeats and signaling."""
+    deadline = time.monotonic() + TIMEOUT
+    while True:
+        message = json.loads(await asyncio.wait_for(ws.recv(), deadline - time.monotonic()))
+        if message.get("type") == kind:
+            return message
+
+
+def clock_loads() -> int:
+    return httpx.get(f"http://{BASE}/status").json()["meeting_clock"]["loads"]
+
+
+async def clock_checks():
+    iv = await login(INTERVIEWER)
+    cand = await login(CANDIDATE)
+    url = f"ws://{BASE}/ws/{ROOM}"
+    async with httpx.AsyncClient(base_url=f"http://{BASE}/auth", headers=iv) as api:
+        (await api.post(f"/meetings/{ROOM}/start")).raise_for_status()
+
+        async with websockets.connect(url, additional_headers=iv) as a, \
+                websockets.connect(url, additional_headers=cand) as b:
+            clocks = [await next_of(a, "clock"), await next_of(b, "clock")]
+            check(all(c["started"] and 110 <= c["remaining_seconds"] <= 120 for c in clocks),
+                  f"peers get the clock on connect ({clocks[1]['remaining_seconds']}s left)")
+
+            (await api.patch(f"/meetings/{ROOM}", json={"duration": 3})).raise_for_status()
+            clocks = [await next_of(a, "clock"), await next_of(b, "clock")]
+            check(all(c["duration_minutes"] == 3 and c["remaining_seconds"] > 170 for c in clocks),
+                  "duration change is pushed to both peers")
+
+            loads = clock_loads()
+            for _ in range(REQUESTS):
+                r = await api.get(f"/meetings/{ROOM}/remaining-time")
+            check(r.json()["duration_minutes"] == 3 and r.json()["remaining_seconds"] > 170, "remaining-time sees the new duration")
+            check(clock_loads() == loads, f"{REQUESTS} remaining-time calls, no database loads")
+
+            (await api.patch(f"/meetings/{ROOM}", json={"duration": 0})).raise_for_status()
+            started = time.perf_counter()
+            await next_of(a, "expired")
+            await next_of(b, "expired")
+            check(True, f"expired pushed to both peers ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+        (await api.post(f"/meetings/{ROOM}/end")).raise_for_status()
+        loads = clock_loads()
+        r = await api.get(f"/meetings/{ROOM}/remaining-time")
+        check(r.status_code == 200 and clock_loads() == loads + 1, "ending the meeting drops the cached deadline")
+
+
+async def setup(workdir: str):
+    async with httpx.AsyncClient(base_url=f"http://{BASE}") as client:
+        for username in (CANDIDATE, INTERVIEWER):
+            client.cookies.clear()
+            r = await client.post("/auth/signup", json={"username": username, "email": username, "full_name": username, "password": PASSWORD})
+            r.raise_for_status()
+        conn = sqlite3.connect(os.path.join(workdir, "users.db"))
+        conn.execute("UPDATE users SET role = 'interviewer' WHERE username = ?", (INTERVIEWER,))
+        conn.commit()
+        conn.close()
+    iv = await login(INTERVIEWER)
+    async with httpx.AsyncClient(base_url=f"http://{BASE}", headers=iv) as client:
+        r = await client.post("/auth/meetings", json={"candidate_email": CANDIDATE, "id": ROOM, "duration": 2})
+        r.raise_for_status()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="sense-clock-")
+    server = start_server(workdir)
+    try:
+        asyncio.run(setup(workdir))
+        asyncio.run(clock_checks())
+    finally:
+        server.terminate()
+        server.wait()
+    print("OK: the meeting clock is pushed")
+
+
+if __name__ == "__main__":
+    main()
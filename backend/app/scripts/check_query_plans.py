@@ -0,0 +1,133 @@
+"""
+Query-plan regression check.
+
+Collects every SQL literal in routes/ and the core request-path modules,
+runs EXPLAIN QUERY PLAN for each against a freshly migrated database
+seeded with a large, realistic data set, and exits non-zero if any of
+them falls back to a full table scan.
+
+Run from the app root:  python scripts/check_query_plans.py
+"""
+import os
+import sys
+import ast
+import random
+import sqlite3
+import tempfile
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(APP_ROOT)
+from core.schema import migrate
+
+SOURCES = ["routes", "core/database.py", "core/dependencies.py"]
+SQL_PREFIXES = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+USERS = 2_000
+MEETINGS = 20_000
+INSIGHTS_PER_MEETING = 10
+SESSIONS = 50_000
+
+
+def source_files():
+    for entry in SOURCES:
+        path = os.path.join(APP_ROOT, entry)
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".py"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def collect_queries():
+    """(location, sql) for every string literal that looks like SQL."""
+    queries = []
+    for path in source_files():
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        # f-strings (dynamic IN lists / SET clauses) are skipped: both of
+        # ours filter on a primary key.
+        fstring_parts = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+                         for part in node.values}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in fstring_parts:
+                sql = " ".join(node.value.split())
+                if sql.startswith(SQL_PREFIXES):
+                    location = f"{os.path.relpath(path, APP_ROOT)}:{node.lineno}"
+                    queries.append((location, sql))
+    return queries
+
+
+def seed(conn):
+    rnd = random.Random(7)
+    emails = [f"user{i}@sense.com" for i in range(USERS)]
+    conn.executemany(
+        "INSERT INTO users (username, email, full_name, hashed_password, role) VALUES (?, ?, ?, ?, ?)",
+        [(e, e, f"User {i}", "x", "interviewer" if i % 10 == 0 else "candidate") for i, e in enumerate(emails)]
+    )
+    conn.executemany(
+        "INSERT INTO meetings (id, creator_username, candidate_email, created_at, started_at) VALUES (?, ?, ?, ?, ?)",
+        [(f"m{i:07d}", emails[rnd.randrange(0, USERS, 10)], rnd.choice(emails),
+          f"2025-01-01 00:{i % 60:02d}:00", f"2025-01-01 00:{i % 60:02d}:00") for i in range(MEETINGS)]
+    )
+    conn.executemany(
+        "INSERT INTO candidates (meeting_id, name) VALUES (?, ?)",
+        [(f"m{i:07d}", f"User {i % USERS}") for i in range(MEETINGS)]
+    )
+    conn.executemany(
+        "INSERT INTO insights (meeting_id, emotion_json, relative_seconds) VALUES (?, ?, ?)",
+        [(f"m{i:07d}", '{"dominant_emotion": "neutral"}', s * 7)
+         for i in range(MEETINGS) for s in range(INSIGHTS_PER_MEETING)]
+    )
+    conn.executemany(
+        "INSERT INTO meeting_summaries (meeting_id, summary, overall_score) VALUES (?, ?, ?)",
+        [(f"m{i:07d}", "ok", 70) for i in range(0, MEETINGS, 3)]
+    )
+    conn.executemany(
+        "INSERT INTO sessions (session_id, username, role, expires_at) VALUES (?, ?, ?, ?)",
+        [(f"s{i:09d}", rnd.choice(emails), "interviewer", f"2025-{1 + i % 12:02d}-01T00:00:00+00:00")
+         for i in range(SESSIONS)]
+    )
+    conn.executemany(
+        "INSERT INTO resume_data (user_email, summary) VALUES (?, ?)",
+        [(e, "resume") for e in emails[::2]]
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def full_scans(conn, sql):
+    params = (None,) * sql.count("?")
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX ..." walks an index
+    return [row[3] for row in plan if row[3].startswith("SCAN ") and "USING" not in row[3]
+            and row[3] != "SCAN CONSTANT ROW"]
+
+
+def main():
+    db_path = os.path.join(tempfile.mkdtemp(prefix="sense-plans-"), "plans.db")
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    print(f"Seeding {MEETINGS} meetings / {MEETINGS * INSIGHTS_PER_MEETING} insights...")
+    seed(conn)
+
+    failures = 0
+    queries = collect_queries()
+    for location, sql in queries:
+        try:
+            scans = full_scans(conn, sql)
+        except sqlite3.Error as e:
+            print(f"ERROR {location}: {e}\n      {sql}")
+            failures += 1
+            continue
+        if scans:
+            print(f"SCAN  {location}: {', '.join(scans)}\n      {sql}")
+            failures += 1
+
+    conn.close()
+    print(f"{len(queries)} queries checked, {failures} problem(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Signaling and insights across workers sharing the Unix socket room bus.
+
+Starts two app processes (separate ports, same database and bus socket)
+with ROOM_BUS=unix, puts the interviewer on one and the candidate on the
+other, and checks that:
+
+- offers and ICE candidates reach the peer on the other worker
+- the two-person limit counts both workers
+- insights from the candidate's worker reach the interviewer, and the
+  interviewer leaving stops the candidate's analysis stream
+- after the worker hosting the hub is killed, the other one takes it over
+  and a restarted worker can relay through it again
+
+Exits non-zero on the first failed check.
+
+Run from the app root:  python scripts/check_room_bus.py
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import tempfile
+import subprocess
+
+import httpx
+import websockets
+
+APP_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PORTS = (8811, 8812)
+ROOM = "busroom"
+INTERVIEWER = "interviewer@sense.com"
+CANDIDATE = "candidate@sense.com"
+PASSWORD = "bus-password"
+TIMEOUT = 5
+
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, ROOM_BUS="unix")
+    env.pop("GOOGLE_API_KEY", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_ROOT, "--port", str(port)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def check(condition: bool, what: str):
+    if not condition:
+        print(f"FAIL: {what}")
+        sys.exit(1)
+    print(f"ok    {what}")
+
+
+async def login(port: int, username: str) -> dict:
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        r = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+        r.raise_for_status()
+        return {"Cookie": f"access_token={client.cookies['access_token']}"}
+
+
+async def recv_json(ws) -> dict:
+    """The next message from the peer, skipping the server's own clock updates."""
+    while True:
+        message = json.loads(await asyncio.wait_for(ws.recv(), TIMEOUT))
+        if message.get("type") != "clock":
+            return message
+
+
+async def hub_port() -> int:
+    for port in PORTS:
+        r = httpx.get(f"http://127.0.0.1:{port}/status")
+        if r.json()["room_bus"]["hub"]:
+            return port
+    return 0
+
+
+async def relay_checks(interviewer_port: int, candidate_port: int):
+    iv = await login(interviewer_port, INTERVIEWER)
+    cand = await login(candidate_port, CANDIDATE)
+    iv_url = f"ws://127.0.0.1:{interviewer_port}"
+    cand_url = f"ws://127.0.0.1:{candidate_port}"
+
+    async with websockets.connect(f"{iv_url}/ws/{ROOM}", additional_headers=iv) as a, \
+            websockets.connect(f"{cand_url}/ws/{ROOM}", additional_headers=cand) as b:
+        await a.send(json.dumps({"type": "offer", "offer": {"sdp": "v=0"}}))
+        check((await recv_json(b)).get("type") == "offer", "offer crosses workers")
+        await b.send(json.dumps({"type": "ice-candidate", "candidate": {"candidate": "c"}}))
+        check((await recv_json(a)).get("type") == "ice-candidate", "ICE candidate crosses back")
+
+        async with websockets.connect(f"{cand_url}/ws/{ROOM}", additional_headers=iv) as c:
+            reply = await recv_json(c)
+            check(reply.get("type") == "error" and "full" in reply.get("message", ""), "third peer rejected across workers")
+
+        await b.close()
+        check((await recv_json(a)).get("type") == "peer_left", "peer_left reaches the other worker")
+
+
+async def insight_checks(interviewer_port: int, candidate_port: int):
+    iv = await login(interviewer_port, INTERVIEWER)
+    cand = await login(candidate_port, CANDIDATE)
+    async with websockets.connect(f"ws://127.0.0.1:{candidate_port}/api/gemini/ws/emotion/{ROOM}", additional_headers=cand) as candidate:
+        async with websockets.connect(f"ws://127.0.0.1:{interviewer_port}/api/gemini/ws/insights/{ROOM}", additional_headers=iv) as interviewer:
+            await candidate.send(json.dumps({"type": "multimodal_frame", "video": "data:image/jpeg;base64,AAAA"}))
+            update = await recv_json(interviewer)
+            check(update.get("type") == "emotion_update", "insight reaches the interviewer's worker")
+
+        try:
+            await asyncio.wait_for(candidate.recv(), TIMEOUT)
+            stopped = False
+        except websockets.ConnectionClosed as e:
+            stopped = e.rcvd is not None and e.rcvd.code == 1000
+        check(stopped, "last interviewer leaving stops the candidate stream")
+
+
+async def setup(port: int, workdir: str):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        for username in (CANDIDATE, INTERVIEWER):
+            client.cookies.clear()
+            r = await client.post("/auth/signup", json={"username": username, "email": username, "full_name": username, "password": PASSWORD})
+            r.raise_for_status()
+        conn = sqlite3.connect(os.path.join(workdir, "users.db"))
+        conn.execute("UPDATE users SET role = 'interviewer' WHERE username = ?", (INTERVIEWER,))
+        conn.commit()
+        conn.close()
+    iv = await login(port, INTERVIEWER)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", headers=iv) as client:
+        r = await client.post("/auth/meetings", json={"candidate_email": CANDIDATE, "id": ROOM})
+        r.raise_for_status()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="sense-bus-")
+    servers = {PORTS[0]: start_server(workdir, PORTS[0])}
+    servers[PORTS[1]] = start_server(workdir, PORTS[1])
+    try:
+        asyncio.run(setup(PORTS[0], workdir))
+        asyncio.run(relay_checks(*PORTS))
+        asyncio.run(insight_checks(*PORTS))
+
+        host = asyncio.run(hub_port())
+        check(host in PORTS, "one worker hosts the hub")
+        servers[host].kill()
+        servers[host].wait()
+        survivor = PORTS[1] if host == PORTS[0] else PORTS[0]
+        time.sleep(1.5)
+        servers[host] = start_server(workdir, host)
+        time.sleep(0.5)
+        check(asyncio.run(hub_port()) == survivor, "surviving worker took over the hub")
+        asyncio.run(relay_checks(host, survivor))
+    finally:
+        for server in servers.values():
+            server.terminate()
+            server.wait()
+    print("OK: rooms work across workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
+import sys
+import os
 import sqlite3
 from passlib.context import CryptContext
 
+# Schema lives in core/schema.py, shared with the app's init_db()
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.schema import migrate, drop_all_tables
+
 DB_NAME = "../users.db"
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -13,82 +19,12 @@ def reset():
     try:
         conn = get_db_connection()
         print("Dropping tables...")
-        conn.execute("DROP TABLE IF EXISTS insights")
-        conn.execute("DROP TABLE IF EXISTS sessions")
-        conn.execute("DROP TABLE IF EXISTS candidates")
-        conn.execute("DROP TABLE IF EXISTS meetings")
-        conn.execute("DROP TABLE IF EXISTS users")
-        conn.commit()
+        drop_all_tables(conn)
         conn.close()
 
         print("Re-creating tables...")
         conn = get_db_connection()
-        
-        # Users Table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                email TEXT,
-                full_name TEXT,
-                hashed_password TEXT,
-                profile_photo_url TEXT,
-                analysis_mode TEXT DEFAULT 'cloud',
-                role TEXT DEFAULT 'candidate',
-                disabled INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # Meetings Table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS meetings (
-                id TEXT PRIMARY KEY,
-                creator_username TEXT,
-                candidate_email TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                started_at TIMESTAMP,
-                ended_at TIMESTAMP,
-                active INTEGER DEFAULT 1,
-                duration INTEGER,
-                recording_url TEXT,
-                interviewer_joined INTEGER DEFAULT 0,
-                FOREIGN KEY(creator_username) REFERENCES users(username)
-            )
-        ''')
-        
-        # Candidates Table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS candidates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                meeting_id TEXT,
-                name TEXT,
-                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(meeting_id) REFERENCES meetings(id)
-            )
-        ''')
-        
-        # Sessions Table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                username TEXT,
-                role TEXT,
-                expires_at TIMESTAMP
-            )
-        ''')
-        
-        # Insights Table (for emotion analysis history)
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS insights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                meeting_id TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                emotion_json TEXT,
-                smart_nudge TEXT,
-                FOREIGN KEY(meeting_id) REFERENCES meetings(id)
-            )
-        ''')
-        
-        conn.commit()
+        migrate(conn)
         
         # Seed default users
         print("Seeding data...")
@@ -107,9 +43,10 @@ def reset():
             )
 
         conn.commit()
+        tables = [r['name'] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
         conn.close()
         print("✓ Database reset complete.")
-        print(f"  - Created tables: users, meetings, candidates, sessions, insights")
+        print(f"  - Created tables: {', '.join(tables)}")
         print(f"  - Seeded users: tom.cruise@sense.com (candidate), trishna.krishnan@sense.com (interviewer)")
         
     except Exception as e:
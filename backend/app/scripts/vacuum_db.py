@@ -0,0 +1,45 @@
+"""
+Switch an existing database to incremental auto_vacuum and compact it.
+
+Databases created before migration 5 keep auto_vacuum off until a full
+VACUUM rewrites the file, which can take minutes on a large database and
+holds the write lock throughout. Run it once, with the app stopped (or
+during a quiet period); afterwards the session sweeper keeps the file
+compact with incremental vacuums.
+
+Run from the app root:  python scripts/vacuum_db.py [path to users.db]
+"""
+import os
+import sys
+import time
+import sqlite3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from core.config import DB_NAME, DB_BUSY_TIMEOUT_MS
+
+MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DB_NAME
+    if not os.path.exists(path):
+        sys.exit(f"{path} does not exist")
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    size = os.path.getsize(path)
+    print(f"{path}: {size / 1024 / 1024:.1f} MB, auto_vacuum {MODES.get(mode, mode)}")
+
+    started = time.perf_counter()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    conn.close()
+    print(f"vacuumed in {time.perf_counter() - started:.1f}s: {os.path.getsize(path) / 1024 / 1024:.1f} MB, "
+          f"auto_vacuum {MODES.get(mode, mode)}")
+    if mode != 2:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
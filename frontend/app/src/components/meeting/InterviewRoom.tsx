@@ -147,18 +147,9 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
             // Check if resume exists (optional optimization, current ResumeViewer handles null)
             setResumeAvailable(true);
           }
-          // Fetch remaining time from server for timing verification
+          // Remaining time is pushed by the server ('clock' / 'expired') once the signaling socket connects
           if (res.data.duration && mounted) {
             setMeetingDuration(res.data.duration);
-            const timeRes = await axios.get(`${API_URL}/meetings/${roomId}/remaining-time`, { withCredentials: true });
-            if (timeRes.data.remaining_seconds !== null && mounted) {
-              setTimeRemaining(timeRes.data.remaining_seconds);
-              if (timeRes.data.is_expired) {
-                if (userRole === 'interviewer') navigateWithTransition('/interviewer/thank-you');
-                else navigateWithTransition('/candidate/thank-you');
-                return;
-              }
-            }
           }
         } catch (error) {
           console.error("Failed to fetch meeting status:", error);
@@ -316,7 +307,8 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
 
     try {
       // ... WebSocket setup ...
-      const wsUrl = `${WS_BASE_URL}/ws/${roomId || 'default'}`;
+      // ice_batch: the server coalesces trickle-ICE candidates into 'ice_batch' messages
+      const wsUrl = `${WS_BASE_URL}/ws/${roomId || 'default'}?ice_batch=1`;
       ws.current = new WebSocket(wsUrl);
 
       ws.current.onopen = () => {
@@ -366,6 +358,11 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
 
       ws.current.onmessage = async (event) => {
         const message = JSON.parse(event.data);
+        // Server liveness check - answer it, nothing else to do
+        if (message.type === 'heartbeat') {
+          ws.current?.send(JSON.stringify({ type: 'heartbeat_ack' }));
+          return;
+        }
         console.log('[WebRTC] Received message:', message.type, message);
         handleSignalingMessage(message);
       };
@@ -384,6 +381,13 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
         setConnectionStatus('Connected');
       };
 
+      pc.onconnectionstatechange = () => {
+        if (pc.connectionState === 'connected') {
+          // Lets the server measure time-to-connected; not passed to the peer
+          ws.current?.send(JSON.stringify({ type: 'connected' }));
+        }
+      };
+
       pc.onicecandidate = (event) => {
         if (event.candidate) {
           ws.current?.send(JSON.stringify({
@@ -484,9 +488,10 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
           const sx = (vw - size) / 2;
           const sy = (vh - size) / 2;
           ctx.drawImage(localVideoRef.current, sx, sy, size, size, 0, 0, 768, 768);
-          const frameData = canvas.toDataURL('image/jpeg', 0.7);
+          const capturedAt = Date.now(); // Staleness on the server counts from here
 
           // 2. Process Audio
+          let wavBlob: Blob | null = null;
           if (audioChunks.length > 0) {
             const totalLen = audioChunks.reduce((acc, chunk) => acc + chunk.length, 0);
             const mergedAudio = new Float32Array(totalLen);
@@ -525,32 +530,40 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
             writeString(view, 36, 'data');
             view.setUint32(40, pcmBuffer.byteLength, true);
 
-            const wavBlob = new Blob([view, pcmBuffer], { type: 'audio/wav' });
-            const reader = new FileReader();
-            reader.onloadend = () => {
-              const base64Audio = reader.result as string;
-              if (emotionWs.current?.readyState === WebSocket.OPEN) {
-                emotionWs.current.send(JSON.stringify({
-                  type: 'multimodal_frame',
-                  video: frameData,
-                  audio: base64Audio
-                }));
-              }
-            };
-            reader.readAsDataURL(wavBlob);
-            return;
+            wavBlob = new Blob([view, pcmBuffer], { type: 'audio/wav' });
           }
 
-          emotionWs.current.send(JSON.stringify({
-            type: 'multimodal_frame',
-            video: frameData
-          }));
+          // 3. Send one binary frame: 20-byte header with the capture time,
+          // raw JPEG, raw WAV (layout in backend/app/core/segment_frame.py)
+          canvas.toBlob((jpegBlob) => {
+            if (!jpegBlob || emotionWs.current?.readyState !== WebSocket.OPEN) return;
+            const header = new DataView(new ArrayBuffer(20));
+            header.setUint8(0, 0x53); // 'S'
+            header.setUint8(1, 0x47); // 'G'
+            header.setUint8(2, 1); // version
+            header.setUint8(3, 0x01); // flags: capture time follows
+            header.setUint32(4, jpegBlob.size, true);
+            header.setUint32(8, wavBlob ? wavBlob.size : 0, true);
+            header.setFloat64(12, capturedAt, true);
+            emotionWs.current.send(new Blob(wavBlob ? [header, jpegBlob, wavBlob] : [header, jpegBlob]));
+          }, 'image/jpeg', 0.7);
         } catch (e) {
           console.error('[EMOTION] Frame capture error:', e);
         }
       }, 7000); // ~0.14 FPS (every 7 seconds)
     };
 
+    emotionWs.current.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data);
+        if (data.type === 'heartbeat') {
+          emotionWs.current?.send(JSON.stringify({ type: 'heartbeat_ack' }));
+        }
+      } catch (e) {
+        console.error('[EMOTION] Failed to parse message:', e);
+      }
+    };
+
     emotionWs.current.onclose = () => {
       console.log('[EMOTION] Disconnected from emotion analysis');
       setEmotionConnected(false);
@@ -599,7 +612,9 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
     insightsWs.current.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
-        if (data.type === 'emotion_update' && data.emotion) {
+        if (data.type === 'heartbeat') {
+          insightsWs.current?.send(JSON.stringify({ type: 'heartbeat_ack' }));
+        } else if (data.type === 'emotion_update' && data.emotion) {
           console.log('[EMOTION] Received emotion update:', data.emotion.primary);
           setEmotionData(data.emotion);
         }
@@ -685,9 +700,8 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
           setTimerWarning('1min');
           setTimeout(() => setTimerWarning(null), 5000);
         }
-        // Auto-end call when time is up
+        // The server sends 'expired' when time is up; this is only the display
         if (newTime <= 0) {
-          handleEndCall();
           return 0;
         }
 
@@ -743,6 +757,19 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
       return;
     }
 
+    // Meeting clock, pushed by the server (the countdown runs locally in between)
+    if (message.type === 'clock') {
+      setMeetingDuration(message.duration_minutes);
+      setTimeRemaining(message.remaining_seconds);
+      return;
+    }
+    if (message.type === 'expired') {
+      console.log('[Timer] Meeting time is up');
+      setTimeRemaining(0);
+      handleEndCall();
+      return;
+    }
+
     if (!pc) return;
 
     if (message.type === 'offer') {
@@ -754,6 +781,10 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
       await pc.setRemoteDescription(new RTCSessionDescription(message.answer));
     } else if (message.type === 'candidate') {
       await pc.addIceCandidate(new RTCIceCandidate(message.candidate));
+    } else if (message.type === 'ice_batch') {
+      for (const candidate of message.candidates) {
+        await pc.addIceCandidate(new RTCIceCandidate(candidate));
+      }
     } else if (message.type === 'peer_left') {
       setRemoteStream(null);
       setConnectionStatus(userRole === 'interviewer' ? 'Candidate disconnected' : 'Interviewer disconnected');
@@ -766,12 +797,6 @@ export function InterviewRoom({ userRole, userName, roomId }: InterviewRoomProps
       console.log('[WebRTC] Peer joined, creating offer...');
       setConnectionStatus(userRole === 'interviewer' ? 'Connecting to candidate...' : 'Connecting to interviewer...');
 
-      // Start timer when candidate joins (for interviewers only)
-      if (userRole === 'interviewer' && meetingDuration && meetingDuration > 0) {
-        console.log('[Timer] Starting interview timer:', meetingDuration, 'minutes');
-        setTimeRemaining(meetingDuration * 60); // Convert to seconds
-      }
-
       const offer = await pc.createOffer();
       await pc.setLocalDescription(offer);
       console.log('[WebRTC] Sending offer:', offer);